@@ -0,0 +1,156 @@
+"""
+为本地目录注入固定延迟的文件系统垫片，用于模拟 SMB/NFS 等网络共享目录。
+
+位于 root 之下的路径，每次元数据操作（stat、scandir、mkdir、rename、unlink、utime 等）、
+每次打开文件以及每次底层读写都会先等待 latency 秒；其他路径不受影响。
+等待期间释放 GIL，与网络往返一样可被其他线程重叠。
+
+用法：
+    with latency_fs(root, latency=0.002):
+        ...
+"""
+
+import builtins
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# 第一个参数为路径的 os 函数
+_path_functions: tuple[str, ...] = (
+    "stat",
+    "lstat",
+    "scandir",
+    "listdir",
+    "mkdir",
+    "rmdir",
+    "unlink",
+    "remove",
+    "utime",
+    "chmod",
+    "rename",
+    "replace",
+)
+
+
+class _Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = 0
+
+    def add(self):
+        with self._lock:
+            self.operations += 1
+
+
+class LatencyRaw(io.RawIOBase):
+    def __init__(self, raw: io.FileIO, delay):
+        self._raw = raw
+        self._delay = delay
+
+    @property
+    def name(self):
+        return self._raw.name
+
+    @property
+    def mode(self):
+        return self._raw.mode
+
+    def readable(self) -> bool:
+        return self._raw.readable()
+
+    def writable(self) -> bool:
+        return self._raw.writable()
+
+    def seekable(self) -> bool:
+        return self._raw.seekable()
+
+    def readinto(self, buffer) -> int | None:
+        self._delay()
+        return self._raw.readinto(buffer)
+
+    def write(self, data) -> int | None:
+        self._delay()
+        return self._raw.write(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def truncate(self, size: int | None = None) -> int:
+        self._delay()
+        return self._raw.truncate(size)
+
+    def fileno(self) -> int:
+        return self._raw.fileno()
+
+    def close(self):
+        if not self.closed:
+            self._raw.close()
+        super().close()
+
+
+@contextmanager
+def latency_fs(root: str | os.PathLike, latency: float) -> Iterator[_Counter]:
+    root_str = os.path.abspath(os.fspath(root))
+    counter = _Counter()
+    originals = {name: getattr(os, name) for name in _path_functions}
+    original_open = builtins.open
+
+    def under_root(path) -> bool:
+        if isinstance(path, int):
+            return False
+        try:
+            path = os.fspath(path)
+        except TypeError:
+            return False
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        return os.path.abspath(path).startswith(root_str)
+
+    def delay():
+        counter.add()
+        time.sleep(latency)
+
+    def wrap(name: str):
+        original = originals[name]
+
+        def wrapper(path=".", *args, **kwargs):
+            if under_root(path):
+                delay()
+            return original(path, *args, **kwargs)
+
+        return wrapper
+
+    def latency_open(file, mode="r", buffering=-1, encoding=None, errors=None, newline=None, closefd=True, opener=None):
+        if not under_root(file):
+            return original_open(file, mode, buffering, encoding, errors, newline, closefd, opener)
+        delay()
+        raw = LatencyRaw(
+            original_open(file, mode.replace("t", "").replace("b", "") + "b", 0, closefd=closefd, opener=opener), delay
+        )
+        if "+" in mode:
+            buffered = io.BufferedRandom(raw)
+        elif "r" in mode:
+            buffered = io.BufferedReader(raw)
+        else:
+            buffered = io.BufferedWriter(raw)
+        if "b" in mode:
+            return buffered
+        return io.TextIOWrapper(buffered, encoding, errors, newline)
+
+    for name in _path_functions:
+        setattr(os, name, wrap(name))
+    builtins.open = latency_open
+    io.open = latency_open
+    try:
+        yield counter
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+        builtins.open = original_open
+        io.open = original_open
@@ -0,0 +1,144 @@
+"""
+网络共享目录转换基准：用 latency_fs 为输入、输出与缓存目录注入固定延迟，
+分别以逐卷顺序处理与 run_volumes 并发处理（convert --jobs）转换同一批合成卷，
+比较墙钟时间与吞吐量，并核对两种方式的输出一致。
+
+用法：python benchmarks/network_convert.py [--volumes N] [--pages P] [--latency MS] [--jobs J ...]
+"""
+
+import argparse
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from latency_fs import latency_fs
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rich.console import Console  # noqa: E402
+
+from moe_utils.async_runner import run_volumes_sync  # noqa: E402
+from moe_utils.manga_repacker import Repacker  # noqa: E402
+from moe_utils.terminal_ui import DynamicLogger  # noqa: E402
+
+
+# 只含 SOI、SOF0 与填充数据的 JPEG，足以读出尺寸，无需 Pillow
+def fake_jpeg(width: int, height: int, size: int) -> bytes:
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + b"\x01\x11\x00\x02\x11\x01\x03\x11\x01"
+    head = b"\xff\xd8" + sof
+    return head + bytes(max(size - len(head) - 2, 0)) + b"\xff\xd9"
+
+
+def make_volume(path: Path, index: int, pages: int, page_size: int):
+    items: list[str] = []
+    spine: list[str] = []
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        for page in range(pages):
+            name = "cover" if page == 0 else str(page)
+            z.writestr(f"image/img_{name}.jpg", fake_jpeg(1200, 1800 + index, page_size))
+            z.writestr(f"html/Page_{name}.html", f'<html><body><img src="../image/img_{name}.jpg"/></body></html>')
+            items.append(f'<item id="Page_{name}" href="html/Page_{name}.html" media-type="application/xhtml+xml"/>')
+            items.append(f'<item id="img_{name}" href="image/img_{name}.jpg" media-type="image/jpeg"/>')
+            spine.append(f'<itemref idref="Page_{name}"/>')
+        z.writestr(
+            "vol.opf",
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="2.0" unique-identifier="MOXBID">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="MOXBID">20012345{index:03d}10</dc:identifier>\n'
+            f"<dc:title>基準漫畫 - 卷{index + 1:02d}</dc:title>\n"
+            "<dc:creator>作者</dc:creator>\n"
+            "<dc:publisher>Kox.moe</dc:publisher>\n"
+            "</metadata>\n"
+            f"<manifest>\n{chr(10).join(items)}\n</manifest>\n"
+            f'<spine toc="ncx">\n{chr(10).join(spine)}\n</spine>\n'
+            "</package>\n",
+        )
+
+
+def make_workspace(base: Path, volumes: int, pages: int, page_size: int) -> Path:
+    (base / "input").mkdir(parents=True)
+    for index in range(volumes):
+        make_volume(base / "input" / f"vol{index + 1:02d}.epub", index, pages, page_size)
+    config = base / "config.toml"
+    config.write_text(
+        "[DEFAULT]\n"
+        f'input_dir = "{(base / "input").as_posix()}"\n'
+        f'output_dir = "{(base / "output").as_posix()}"\n'
+        f'cache_dir = "{(base / "cache").as_posix()}"\n'
+        "exclude = []\n"
+        "enable_extern_7z_use = false\n"
+        'extern_7z_executable_path = "7z"\n',
+        encoding="utf-8",
+    )
+    return config
+
+
+def new_repacker(base: Path, config: Path) -> Repacker:
+    for name in ("output", "cache"):
+        shutil.rmtree(base / name, ignore_errors=True)
+        (base / name).mkdir()
+    console = Console(quiet=True)
+    repacker = Repacker(verbose=False, console=console, dlogger=DynamicLogger(console))
+    repacker.init_data(str(config), ignore_clean=True)
+    return repacker
+
+
+def snapshot(output: Path) -> dict[str, list[tuple[str, int]]]:
+    result: dict[str, list[tuple[str, int]]] = {}
+    for cbz in sorted(output.rglob("*.cbz")):
+        with zipfile.ZipFile(cbz) as z:
+            result[cbz.name] = [(info.filename, info.CRC) for info in z.infolist()]
+    return result
+
+
+def run(base: Path, config: Path, latency: float, jobs: int) -> tuple[float, int, dict]:
+    repacker = new_repacker(base, config)
+    filelist = repacker.filelist
+    with latency_fs(base, latency):
+        start = time.perf_counter()
+        if jobs <= 1:
+            errors = [repacker.repack(file_t) for file_t in filelist]
+        else:
+            errors = run_volumes_sync(
+                filelist, repacker.repack, jobs=jobs, io_workers=jobs * 2, prepare=repacker.prepare_async
+            )
+        elapsed = time.perf_counter() - start
+    failed = sum(1 for e in errors if e is not None)
+    return elapsed, failed, snapshot(base / "output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volumes", type=int, default=16, help="synthetic volumes to convert")
+    parser.add_argument("--pages", type=int, default=24, help="pages per volume")
+    parser.add_argument("--page-kb", type=int, default=256, help="size of each page in KiB")
+    parser.add_argument("--latency", type=float, default=2.0, help="injected latency per filesystem call in ms")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[2, 4, 8], help="concurrency levels to compare")
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="moe-netfs-") as tmp:
+        base = Path(tmp)
+        config = make_workspace(base, opts.volumes, opts.pages, opts.page_kb * 1024)
+        latency = opts.latency / 1000
+
+        print(f"{opts.volumes} volumes x {opts.pages} pages, {opts.page_kb} KiB/page, {opts.latency} ms latency")
+        print(f"{'jobs':<10}{'wall':>10}{'vol/s':>10}{'speedup':>10}{'failed':>8}")
+        baseline, failed, expected = run(base, config, latency, 1)
+        print(f"{'sequential':<10}{baseline:>9.2f}s{opts.volumes / baseline:>10.2f}{1.0:>9.2f}x{failed:>8}")
+        for jobs in opts.jobs:
+            elapsed, failed, outputs = run(base, config, latency, jobs)
+            note = "" if outputs == expected else "  (outputs differ)"
+            print(
+                f"{jobs:<10}{elapsed:>9.2f}s{opts.volumes / elapsed:>10.2f}{baseline / elapsed:>9.2f}x{failed:>8}{note}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+命令行冷启动基准：逐个子命令运行 `python -X importtime main.py ...`，
+统计导入耗时、导入模块数量与整体墙钟时间。
+
+用法：python benchmarks/startup.py [--repeat N] [--top K]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MAIN = ROOT / "main.py"
+
+importtime_pattern = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def make_workspace(base: Path) -> Path:
+    for name in ("input", "output", "cache"):
+        (base / name).mkdir(parents=True, exist_ok=True)
+    config = base / "config.toml"
+    config.write_text(
+        "[DEFAULT]\n"
+        f'input_dir = "{(base / "input").as_posix()}"\n'
+        f'output_dir = "{(base / "output").as_posix()}"\n'
+        f'cache_dir = "{(base / "cache").as_posix()}"\n'
+        "exclude = []\n"
+        "enable_extern_7z_use = false\n"
+        'extern_7z_executable_path = "7z"\n',
+        encoding="utf-8",
+    )
+    return config
+
+
+def parse_importtime(stderr: str) -> tuple[int, int, list[tuple[int, str]]]:
+    total_us = 0
+    count = 0
+    top_level: list[tuple[int, str]] = []
+    for line in stderr.splitlines():
+        matched = importtime_pattern.match(line)
+        if matched is None:
+            continue
+        self_us, cumulative_us, indent, name = matched.groups()
+        total_us += int(self_us)
+        count += 1
+        if not indent:
+            top_level.append((int(cumulative_us), name))
+    top_level.sort(reverse=True)
+    return total_us, count, top_level
+
+
+def run(args: list[str], importtime: bool) -> subprocess.CompletedProcess:
+    flags = ["-X", "importtime"] if importtime else []
+    return subprocess.run(
+        [sys.executable, *flags, str(MAIN), *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="wall-clock runs per command (best is reported)")
+    parser.add_argument("--top", type=int, default=5, help="slowest top-level imports to show per command")
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="moe-startup-") as tmp:
+        config = str(make_workspace(Path(tmp)))
+        commands: list[list[str]] = [
+            ["--help"],
+            ["version"],
+            ["list", config, "--no-verbose"],
+            ["clean", config, "--cache", "--no-verbose"],
+            ["verify", config],
+            ["convert", "--help"],
+        ]
+
+        print(f"{'command':<28}{'best wall':>12}{'imports':>10}{'import time':>14}")
+        for args in commands:
+            label = " ".join(a for a in args if a != config)
+            run(args, importtime=False)  # 预热文件系统缓存与字节码
+            best = float("inf")
+            for _ in range(opts.repeat):
+                start = time.perf_counter()
+                run(args, importtime=False)
+                best = min(best, time.perf_counter() - start)
+
+            total_us, count, top_level = parse_importtime(run(args, importtime=True).stderr)
+            print(f"{label:<28}{best * 1000:>10.1f}ms{count:>10}{total_us / 1000:>12.1f}ms")
+            for cumulative_us, name in top_level[: opts.top]:
+                print(f"{'':<4}{cumulative_us / 1000:>8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
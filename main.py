@@ -1,39 +1,42 @@
 # 主程序引用库
-import inspect  # noqa: I001
-import os
-from collections import deque
-from time import sleep
-from typing import Annotated
+# 除 typer 外的所有依赖均在各命令内部按需导入，以缩短 version / list / clean 等短命令的启动时间 20261019
+import os  # noqa: I001
+from functools import cached_property, partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated
 
 # 程序命令行帮助美化
 import typer
 from typer.main import get_command_name
 
-# 程序显示引用库
-from rich.console import Console
-from rich.layout import Layout
-from rich.live import Live
-from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.text import Text
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.panel import Panel
 
-# 程序异常打印库
-from rich.traceback import install
+    from moe_utils.terminal_ui import DynamicLogger, HeadlessLogger
 
-# 程序功能引用库
-from moe_utils.file_system import remove_if_exists
-from moe_utils.manga_repacker import ComicFile, Repacker
-from moe_utils.progress_bar import ProgressController, generate_progress_bar
-from moe_utils.taskbar_indicator import WinTaskbar, create_wintaskbar_object
-from moe_utils.terminal_ui import DynamicLogger, tui_log, tui_print, welcome_logo, welcome_panel
 
-install(show_locals=True)
+# 程序异常打印库，仅长时间运行的命令启用
+def install_traceback():
+    from rich.traceback import install
+
+    install(show_locals=True)
+
 
 ##############################
 
 cmd_help = {
     "list": "List manga files without executing the conversion",
     "convert": "Convert manga files with specified options",
+    "repack": "Convert a single manga file, optionally streaming the CBZ to stdout",
+    "watch": "Watch the input folder and convert new manga files continuously",
+    "merge": "Merge serial chapter files of the same series into combined CBZ files",
+    "to-epub": "Convert CBZ files back to fixed-layout EPUB files",
+    "coordinator": "Submit manga files to a shared work queue and track the progress of workers",
+    "worker": "Claim and convert manga files from a shared work queue",
+    "verify": "Verify converted CBZ files against their source EPUB files",
+    "retag": "Rewrite ComicInfo.xml and file names of converted CBZ files without repacking images",
+    "check": "Check the integrity of input files before conversion, optionally quarantining bad files",
     "clean": "Clean cache and/or output files",
     "version": "Display the version information of the application",
 }
@@ -50,38 +53,57 @@ class Application:
         self.typer_app = typer.Typer(no_args_is_help=True)
         self._init_cmd()
 
-        self.console = Console()
         self.verbose = True
 
-        self.dlogger = DynamicLogger(self.console)
+    # 控制台与日志对象延迟到首次使用时创建
+    @cached_property
+    def console(self) -> "Console":
+        from rich.console import Console
+
+        return Console()
+
+    @cached_property
+    def dlogger(self) -> "DynamicLogger | HeadlessLogger":
+        from moe_utils.terminal_ui import DynamicLogger
+
+        return DynamicLogger(self.console)
 
     def _init_cmd(self):
-        for method, func in inspect.getmembers(self, predicate=inspect.ismethod):
+        # 仅按名称查找命令方法，避免 inspect.getmembers 提前触发延迟属性
+        for method in dir(type(self)):
             if not method.startswith("cmd_"):
                 continue
 
             command_name = get_command_name(method.removeprefix("cmd_"))
-            self.typer_app.command(name=command_name, help=cmd_help.get(command_name, ""))(func)
+            self.typer_app.command(name=command_name, help=cmd_help.get(command_name, ""))(getattr(self, method))
 
     def _init_repacker(
         self,
         config: str,
         init_filelist_flag: bool = True,
         ignore_clean: bool = False,
-        dlogger: DynamicLogger | None = None,
+        dlogger: "DynamicLogger | HeadlessLogger | None" = None,
+        interactive: bool = True,
     ):
+        from moe_utils.manga_repacker import Repacker
+
         self.repacker = Repacker(verbose=self.verbose, console=self.console, dlogger=dlogger)
-        self.repacker.init_data(config_path=config, init_filelist_flag=init_filelist_flag, ignore_clean=ignore_clean)
+        self.repacker.init_data(
+            config_path=config,
+            init_filelist_flag=init_filelist_flag,
+            ignore_clean=ignore_clean,
+            interactive=interactive,
+        )
+
+    def _print(self, s: "str | Panel"):
+        from moe_utils.terminal_ui import tui_print
 
-    def _print(self, s: str | Panel):
         tui_print(self.console, s, verbose=self.verbose)
 
     def _log(self, s: str):
-        tui_log(self.console, s, verbose=self.verbose)
+        from moe_utils.terminal_ui import tui_log
 
-    def _update_log(self, new_line: str):
-        self._log_content.append(new_line)
-        self.layout["logs"].update(Text("\n".join(self._log_content)))
+        tui_log(self.console, s, verbose=self.verbose)
 
     def cmd_list(
         self,
@@ -171,6 +193,23 @@ class Application:
                 "--log-lines", "-l", help="Number of log lines to display", rich_help_panel="Override Options"
             ),
         ] = 8,
+        jobs: Annotated[
+            int,
+            typer.Option(
+                "--jobs",
+                "-j",
+                help="Number of volumes converted concurrently, useful when folders are on network shares",
+                rich_help_panel="Override Options",
+            ),
+        ] = 1,
+        json_events: Annotated[
+            bool,
+            typer.Option(
+                "--json/--no-json",
+                help="Enable/Disable headless mode emitting JSON progress events to stdout",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
     ):
         if quiet:
             logo = False
@@ -178,7 +217,36 @@ class Application:
             taskbar = False
             verbose = False
 
+        install_traceback()
+
+        import signal
+        from contextlib import nullcontext
+        from itertools import count
+        from typing import Callable
+
+        from rich.console import Console
+        from rich.layout import Layout
+        from rich.live import Live
+        from rich.prompt import Prompt
+
+        from moe_utils.file_system import remove_if_exists
+        from moe_utils.manga_repacker import ComicFile
+        from moe_utils.progress_bar import JsonProgressController, ProgressController, generate_progress_bar
+        from moe_utils.taskbar_indicator import WinTaskbar, create_wintaskbar_object
+        from moe_utils.terminal_ui import HeadlessLogger, JsonEventWriter, welcome_panel
+        from moe_utils.utils import format_size
+
+        # 无界面模式：stdout 仅输出 JSON 事件，其余提示信息转至 stderr 20261019
+        self.events: JsonEventWriter | None = None
+        if json_events:
+            logo = False
+            taskbar = False
+            self.console = Console(stderr=True)
+            self.events = JsonEventWriter()
+            self.dlogger = HeadlessLogger(self.events)
+
         self.verbose = verbose
+        self.live: Live | None = None
 
         self.pb = generate_progress_bar(console=self.console)
         self.win_tb: WinTaskbar | None = None
@@ -190,10 +258,13 @@ class Application:
             Layout(name="progress", size=1),
         )
 
-        self._log_content = deque(maxlen=log_lines)
+        # 中断标记：退出时若 SystemExit 被正在关闭的文件等抛出的异常顶替，后续卷据此停止 20261019
+        interrupted = False
 
         # 键盘Ctrl+C中断命令优化
         def keyboard_handler(signum, frame):
+            nonlocal interrupted
+            interrupted = True
             try:
                 # 重置进度条
                 if self.pb is not None:
@@ -203,18 +274,24 @@ class Application:
                 if self.live is not None:
                     self.live.stop()
 
-                # 选择是否保留已转换文件和缓存文件夹
-                self._log("[yellow]您手动中断了程序。")
-                resp_out = Prompt.ask("请选择是否保留已转换文件", choices=["y", "n"], default="y")
-                resp_cache = Prompt.ask("请选择是否保留缓存文件夹", choices=["y", "n"], default="n")
+                # 选择是否保留已转换文件和缓存文件夹，无界面模式下按默认选项处理
+                if self.events is not None:
+                    self.events.emit("interrupted")
+                    self.events.flush()
+                    resp_out, resp_cache = "y", "n"
+                else:
+                    self._log("[yellow]您手动中断了程序。")
+                    resp_out = Prompt.ask("请选择是否保留已转换文件", choices=["y", "n"], default="y")
+                    resp_cache = Prompt.ask("请选择是否保留缓存文件夹", choices=["y", "n"], default="n")
                 # 除打包阶段使用的当前电子书文件外，其他文件均可清除
                 # 之后会考虑将打包阶段作为独立进程，并在中断退出时结束
+                # 信号处理函数可能打断正持有线程池全局锁的主线程，此处只能逐个删除，不能再创建线程池 20261019
                 if resp_out == "n":
                     os.chdir(self.repacker.input_dir)  # 防止进程占用输出文件夹 20230429
-                    remove_if_exists(self.repacker.output_dir, recreate=True)
+                    remove_if_exists(self.repacker.output_dir, recreate=True, jobs=1)
                 if resp_cache != "y":
                     os.chdir(self.repacker.input_dir)  # 防止进程占用缓存文件夹 20230429
-                    remove_if_exists(self.repacker.cache_dir)
+                    remove_if_exists(self.repacker.cache_dir, jobs=1)
             finally:
                 exit(0)
 
@@ -223,22 +300,64 @@ class Application:
         def work(file_t: ComicFile):
             self.repacker.repack(file_t)
 
+        # 多卷并行时由 asyncio 编排，格式识别等阻塞调用在有界线程池中执行 20261019
+        def work_all(filelist: list[ComicFile], on_done: Callable[[int], None] | None = None):
+            if jobs <= 1:
+                for i, file_t in enumerate(filelist):
+                    if interrupted:
+                        exit(0)
+                    work(file_t)
+                    if on_done is not None:
+                        on_done(i)
+                return
+
+            from moe_utils.async_runner import run_volumes_sync
+
+            finished = count()
+            run_volumes_sync(
+                filelist,
+                self.repacker.repack,
+                jobs=jobs,
+                io_workers=jobs * 2,
+                prepare=self.repacker.prepare_async,
+                on_done=None if on_done is None else lambda *_: on_done(next(finished)),
+            )
+
         def _convert() -> bool:
             filelist = self.repacker.filelist
             if not progress:
-                for i, file_t in enumerate(filelist):
-                    work(file_t)
+                work_all(filelist)
             else:
-                with ProgressController(
-                    pb=self.pb,
-                    tb=self.win_tb,
-                    description="Kmoe",
+                if self.events is not None:
+                    pctrl = JsonProgressController(self.events, description="Kmoe", total=len(filelist))
+                else:
+                    pctrl = ProgressController(
+                        pb=self.pb,
+                        tb=self.win_tb,
+                        description="Kmoe",
+                        total=len(filelist),
+                    )
+                with pctrl:
+                    work_all(filelist, pctrl.update)
+
+            if self.events is not None:
+                for file_t in self.repacker.faillist:
+                    self.events.emit("failed", file=str(file_t.relative_path))
+                self.events.emit(
+                    "done",
                     total=len(filelist),
-                ) as pctrl:
-                    pctrl: ProgressController
-                    for i, file_t in enumerate(filelist):
-                        work(file_t)
-                        pctrl.update(i)
+                    failed=len(self.repacker.faillist),
+                    metrics=self.repacker.metrics.to_dict(),
+                )
+                return False
+
+            self._log(f"[cyan]📊 运行统计：{self.repacker.metrics.summary()}")
+            if self.repacker.deduper is not None:
+                total = self.repacker.deduper.total
+                self._log(
+                    f"[cyan]📊 重复页面：{total.duplicates} / {total.pages} 页（{format_size(total.bytes_duplicated)}），"
+                    f"已删除 {total.dropped} 页，节省 {format_size(total.bytes_dropped)}"
+                )
 
             if self.repacker.faillist:
                 self._print("[yellow]提示：以下文件转换失败！")
@@ -250,8 +369,6 @@ class Application:
             return False
 
         # 优化键盘中断命令
-        import signal
-
         signal.signal(signal.SIGINT, keyboard_handler)
         signal.signal(signal.SIGTERM, keyboard_handler)
 
@@ -259,8 +376,10 @@ class Application:
         if logo:
             self._print(welcome_panel)
 
-        # 初始化转换器对象
-        self._init_repacker(config, dlogger=self.dlogger)
+        # 初始化转换器对象；无界面模式下不询问是否清空文件夹，避免在 cron/CI 中因无法交互而中止
+        headless = self.events is not None
+        self._init_repacker(config, ignore_clean=headless, dlogger=self.dlogger, interactive=not headless)
+        self.repacker.keep_cache = keep_cache
 
         # 增加 docker build 风格状态显示 20250131
         self.dlogger.init_log_layout(self.layout["logs"])
@@ -269,25 +388,673 @@ class Application:
         self.layout["status"].update(self.status)
         self.layout["progress"].update(self.pb)
 
-        with Live(self.layout, auto_refresh=True) as self.live:
+        if self.events is None:
+            self.live = Live(self.layout, auto_refresh=True)
+
+        with self.live if self.live is not None else nullcontext():
             self.status.update("[yellow]⏳ 开始初始化程序 ...")
             if taskbar:
                 self.win_tb = create_wintaskbar_object()
 
             self.status.update("[yellow]⏳ 开始提取图片并打包文件...")
 
-            pause = _convert()
+            # Ctrl+C 时 keyboard_handler 以 exit(0) 退出，同样需要保存重复页面索引并释放进程池 20261019
+            try:
+                pause = _convert()
+            finally:
+                self.repacker.close()
 
-            if not keep_cache:
+            workspace_cache = self.repacker.workspace_cache
+            if not keep_cache and workspace_cache is not None and workspace_cache.reuse:
+                # 受管理的缓存只按限制淘汰，保留最近使用的工作目录 20261019
+                self.status.update("[yellow]⏳ 开始整理缓存文件...")
+                freed = self.repacker.trim_cache()
+                self._log(
+                    f"[cyan]📊 缓存：保留 {len(workspace_cache)} 卷（{format_size(workspace_cache.total_size)}），"
+                    f"本次淘汰释放 {format_size(freed)}"
+                )
+            elif not keep_cache:
+                # 缓存目录改名后在后台删除，不阻塞本次退出前的收尾与下一次转换
                 self.status.update("[yellow]⏳ 开始清理缓存文件...")
-                self.repacker.clean_cache()
+                self.repacker.clean_cache(background=True)
 
             self.dlogger.update_log("[green]✅ 所有转换任务完成！")
 
-            if pause:
+            if self.events is not None:
+                self.events.flush()
+            elif pause:
                 self.status.update("[yellow]请按任意键继续...")
                 self.console.input("")
 
+    # 单文件转换，可将 CBZ 直接写入标准输出供下游管道读取 20261019
+    def cmd_repack(
+        self,
+        epub: Annotated[str, typer.Argument(..., help="EPUB file to convert")],
+        config: Annotated[str, typer.Option("--config", "-c", help="Config file path")] = "config.toml",
+        to_stdout: Annotated[
+            bool,
+            typer.Option("--to-stdout", help="Write the CBZ to stdout instead of the output folder"),
+        ] = False,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+    ):
+        import sys
+
+        from rich.console import Console
+
+        from moe_utils.manga_repacker import ComicFile
+        from moe_utils.terminal_ui import DynamicLogger
+
+        # 标准输出只用于传输 CBZ 数据，其余信息全部写入 stderr
+        self.console = Console(stderr=True)
+        self.dlogger = DynamicLogger(self.console)
+        self.verbose = verbose
+
+        if to_stdout and sys.stdout.isatty():
+            self.console.print("[red]错误[/]：标准输出是终端，拒绝写入二进制数据，请重定向到文件或管道。")
+            raise typer.Exit(code=2)
+
+        epub_path = Path(epub).resolve()
+        if not epub_path.is_file():
+            self.console.print(f"[red]错误[/]：{epub} 不存在。")
+            raise typer.Exit(code=2)
+
+        # 写入标准输出时通常由脚本调用，不询问是否清空目录 20261019
+        self._init_repacker(
+            config, init_filelist_flag=False, ignore_clean=to_stdout, dlogger=self.dlogger, interactive=not to_stdout
+        )
+        file_t = ComicFile(
+            file_path=epub_path,
+            in_dir=epub_path.parent,
+            out_dir=Path(self.repacker.output_dir),
+            cache_dir=Path(self.repacker.cache_dir),
+        )
+
+        if to_stdout:
+            # 与写入输出文件夹时使用相同的配置与图片处理阶段，标准输出只传输 CBZ 数据
+            try:
+                result = self.repacker.repack_to_stream(file_t, sys.stdout.buffer)
+            except Exception as e:
+                self.console.print(f"[red]⚠️ 错误[/]：{e}")
+                raise typer.Exit(code=1)
+            finally:
+                self.repacker.close()
+            if self.verbose:
+                self.console.print(
+                    f"[green]✅ {result.comic_name}.cbz，共 {result.page_count} 页，{result.bytes_written} 字节"
+                )
+            return
+
+        file_t.dst_file.parent.mkdir(parents=True, exist_ok=True)
+        self.repacker.repack(file_t)
+        self.repacker.close()
+        if self.repacker.faillist:
+            raise typer.Exit(code=1)
+
+    # 监视模式：常驻运行，转换器、7z 检测结果与目录缓存在各次事件间复用 20261019
+    def cmd_watch(
+        self,
+        config: Annotated[str, typer.Argument(..., help="Config file path")] = "config.toml",
+        jobs: Annotated[
+            int,
+            typer.Option("--jobs", "-j", help="Number of conversion workers", rich_help_panel="Override Options"),
+        ] = 2,
+        interval: Annotated[
+            float,
+            typer.Option("--interval", help="Polling interval in seconds", rich_help_panel="Override Options"),
+        ] = 1.0,
+        settle: Annotated[
+            float,
+            typer.Option(
+                "--settle",
+                help="Seconds a file must stay unchanged before it is converted",
+                rich_help_panel="Override Options",
+            ),
+        ] = 2.0,
+        existing: Annotated[
+            bool,
+            typer.Option(
+                "--existing/--no-existing",
+                "-e/-E",
+                help="Enable/Disable converting files already present when watching starts",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+    ):
+        self.verbose = verbose
+
+        install_traceback()
+
+        from concurrent.futures import Future, ThreadPoolExecutor
+
+        from moe_utils.folder_watcher import FolderWatcher
+
+        self._init_repacker(config, init_filelist_flag=False, dlogger=self.dlogger)
+        input_dir = Path(self.repacker.input_dir)
+
+        watcher = FolderWatcher(
+            input_dir,
+            ext=self.repacker.input_suffixes,
+            exclude=self.repacker.exclude_list,
+            interval=interval,
+            settle_time=settle,
+        )
+        if not existing:
+            watcher.prime()
+
+        def work(file_path: Path):
+            file_t = self.repacker.make_comic_file(file_path)
+            self.repacker.repack(file_t)
+
+        # 转换失败由 repack 记录，此处报告其之外的异常（如建立文件对象失败），避免在线程池中被静默丢弃 20261019
+        def report(file_path: Path, future: Future):
+            e = None if future.cancelled() else future.exception()
+            if e is not None:
+                self._log(f"[red]⚠️ 错误[/]：{file_path.relative_to(input_dir)} => {e}")
+
+        self._log(f"[green]👀 开始监视 {input_dir}，按 Ctrl+C 退出。")
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            try:
+                for file_path in watcher.watch():
+                    self._log(f"[yellow]⏳ 发现新文档 {file_path.relative_to(input_dir)}")
+                    pool.submit(work, file_path).add_done_callback(partial(report, file_path))
+            except KeyboardInterrupt:
+                watcher.stop()
+                self._log("[yellow]已停止监视，正在等待进行中的任务完成...")
+        self.repacker.close()
+
+    # 合并模式：同一系列的连载话不经解压直接合并为一个或若干个 CBZ 20261019
+    def cmd_merge(
+        self,
+        config: Annotated[str, typer.Argument(..., help="Config file path")] = "config.toml",
+        chunk: Annotated[
+            int,
+            typer.Option(
+                "--chunk",
+                "-n",
+                help="Number of chapter files per merged CBZ (0 for all)",
+                rich_help_panel="Override Options",
+            ),
+        ] = 0,
+        serial_only: Annotated[
+            bool,
+            typer.Option(
+                "--serial-only/--all-types",
+                help="Merge only serial chapters, or every book type",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+        jobs: Annotated[
+            int,
+            typer.Option("--jobs", "-j", help="Number of parallel workers", rich_help_panel="Override Options"),
+        ] = 4,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+    ):
+        from moe_utils.progress_bar import ProgressController, generate_progress_bar
+        from moe_utils.series_merger import load_entries, merge_groups, plan_merge_groups
+
+        self.verbose = verbose
+        self._init_repacker(config, ignore_clean=True)
+
+        loaded = load_entries(self.repacker.filelist, jobs=jobs)
+        unreadable = [result for result in loaded if result.status == "failed"]
+        skipped = sum(1 for result in loaded if result.status == "skipped")
+        if skipped or unreadable:
+            self.console.print(f"[cyan]📊 共 {len(loaded)} 个文件：跳过 {skipped}，无法读取 {len(unreadable)}")
+        for result in unreadable:
+            self.console.print(f"[cyan]{result.comic_file.relative_path}[/]", overflow="fold")
+            self.console.print(f"    [red]✗[/] {result.error}", overflow="fold")
+
+        entries = [result.entry for result in loaded if result.entry is not None]
+        groups = list(plan_merge_groups(entries, chunk=chunk, serial_only=serial_only))
+        if not groups:
+            self.console.print("[yellow]提示：没有可以合并的文件。")
+            if unreadable:
+                raise typer.Exit(code=1)
+            return
+
+        failed = []
+        pb = generate_progress_bar(console=self.console)
+        with ProgressController(pb=pb, tb=None, description="Merge", total=len(groups)) as pctrl:
+            for i, result in enumerate(merge_groups(groups, jobs=jobs)):
+                if result.ok:
+                    self._log(
+                        f"[green]✅ {result.cbz_file.name}[/]：{len(result.group.entries)} 个文件，共 {result.page_count} 页"
+                    )
+                else:
+                    failed.append(result)
+                pctrl.update(i)
+
+        if failed:
+            self.console.print(f"[yellow]提示：{len(failed)} / {len(groups)} 个合并任务失败！")
+            for result in failed:
+                self.console.print(f"[cyan]{result.cbz_file.name}[/]：[red]{result.error}", overflow="fold")
+        if failed or unreadable:
+            raise typer.Exit(code=1)
+
+    # 将 CBZ 转回固定版式 EPUB，供只支持 EPUB 的阅读器使用，无需配置文件 20261019
+    def cmd_to_epub(
+        self,
+        source: Annotated[str, typer.Argument(..., help="CBZ file or folder containing CBZ files")],
+        output: Annotated[
+            str,
+            typer.Option(
+                "--output",
+                "-o",
+                help="Output folder (default: next to each CBZ file)",
+                rich_help_panel="Override Options",
+            ),
+        ] = "",
+        jobs: Annotated[
+            int,
+            typer.Option("--jobs", "-j", help="Number of parallel workers", rich_help_panel="Override Options"),
+        ] = 4,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+    ):
+        from moe_utils.epub_builder import build_epubs, plan_epub_tasks
+        from moe_utils.progress_bar import ProgressController, generate_progress_bar
+
+        self.verbose = verbose
+
+        source_path = Path(source).resolve()
+        if not source_path.exists():
+            self.console.print(f"[red]错误[/]：{source} 不存在。")
+            raise typer.Exit(code=2)
+
+        tasks = plan_epub_tasks(source_path, Path(output).resolve() if output else None)
+        if not tasks:
+            self.console.print("[yellow]提示：没有找到 CBZ 文件。")
+            return
+
+        failed = []
+        pb = generate_progress_bar(console=self.console)
+        with ProgressController(pb=pb, tb=None, description="EPUB", total=len(tasks)) as pctrl:
+            for i, result in enumerate(build_epubs(tasks, jobs=jobs)):
+                if result.ok:
+                    self._log(f"[green]✅ {result.task.epub_file.name}[/]：共 {result.page_count} 页")
+                else:
+                    failed.append(result)
+                pctrl.update(i)
+
+        if failed:
+            self.console.print(f"[yellow]提示：{len(failed)} / {len(tasks)} 个文件转换失败！")
+            for result in failed:
+                self.console.print(f"[cyan]{result.task.cbz_file.name}[/]：[red]{result.error}", overflow="fold")
+            raise typer.Exit(code=1)
+
+    # 分布式转换：协调节点将任务写入共享目录，各节点上的工作进程领取并转换 20261019
+    # 各节点使用各自的配置文件，任务中只记录相对于输入目录的路径
+    def cmd_coordinator(
+        self,
+        queue_dir: Annotated[str, typer.Argument(..., help="Shared work queue folder")],
+        config: Annotated[str, typer.Option("--config", "-c", help="Config file path")] = "config.toml",
+        lease: Annotated[
+            float,
+            typer.Option(
+                "--lease",
+                help="Seconds without heartbeat before a task is requeued",
+                rich_help_panel="Override Options",
+            ),
+        ] = 300.0,
+        interval: Annotated[
+            float,
+            typer.Option("--interval", help="Polling interval in seconds", rich_help_panel="Override Options"),
+        ] = 1.0,
+        reset: Annotated[
+            bool,
+            typer.Option("--reset", help="Clear all previous tasks and results", rich_help_panel="Override Options"),
+        ] = False,
+        wait: Annotated[
+            bool,
+            typer.Option(
+                "--wait/--no-wait",
+                help="Wait for workers and show progress after submitting",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+    ):
+        import time
+        from collections import Counter
+
+        from moe_utils.progress_bar import ProgressController, generate_progress_bar
+        from moe_utils.work_queue import WorkItem, WorkQueue
+
+        self.verbose = verbose
+        self._init_repacker(config, ignore_clean=True)
+
+        queue = WorkQueue(Path(queue_dir))
+        queue.init(reset=reset)
+        items = [WorkItem.from_relative_path(file_t.relative_path) for file_t in self.repacker.filelist]
+        submitted = queue.submit(items)
+        queue.close()
+        self._log(f"[green]✅ 已提交 {submitted} 个任务（共 {len(items)} 个文件）。")
+        if not wait:
+            return
+
+        total = len(items)
+        reported = 0
+        pb = generate_progress_bar(console=self.console)
+        with ProgressController(pb=pb, tb=None, description="Queue", total=total) as pctrl:
+            while reported < total:
+                requeued = queue.requeue_stale(lease)
+                if requeued:
+                    self._log(f"[yellow]警告：{requeued} 个任务心跳超时，已重新放回队列。")
+                finished = min(queue.counts().finished, total)
+                while reported < finished:
+                    pctrl.update(reported)
+                    reported += 1
+                if reported < total:
+                    time.sleep(interval)
+
+        workers = Counter(result.get("worker", "?") for result in queue.results("done"))
+        for worker, count in workers.most_common():
+            self._log(f"[cyan]📊 {worker}[/]：完成 {count} 个任务")
+
+        failed = list(queue.results("failed"))
+        if failed:
+            self.console.print(f"[yellow]提示：以下 {len(failed)} 个文件转换失败！")
+            for result in failed:
+                # 任务文件损坏时只有任务编号
+                label = result.get("relative_path") or result["id"]
+                self.console.print(
+                    f"[cyan]{label}[/]（{result.get('worker')}）：[red]{result.get('error')}",
+                    overflow="fold",
+                )
+            raise typer.Exit(code=1)
+
+    def cmd_worker(
+        self,
+        queue_dir: Annotated[str, typer.Argument(..., help="Shared work queue folder")],
+        config: Annotated[str, typer.Option("--config", "-c", help="Config file path")] = "config.toml",
+        name: Annotated[
+            str,
+            typer.Option(
+                "--name", help="Worker name shown in results (default: host-pid)", rich_help_panel="Override Options"
+            ),
+        ] = "",
+        poll: Annotated[
+            float,
+            typer.Option("--poll", help="Polling interval in seconds when idle", rich_help_panel="Override Options"),
+        ] = 1.0,
+        heartbeat: Annotated[
+            float,
+            typer.Option("--heartbeat", help="Heartbeat interval in seconds", rich_help_panel="Override Options"),
+        ] = 30.0,
+        exit_when_empty: Annotated[
+            bool,
+            typer.Option(
+                "--exit-when-empty/--keep-alive",
+                help="Exit once the queue is closed and drained, or keep waiting for new tasks",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = True,
+    ):
+        import time
+
+        from moe_utils.retry_policy import classify_error
+        from moe_utils.work_queue import Heartbeat, WorkQueue, default_worker_name
+
+        self.verbose = verbose
+        install_traceback()
+
+        self._init_repacker(config, init_filelist_flag=False, dlogger=self.dlogger)
+        input_dir = Path(self.repacker.input_dir)
+        queue = WorkQueue(Path(queue_dir))
+        queue.init()
+        worker = name or default_worker_name()
+        self._log(f"[green]👷 工作节点 {worker} 已启动，队列：{queue_dir}")
+
+        try:
+            while True:
+                item = queue.claim(worker)
+                if item is None:
+                    if exit_when_empty and queue.closed and queue.counts().pending == 0:
+                        break
+                    time.sleep(poll)
+                    continue
+
+                self._log(f"[yellow]⏳ 领取任务 {item.relative_path}（第 {item.attempts} 次）")
+                file_t = self.repacker.make_comic_file(input_dir / item.relative_path)
+                start = time.monotonic()
+                with Heartbeat(queue, item, heartbeat):
+                    error = self.repacker.repack(file_t)
+                if error is None:
+                    queue.complete(item, worker, time.monotonic() - start)
+                else:
+                    queue.fail(item, worker, str(error), classify_error(error).category)
+        except KeyboardInterrupt:
+            self._log("[yellow]工作节点已中断，未完成的任务将在租约超时后由其他节点重新领取。")
+        finally:
+            self.repacker.close()
+
+        self._log(f"[cyan]📊 运行统计：{self.repacker.metrics.summary()}")
+
+    # 仅比对中央目录的快速校验 20261019
+    def cmd_verify(
+        self,
+        config: Annotated[str, typer.Argument(..., help="Config file path")] = "config.toml",
+        jobs: Annotated[
+            int,
+            typer.Option("--jobs", "-j", help="Number of parallel workers", rich_help_panel="Override Options"),
+        ] = 8,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+    ):
+        from moe_utils.cbz_verifier import VerifyOptions, verify_comic_files
+        from moe_utils.progress_bar import ProgressController, generate_progress_bar
+
+        self.verbose = verbose
+        self._init_repacker(config, ignore_clean=True)
+        filelist = self.repacker.filelist
+        # 按配置中启用的图片处理阶段放宽相应的检查 20261019
+        options = VerifyOptions.from_config(self.repacker.pipeline_config)
+
+        failed = []
+        pb = generate_progress_bar(console=self.console)
+        with ProgressController(pb=pb, tb=None, description="Verify", total=len(filelist)) as pctrl:
+            for i, result in enumerate(verify_comic_files(filelist, jobs=jobs, options=options)):
+                if not result.ok:
+                    failed.append(result)
+                pctrl.update(i)
+
+        if not failed:
+            self.console.print(f"[green]✅ 全部 {len(filelist)} 个文件校验通过。")
+            return
+
+        self.console.print(f"[yellow]提示：{len(failed)} / {len(filelist)} 个文件校验未通过！")
+        for result in failed:
+            self.console.print(f"[cyan]{result.comic_file.relative_path}[/]", overflow="fold")
+            for error in result.errors:
+                self.console.print(f"    [red]✗[/] {error}", overflow="fold")
+        raise typer.Exit(code=1)
+
+    # 元数据规则修正后只重写 ComicInfo.xml 并重命名 CBZ，图片数据原样复制 20261019
+    def cmd_retag(
+        self,
+        config: Annotated[str, typer.Argument(..., help="Config file path")] = "config.toml",
+        jobs: Annotated[
+            int,
+            typer.Option("--jobs", "-j", help="Number of parallel workers", rich_help_panel="Override Options"),
+        ] = 8,
+        dry_run: Annotated[
+            bool,
+            typer.Option(
+                "--dry-run/--no-dry-run",
+                help="Only report the files that would be updated or renamed",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+    ):
+        from collections import Counter
+
+        from moe_utils.progress_bar import ProgressController, generate_progress_bar
+        from moe_utils.retagger import retag_comic_files
+
+        self.verbose = verbose
+        self._init_repacker(config, ignore_clean=True)
+        filelist = self.repacker.filelist
+
+        results = []
+        pb = generate_progress_bar(console=self.console)
+        with ProgressController(pb=pb, tb=None, description="Retag", total=len(filelist)) as pctrl:
+            for i, result in enumerate(retag_comic_files(filelist, jobs=jobs, dry_run=dry_run)):
+                results.append(result)
+                pctrl.update(i)
+
+        counts = Counter(result.status for result in results)
+        prefix = "（试运行）" if dry_run else ""
+        self.console.print(
+            f"[cyan]📊 {prefix}共 {len(results)} 个文件：更新 {counts['updated']}，改名 {counts['renamed']}，"
+            f"未变化 {counts['unchanged']}，跳过 {counts['skipped']}，失败 {counts['failed']}"
+        )
+        for result in results:
+            if result.status == "renamed" and (verbose or dry_run):
+                self.console.print(f"    [green]→[/] {result.old_cbz.name} => {result.new_cbz.name}", overflow="fold")
+            elif result.status == "updated" and verbose:
+                self.console.print(f"    [green]✓[/] {result.new_cbz.name}", overflow="fold")
+            elif not result.ok:
+                self.console.print(f"[cyan]{result.comic_file.relative_path}[/]", overflow="fold")
+                self.console.print(f"    [red]✗[/] {result.error}", overflow="fold")
+        if counts["failed"]:
+            raise typer.Exit(code=1)
+
+    # 转换前的快速健康检查，只读取中央目录与 OPF 20261019
+    def cmd_check(
+        self,
+        config: Annotated[str, typer.Argument(..., help="Config file path")] = "config.toml",
+        jobs: Annotated[
+            int,
+            typer.Option("--jobs", "-j", help="Number of parallel workers", rich_help_panel="Override Options"),
+        ] = 8,
+        quarantine_bad: Annotated[
+            bool,
+            typer.Option(
+                "--quarantine/--no-quarantine",
+                help="Move files that fail the check into the configured quarantine folder",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+        verbose: Annotated[
+            bool,
+            typer.Option(
+                "--verbose/--no-verbose",
+                "-v/-V",
+                help="Enable/Disable verbose output during the application execution",
+                rich_help_panel="Override Options",
+            ),
+        ] = False,
+    ):
+        from collections import Counter
+
+        from moe_utils.archive_check import check_archives, quarantine
+        from moe_utils.progress_bar import ProgressController, generate_progress_bar
+        from moe_utils.utils import format_size
+
+        self.verbose = verbose
+        self._init_repacker(config, ignore_clean=True)
+        filelist = self.repacker.filelist
+        quarantine_dir = self.repacker.quarantine_dir
+        if quarantine_bad and quarantine_dir is None:
+            self.console.print("[red]错误[/]：配置文件的 [CHECK] 部分未设置 quarantine_dir。")
+            raise typer.Exit(code=2)
+
+        results = []
+        pb = generate_progress_bar(console=self.console)
+        with ProgressController(pb=pb, tb=None, description="Check", total=len(filelist)) as pctrl:
+            for i, result in enumerate(check_archives([file_t.src_file for file_t in filelist], jobs=jobs)):
+                results.append(result)
+                pctrl.update(i)
+
+        kinds = Counter(result.input_format.kind for result in results if result.input_format is not None)
+        self.console.print(
+            f"[cyan]📊 共 {len(results)} 个文件（"
+            + "、".join(f"{kind} × {count}" for kind, count in kinds.most_common())
+            + f"），{sum(r.entries for r in results)} 个条目，"
+            f"压缩后 {format_size(sum(r.compressed_size for r in results))}，"
+            f"解压后 {format_size(sum(r.declared_size for r in results))}"
+        )
+
+        failed = [(file_t, result) for file_t, result in zip(filelist, results) if not result.ok]
+        if not failed:
+            self.console.print(f"[green]✅ 全部 {len(results)} 个文件检查通过。")
+            return
+
+        self.console.print(f"[yellow]提示：{len(failed)} / {len(results)} 个文件未通过检查！")
+        for file_t, result in failed:
+            self.console.print(f"[cyan]{file_t.relative_path}[/]", overflow="fold")
+            for error in result.errors:
+                self.console.print(f"    [red]✗[/] {error}", overflow="fold")
+            if quarantine_bad:
+                target = quarantine(file_t.src_file, quarantine_dir, file_t.relative_path, result.reason)
+                self.console.print(f"    [yellow]→[/] 已移至 {target}", overflow="fold")
+        raise typer.Exit(code=1)
+
     def cmd_clean(
         self,
         config: Annotated[str, typer.Argument(..., help="Config file path")] = "config.toml",
@@ -305,6 +1072,8 @@ class Application:
             ),
         ] = True,
     ):
+        from moe_utils.utils import format_size
+
         self.verbose = verbose
 
         with self.console.status("[yellow]⏳ 开始初始化程序 ...") as status:
@@ -314,25 +1083,25 @@ class Application:
                 cache = True
                 output = True
 
+            # 各目录先全部改名移开，再并行删除并等待结果 20261019
+            tasks = []
             if cache:
-                status.update("[yellow]⏳ 开始清理缓存文件...")
-                self.repacker.clean_cache()
-                sleep(2)
-                self._log("[green]✅ 已完成缓存文件清理。")
-
+                tasks.append(("缓存", self.repacker.clean_cache(background=True)))
             if input:
-                status.update("[yellow]⏳ 开始清理输入文件...")
-                self.repacker.clean_input()
-                sleep(2)
-                self._log("[green]✅ 已完成输入文件清理。")
-
+                tasks.append(("输入", self.repacker.clean_input(background=True)))
             if output:
-                status.update("[yellow]⏳ 开始清理输出文件...")
-                self.repacker.clean_output()
-                sleep(2)
-                self._log("[green]✅ 已完成输出文件清理。")
+                tasks.append(("输出", self.repacker.clean_output(background=True)))
+
+            for name, task in tasks:
+                status.update(f"[yellow]⏳ 正在清理{name}文件...")
+                stats = task.wait()
+                self._log(f"[green]✅ 已完成{name}文件清理[/]，释放 {stats.files} 个文件、{format_size(stats.bytes)}。")
+                if stats.errors:
+                    self._log(f"[yellow]警告：{len(stats.errors)} 个项目删除失败，例如 {stats.errors[0]}")
 
     def cmd_version(self):
+        from moe_utils.terminal_ui import welcome_logo
+
         self._print(welcome_logo)
         self._print(
             f"𝒎​𝒐​𝒙​𝒎​𝒐​𝒆​ ​𝒓​𝒆​𝒑​𝒂​𝒄​𝒌​𝒆​𝒓 [bold cyan]v{self.app_version}[/], by [bold cyan]{self.author}[/], [bold cyan]{self.year}[/]",
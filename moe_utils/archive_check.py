@@ -0,0 +1,165 @@
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from lxml import etree
+
+from .comic_info import opf_ns_map
+from .format_detector import InputFormat, UnsupportedFormatError, detect_archive, detect_image_dir
+from .repack_core import read_opf_manifest
+
+supported_compress_types: frozenset[int] = frozenset(
+    {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA}
+)
+
+# 同类问题只列出前几项
+max_listed_entries: int = 5
+
+reason_suffix: str = ".reason.txt"
+
+
+class CorruptArchiveError(zipfile.BadZipFile):
+    pass
+
+
+class ArchiveCheck(NamedTuple):
+    path: Path
+    input_format: InputFormat | None
+    entries: int
+    compressed_size: int
+    declared_size: int
+    errors: list[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def reason(self) -> str:
+        return "；".join(self.errors)
+
+
+def _listed(names: list[str]) -> str:
+    text = "、".join(names[:max_listed_entries])
+    if len(names) > max_listed_entries:
+        text += f" 等 {len(names)} 项"
+    return text
+
+
+def _local_name_length(info: zipfile.ZipInfo) -> int:
+    encoding = "utf-8" if info.flag_bits & 0x800 else "cp437"
+    try:
+        return len(info.orig_filename.encode(encoding))
+    except UnicodeEncodeError:
+        return len(info.orig_filename.encode("utf-8"))
+
+
+# 按本地文件头偏移排序，逐项检查声明的压缩大小是否越过下一条目或中央目录的起始位置
+# 文件截断、拼接错误或中央目录损坏时，声明的大小与实际布局必然矛盾
+def _check_entries(zip_ref: zipfile.ZipFile) -> list[str]:
+    errors: list[str] = []
+    infolist = sorted(zip_ref.infolist(), key=lambda info: info.header_offset)
+    next_offsets = [info.header_offset for info in infolist[1:]] + [zip_ref.start_dir]
+
+    overflowed: list[str] = []
+    encrypted: list[str] = []
+    unsupported: list[str] = []
+    for info, next_offset in zip(infolist, next_offsets):
+        end = info.header_offset + zipfile.sizeFileHeader + _local_name_length(info) + info.compress_size
+        if end > next_offset:
+            overflowed.append(info.filename)
+        if info.flag_bits & 0x1:
+            encrypted.append(info.filename)
+        if info.compress_type not in supported_compress_types:
+            unsupported.append(info.filename)
+
+    if overflowed:
+        errors.append(f"条目声明的大小超出压缩包范围（文件可能被截断）：{_listed(overflowed)}")
+    if encrypted:
+        errors.append(f"存在加密条目：{_listed(encrypted)}")
+    if unsupported:
+        errors.append(f"存在不支持的压缩方式：{_listed(unsupported)}")
+    return errors
+
+
+# 检查 OPF 中 manifest 引用的网页与图片以及 spine 引用的条目是否存在，只读取 OPF 本身
+def _check_opf(zip_ref: zipfile.ZipFile, opf_name: str) -> list[str]:
+    try:
+        root, manifest = read_opf_manifest(zip_ref, opf_name)
+    except KeyError:
+        return [f"缺少 {opf_name}"]
+    except etree.XMLSyntaxError as e:
+        return [f"{opf_name} 格式错误：{e}"]
+
+    errors: list[str] = []
+    missing = [
+        href
+        for href, media_type in manifest.values()
+        if (media_type.startswith("image/") or media_type in ("application/xhtml+xml", "text/html"))
+        and href not in zip_ref.NameToInfo
+    ]
+    if missing:
+        errors.append(f"{opf_name} 引用的文件不存在：{_listed(missing)}")
+
+    idrefs = [itemref.get("idref", "") for itemref in root.iterfind("opf:spine/opf:itemref", opf_ns_map)]
+    if not idrefs:
+        errors.append(f"{opf_name} 的 spine 中没有页面")
+    unknown = [idref for idref in idrefs if idref not in manifest]
+    if unknown:
+        errors.append(f"{opf_name} 的 spine 引用了 manifest 中不存在的项目：{_listed(unknown)}")
+    return errors
+
+
+# 转换前的快速检查：校验中央目录结束记录与各条目的声明大小，并检查必需条目是否存在 20261019
+# 除 OPF 外不读取任何条目数据；暂时性 I/O 错误直接抛出，由调用方决定是否重试
+def check_archive(path: Path) -> ArchiveCheck:
+    if path.is_dir():
+        input_format = detect_image_dir(path)
+        errors = [] if input_format is not None else ["不是只包含图片的文件夹"]
+        return ArchiveCheck(path, input_format, 0, 0, 0, errors)
+
+    try:
+        zip_ref = zipfile.ZipFile(path, "r")
+    except zipfile.BadZipFile as e:
+        return ArchiveCheck(path, None, 0, 0, 0, [f"无法读取中央目录（文件可能被截断）：{e}"])
+
+    with zip_ref:
+        infolist = zip_ref.infolist()
+        compressed_size = sum(info.compress_size for info in infolist)
+        declared_size = sum(info.file_size for info in infolist)
+        errors = _check_entries(zip_ref)
+
+        input_format: InputFormat | None = None
+        try:
+            input_format = detect_archive(zip_ref)
+        except UnsupportedFormatError as e:
+            errors.append(str(e))
+
+        if input_format is not None and input_format.opf_name:
+            errors.extend(_check_opf(zip_ref, input_format.opf_name))
+
+    return ArchiveCheck(path, input_format, len(infolist), compressed_size, declared_size, errors)
+
+
+def _check_archive_safely(path: Path) -> ArchiveCheck:
+    try:
+        return check_archive(path)
+    except OSError as e:
+        return ArchiveCheck(path, None, 0, 0, 0, [f"无法读取文件：{e}"])
+
+
+# 并行检查，结果保持原有顺序
+def check_archives(paths: list[Path], jobs: int = 8) -> Iterator[ArchiveCheck]:
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        yield from pool.map(_check_archive_safely, paths)
+
+
+# 将未通过检查的文件按相对路径移入隔离目录，并在旁边写入原因
+def quarantine(path: Path, quarantine_dir: Path, relative_path: Path, reason: str) -> Path:
+    target = quarantine_dir / relative_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(path, target)
+    target.with_name(f"{target.name}{reason_suffix}").write_text(f"{reason}\n", encoding="utf-8")
+    return target
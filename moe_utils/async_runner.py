@@ -0,0 +1,91 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+P = TypeVar("P")
+
+
+# 阻塞的文件系统调用统一交给有界线程池执行，事件循环本身从不等待 I/O 20261019
+# 输入输出位于 SMB/NFS 等高延迟共享目录时，可同时发出多个请求而不必逐个等待往返
+class BlockingIO:
+    def __init__(self, max_workers: int = 16):
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="moe-io")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_details):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def call(self, func: Callable[..., R], /, *args, **kwargs) -> R:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def exists(self, path: str | os.PathLike) -> bool:
+        return await self.call(os.path.exists, path)
+
+    async def is_dir(self, path: str | os.PathLike) -> bool:
+        return await self.call(os.path.isdir, path)
+
+    async def stat(self, path: str | os.PathLike) -> os.stat_result:
+        return await self.call(os.stat, path)
+
+    async def makedirs(self, path: str | os.PathLike):
+        await self.call(os.makedirs, path, exist_ok=True)
+
+    async def rename(self, src: str | os.PathLike, dst: str | os.PathLike):
+        await self.call(os.rename, src, dst)
+
+    async def unlink(self, path: str | os.PathLike):
+        await self.call(os.unlink, path)
+
+
+# 同时保持最多 jobs 卷处于处理中：prepare 在 I/O 线程池中提前完成后续各卷的准备工作（最多领先 jobs 卷），
+# work 为单卷的完整阻塞流程，在独立的有界线程池中执行，并接收 prepare 的结果；
+# 每卷完成后在事件循环线程中回调 on_done，结果保持输入顺序
+async def run_volumes(
+    items: Iterable[T],
+    work: Callable[[T, P | None], R],
+    *,
+    jobs: int,
+    io: BlockingIO,
+    prepare: Callable[[T, BlockingIO], Awaitable[P]] | None = None,
+    on_done: Callable[[T, R], None] | None = None,
+) -> list[R]:
+    loop = asyncio.get_running_loop()
+    items = list(items)
+    jobs = max(jobs, 1)
+    results: list[R | None] = [None] * len(items)
+    slots = asyncio.Semaphore(jobs)
+    lookahead = asyncio.Semaphore(jobs * 2)
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="moe-volume") as executor:
+
+        async def run_one(index: int, item: T):
+            async with lookahead:
+                prepared = await prepare(item, io) if prepare is not None else None
+                async with slots:
+                    result = await loop.run_in_executor(executor, work, item, prepared)
+            results[index] = result
+            if on_done is not None:
+                on_done(item, result)
+
+        await asyncio.gather(*(run_one(index, item) for index, item in enumerate(items)))
+    return results  # type: ignore[return-value]
+
+
+def run_volumes_sync(
+    items: Iterable[T], work: Callable[[T, P | None], R], *, jobs: int, io_workers: int = 16, **kwargs
+) -> list[R]:
+    async def main() -> list[R]:
+        with BlockingIO(io_workers) as io:
+            return await run_volumes(items, work, jobs=jobs, io=io, **kwargs)
+
+    return asyncio.run(main())
@@ -0,0 +1,158 @@
+import posixpath
+import zipfile
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+from lxml import etree
+
+from .comic_info import ComicInfoExtractor
+from .format_detector import detect_archive
+from .image_transform import transform_image_suffixes
+from .jpeg_optimizer import optimize_image_suffixes
+from .manga_repacker import ComicFile
+
+comic_info_name: str = "ComicInfo.xml"
+# 重新编码与无损优化阶段只处理这些图片，其余图片仍与源文档逐字节一致
+reencoded_suffixes: frozenset[str] = frozenset(transform_image_suffixes + optimize_image_suffixes)
+
+
+# 转换时启用的图片处理阶段决定哪些差异属于预期 20261019
+class VerifyOptions(NamedTuple):
+    # 重新编码或无损优化后 JPEG 页面与源图片不同，不再比对 CRC
+    reencoded: bool = False
+    # 重复页面可能已被删除并重新编号，允许缺少页面
+    pages_dropped: bool = False
+
+    @classmethod
+    def from_config(cls, pipeline_config: dict[str, dict]) -> "VerifyOptions":
+        transform = pipeline_config.get("TRANSFORM", {})
+        optimize = pipeline_config.get("OPTIMIZE", {})
+        dedupe = pipeline_config.get("DEDUPE", {})
+        return cls(
+            reencoded=bool(transform.get("enable", False) or optimize.get("enable", False)),
+            pages_dropped=bool(dedupe.get("enable", False) and dedupe.get("action", "flag") == "drop"),
+        )
+
+
+class VerifyResult(NamedTuple):
+    comic_file: ComicFile
+    cbz_file: Path | None
+    errors: list[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+# 中央目录缺失 CRC 时（例如流式写入的条目），才读取数据自行计算
+def _member_crc(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> int:
+    if info.CRC != 0 or info.file_size == 0:
+        return info.CRC
+    crc = 0
+    with zip_ref.open(info, "r") as f:
+        while chunk := f.read(1024 * 1024):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+# 期望的页面文件名由 vol.opf 按转换时相同的重命名规则得出，非数字编号的页面（如 createby）不一定连续 20261019
+def _check_page_names(names: Iterable[str], expected: list[str], allow_missing: bool = False) -> list[str]:
+    errors: list[str] = []
+    expected_set = set(expected)
+    found: Counter[str] = Counter()
+    for name in names:
+        stem, suffix = posixpath.splitext(name)
+        if stem not in expected_set or not suffix:
+            errors.append(f"存在不符合命名规则的文件 {name}")
+        else:
+            found[stem] += 1
+
+    errors.extend(f"页面 {stem} 重复" for stem, count in found.items() if count > 1)
+    missing = [stem for stem in expected if stem not in found]
+    if missing and not allow_missing:
+        errors.append(f"缺少页面 {', '.join(missing)}")
+    return errors
+
+
+def _check_comic_info(xml_bytes: bytes, page_count: int) -> list[str]:
+    try:
+        root = etree.fromstring(xml_bytes, parser=etree.XMLParser())
+    except etree.XMLSyntaxError as e:
+        return [f"ComicInfo.xml 格式错误：{e}"]
+    if root.tag != "ComicInfo":
+        return [f"ComicInfo.xml 根节点为 {root.tag}"]
+    declared = root.findtext("PageCount")
+    if declared is None or not declared.strip().isdigit() or int(declared) != page_count:
+        return [f"ComicInfo.xml 中 PageCount 为 {declared}，应为 {page_count}"]
+    return []
+
+
+# 仅比对 EPUB 与 CBZ 的中央目录，除 ComicInfo.xml 外不读取任何数据；页面名称由 vol.opf 得出，无需读取网页 20261019
+# 其他格式的输入没有可比对的 vol.opf，不作校验
+def verify_comic_file(file_t: ComicFile, options: VerifyOptions = VerifyOptions()) -> VerifyResult:
+    try:
+        if file_t.src_file.is_dir():
+            return VerifyResult(file_t, None, [])
+        with zipfile.ZipFile(file_t.src_file, "r") as src_zip:
+            if not detect_archive(src_zip).is_mox:
+                return VerifyResult(file_t, None, [])
+            with src_zip.open("vol.opf", "r") as opf_file:
+                extractor = ComicInfoExtractor(opf_stream=opf_file)
+            page_names = extractor.build_page_names()
+            src_images = Counter(
+                (_member_crc(src_zip, info), info.file_size)
+                for info in src_zip.infolist()
+                if info.filename.startswith("image/") and not info.is_dir()
+            )
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        return VerifyResult(file_t, None, [f"无法读取源文档：{e}"])
+
+    cbz_file = file_t.dst_file.parent / f"{extractor.comic_file_name}.cbz"
+    if not cbz_file.is_file():
+        return VerifyResult(file_t, cbz_file, ["输出文件不存在"])
+
+    errors: list[str] = []
+    page_count = extractor.comic_page_count
+    try:
+        with zipfile.ZipFile(cbz_file, "r") as cbz_zip:
+            infolist = [info for info in cbz_zip.infolist() if not info.is_dir()]
+            pages = [info for info in infolist if info.filename != comic_info_name]
+
+            if options.pages_dropped:
+                # 删除重复页面后 PageCount 随之减少
+                if len(pages) > page_count:
+                    errors.append(f"图片数量为 {len(pages)}，多于源文档的 {page_count} 页")
+                page_count = len(pages)
+            elif len(pages) != page_count:
+                errors.append(f"图片数量为 {len(pages)}，PageCount 为 {page_count}")
+
+            errors.extend(_check_page_names((info.filename for info in pages), page_names, options.pages_dropped))
+
+            for info in pages:
+                if options.reencoded and posixpath.splitext(info.filename)[1].lower() in reencoded_suffixes:
+                    continue
+                key = (_member_crc(cbz_zip, info), info.file_size)
+                if src_images[key] > 0:
+                    src_images[key] -= 1
+                else:
+                    errors.append(f"{info.filename} 与源文档中的图片均不一致")
+
+            if len(infolist) == len(pages):
+                errors.append("缺少 ComicInfo.xml")
+            else:
+                errors.extend(_check_comic_info(cbz_zip.read(comic_info_name), page_count))
+    except (OSError, zipfile.BadZipFile) as e:
+        errors.append(f"无法读取输出文件：{e}")
+
+    return VerifyResult(file_t, cbz_file, errors)
+
+
+# 并行校验，结果保持文件列表原有顺序
+def verify_comic_files(
+    filelist: list[ComicFile], jobs: int = 8, options: VerifyOptions = VerifyOptions()
+) -> Iterator[VerifyResult]:
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        yield from pool.map(lambda file_t: verify_comic_file(file_t, options), filelist)
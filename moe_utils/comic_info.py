@@ -1,6 +1,9 @@
+import posixpath
 import re
+import zipfile
+from io import BytesIO
 from pathlib import Path
-from typing import Iterable
+from typing import BinaryIO, Iterable
 
 from lxml import etree
 
@@ -119,33 +122,81 @@ class MoxBook:
         return f"https://bookof.moe/b/{self.bookid}.htm"
 
 
+def _parse_comic_info_xml(xml: bytes | str) -> etree._Element:
+    # 带编码声明的 XML 只能以字节形式交给 lxml 解析
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    root = etree.fromstring(xml, parser=etree.XMLParser())
+    if root.tag != "ComicInfo":
+        raise ValueError(f"ComicInfo.xml 根节点为 {root.tag}")
+    return root
+
+
+def _comic_info_fields(root: etree._Element) -> dict[str, str]:
+    return {child.tag: child.text or "" for child in root if isinstance(child.tag, str) and len(child) == 0}
+
+
+# ComicInfo.xml 的字段及默认值，按写出顺序排列 20261019
+comic_info_defaults: dict[str, str | int] = {
+    "MOXBID": "",
+    "Title": "",
+    "Series": "",
+    "Number": 1,
+    "Count": "",
+    "Volume": "",
+    "Summary": "",
+    "Writer": "",
+    "Publisher": "Kox.moe",
+    "Year": "2024",
+    "Web": "",
+    "PageCount": 0,
+    "Manga": "Yes",
+}
+
+# 按 lxml 的 tostring(pretty_print=True, xml_declaration=True, encoding="utf-8") 的输出格式直接拼接字节
+_xml_declaration: bytes = b"<?xml version='1.0' encoding='utf-8'?>\n"
+_text_escapes = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\r": "&#13;"})
+_attr_escapes = str.maketrans(
+    {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+)
+# lxml 拒绝写入的字符，遇到时改由 lxml 生成以保持原有的报错
+_invalid_xml_chars = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+_plain_types: tuple[type, ...] = (str, int, float)
+
+
+# 页码、尺寸等纯数字或字母的值无需转义
+def _escape(value: object, table: dict[int, str]) -> str:
+    text = str(value)
+    return text if text.isalnum() else text.translate(table)
+
+
 class ComicInfo:
+    __slots__ = ("_metadata", "_pages")
+
     _metadata: dict[str, str | int]
+    _pages: list[dict[str, str]]
 
     def __init__(self, input_data: dict | str = {}):
         if isinstance(input_data, str):
-            info_data: dict = etree.fromstring(input_data, parser=etree.XMLParser())
-            info_data = info_data.get("ComicInfo", {})
+            info_data: dict = _comic_info_fields(_parse_comic_info_xml(input_data))
         elif isinstance(input_data, dict):
             info_data: dict = input_data
         else:
             info_data: dict = {}
 
-        self._metadata = {}
-
-        self._metadata["MOXBID"] = info_data.get("MOXBID", "")
-        self._metadata["Title"] = info_data.get("Title", "")
-        self._metadata["Series"] = info_data.get("Series", "")
-        self._metadata["Number"] = info_data.get("Number", 1)
-        self._metadata["Count"] = info_data.get("Count", "")
-        self._metadata["Volume"] = info_data.get("Volume", "")
-        self._metadata["Summary"] = info_data.get("Summary", "")
-        self._metadata["Writer"] = info_data.get("Writer", "")
-        self._metadata["Publisher"] = info_data.get("Publisher", "Kox.moe")
-        self._metadata["Year"] = info_data.get("Year", "2024")
-        self._metadata["Web"] = info_data.get("Web", "")
-        self._metadata["PageCount"] = info_data.get("PageCount", 0)
-        self._metadata["Manga"] = info_data.get("Manga", "Yes")
+        self._metadata = {key: info_data.get(key, default) for key, default in comic_info_defaults.items()}
+        self._pages = []
+
+    # 由已有 CBZ 中的 ComicInfo.xml 还原，同时读取 <Pages> 中的各页属性 20261019
+    @classmethod
+    def from_xml(cls, xml: bytes | str) -> "ComicInfo":
+        root = _parse_comic_info_xml(xml)
+        comic_info = cls(_comic_info_fields(root))
+        pages_element = root.find("Pages")
+        if pages_element is not None:
+            comic_info.set_pages(dict(page.attrib) for page in pages_element.iter("Page"))
+        return comic_info
 
     @property
     def id(self) -> str:
@@ -157,17 +208,55 @@ class ComicInfo:
     def to_dict(self) -> dict[str, str | int]:
         return self._metadata
 
+    # 各页尺寸等信息以 <Pages><Page .../></Pages> 属性形式写入，阅读器无需解码图片即可排版 20261019
+    def set_pages(self, pages: Iterable[dict[str, str]]) -> None:
+        self._pages = list(pages)
+
+    @property
+    def pages(self) -> list[dict[str, str]]:
+        return self._pages
+
+    @property
+    def page_count(self) -> int:
+        return int(self._metadata["PageCount"])
+
+    @page_count.setter
+    def page_count(self, value: int):
+        self._metadata["PageCount"] = value
+
+    # 每卷都要生成一次，直接按模板拼接字节，不再构建 lxml 树 20261019
     def to_xml(self) -> bytes:
+        parts: list[str] = ["<ComicInfo>\n"]
+        for key, value in self._metadata.items():
+            if not isinstance(value, _plain_types):
+                return self._to_xml_lxml()
+            parts.append(f"  <{key}>{_escape(value, _text_escapes)}</{key}>\n")
+        if self._pages:
+            parts.append("  <Pages>\n")
+            for attrib in self._pages:
+                attrs = "".join([f' {name}="{_escape(value, _attr_escapes)}"' for name, value in attrib.items()])
+                parts.append(f"    <Page{attrs}/>\n")
+            parts.append("  </Pages>\n")
+        parts.append("</ComicInfo>\n")
+        text = "".join(parts)
+        if _invalid_xml_chars.search(text):
+            return self._to_xml_lxml()
+        return _xml_declaration + text.encode("utf-8")
+
+    def _to_xml_lxml(self) -> bytes:
         data = self.to_dict()
         root = etree.Element("ComicInfo", attrib=None, nsmap=None)
         self._build_xml(root, data)
+        if self._pages:
+            pages_element = etree.SubElement(root, "Pages")
+            for attrib in self._pages:
+                etree.SubElement(pages_element, "Page", attrib=attrib)
         return etree.tostring(
             root, pretty_print=True, xml_declaration=True, encoding="utf-8"
         )
 
     def to_xml_file(self, output: Path) -> None:
-        with output.open("w", encoding="utf-8") as of:
-            of.write(self.to_xml().decode("utf-8"))
+        output.write_bytes(self.to_xml())
 
     def _build_xml(self, parent: etree._Element, data: dict):
         for key, value in data.items():
@@ -186,32 +275,176 @@ class ComicInfo:
                 parent.append(element)
 
 
+opf_ns_map = {
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "opf": "http://www.idpf.org/2007/opf",
+}
+
+_dc = "{%s}" % opf_ns_map["dc"]
+_opf = "{%s}" % opf_ns_map["opf"]
+
+_opf_metadata_tag = f"{_opf}metadata"
+_opf_manifest_tag = f"{_opf}manifest"
+_opf_spine_tag = f"{_opf}spine"
+_opf_item_tag = f"{_opf}item"
+_opf_itemref_tag = f"{_opf}itemref"
+_dc_identifier_tag = f"{_dc}identifier"
+
+# 元数据标签与记录字段的对应关系
+_dc_field_map: dict[str, str] = {
+    f"{_dc}title": "title",
+    f"{_dc}series": "series",
+    f"{_dc}creator": "creator",
+    f"{_dc}publisher": "publisher",
+    f"{_dc}date": "date",
+}
+
+# OPF 流式解析每次读取的字节数
+opf_chunk_size: int = 64 * 1024
+
+# 预编译 XPath，避免每次查询重复解析表达式与命名空间 20261019
+_html_img_xpath = etree.XPath(".//img[@src]")
+
+
+class OpfRecord:
+    """
+    vol.opf 中与转换相关的全部数据，一次遍历 metadata / manifest / spine 填充。
+    同名标签仅取第一次出现的值，与原先 XPath 取首个结果的行为一致。
+    """
+
+    __slots__ = (
+        "moxbid",
+        "title",
+        "series",
+        "creator",
+        "publisher",
+        "date",
+        "page_count",
+        "html_items",
+        "img_items",
+    )
+
+    moxbid: str
+    title: str
+    series: str
+    creator: str
+    publisher: str
+    date: str
+    page_count: int
+    html_items: list[tuple[str, str]]
+    img_items: list[tuple[str, str]]
+
+    def __init__(self):
+        self.moxbid = ""
+        self.title = ""
+        self.series = ""
+        self.creator = ""
+        self.publisher = ""
+        self.date = ""
+        self.page_count = 0
+        self.html_items = []
+        self.img_items = []
+
+    # 以字节流增量解析 OPF，读完 metadata / manifest / spine 后立即停止 20261019
+    # 连载话合集的 manifest 可能包含上千项，无需解码、拼接与再编码整份文本
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, chunk_size: int = opf_chunk_size) -> "OpfRecord":
+        record = cls()
+        pending: set[str] = {_opf_metadata_tag, _opf_manifest_tag, _opf_spine_tag}
+        parser = etree.XMLPullParser(events=("end",), tag=tuple(pending))
+        while pending:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                # 文档提前结束时由 close() 抛出与 etree.fromstring 相同的语法错误
+                parser.close()
+                break
+            parser.feed(chunk)
+            for _, section in parser.read_events():
+                if section.tag not in pending:
+                    continue
+                record.read_section(section)
+                pending.discard(section.tag)
+                section.clear()
+        return record
+
+    def read_section(self, section: etree._Element) -> None:
+        tag = section.tag
+        if tag == _opf_metadata_tag:
+            self.read_metadata(section)
+        elif tag == _opf_manifest_tag:
+            self.read_manifest(section)
+        elif tag == _opf_spine_tag:
+            self.read_spine(section)
+
+    def read_metadata(self, metadata: etree._Element) -> None:
+        for node in metadata:
+            tag = node.tag
+            if tag == _dc_identifier_tag:
+                if not self.moxbid and node.get("id") == "MOXBID":
+                    self.moxbid = node.text or ""
+                continue
+            field = _dc_field_map.get(tag)
+            if field is not None and not getattr(self, field):
+                setattr(self, field, node.text or "")
+
+    def read_manifest(self, manifest: etree._Element) -> None:
+        for node in manifest:
+            if node.tag != _opf_item_tag:
+                continue
+            media_type = node.get("media-type")
+            if media_type == "application/xhtml+xml":
+                self.html_items.append((node.attrib["id"], node.attrib["href"]))
+            elif media_type == "image/jpeg":
+                self.img_items.append((node.attrib["id"], node.attrib["href"]))
+
+    def read_spine(self, spine: etree._Element) -> None:
+        if spine.get("toc") != "ncx":
+            return
+        self.page_count += sum(1 for node in spine if node.tag == _opf_itemref_tag and node.get("idref") is not None)
+
+
+def page_index(idx: str, length: int) -> int:
+    if idx.isnumeric():
+        return int(idx)
+    elif idx == "cover":
+        return 0
+    else:
+        return length
+
+
+def page_image_name(renamed_idx: int) -> str:
+    if renamed_idx == 0:
+        return "COVER"
+    else:
+        return f"PAGE{renamed_idx:03}"
+
+
 class ComicInfoExtractor:
-    _metadata: str
-    _package: etree.Element
+    _record: OpfRecord
     _mox_book: MoxBook
     _comic_data: dict[str, str | int]
     ns: dict[str, str]
 
     def __init__(
-        self, use_text: bool = True, opf_text: str = "", opf_file: Path | None = None
+        self,
+        use_text: bool = True,
+        opf_text: str = "",
+        opf_file: Path | None = None,
+        *,
+        opf_stream: BinaryIO | None = None,
     ):
         # 设定命名空间
-        self.ns = {
-            "dc": "http://purl.org/dc/elements/1.1/",
-            "opf": "http://www.idpf.org/2007/opf",
-        }
+        self.ns = opf_ns_map
 
-        # 解析元数据
-        if use_text:
-            self._load_opf_text(opf_text)
+        # 解析元数据，优先直接读取字节流 20261019
+        if opf_stream is not None:
+            self._record = OpfRecord.from_stream(opf_stream)
+        elif use_text:
+            self._record = OpfRecord.from_stream(BytesIO(opf_text.encode("utf-8")))
         else:
             assert opf_file is not None
-            self._load_opf_file(opf_file)
-
-        self._package = etree.fromstring(
-            self._metadata.encode("utf-8"), parser=etree.XMLParser()
-        )
+            with opf_file.open("rb") as opff:
+                self._record = OpfRecord.from_stream(opff)
 
         self._comic_data = {}
         self._comic_data["Publisher"] = "Kox.moe"
@@ -220,24 +453,17 @@ class ComicInfoExtractor:
         self._build_mox_book()
         self._build_comic_info()
 
-    def _load_opf_text(self, opf_text: str):
-        self._metadata = opf_text
-
-    def _load_opf_file(self, opf_file: Path):
-        with opf_file.open("r", encoding="utf-8") as opff:
-            self._metadata = opff.read()
-
-    # 安全搜索，避免返回空列表引发错误
-    def _get_xpath_text(self, xpath: str) -> str:
-        res: str = ""
-        res_finder = self._package.xpath(xpath, namespaces=self.ns)
-        if res_finder:
-            res = res_finder[0].text
-        return res
+    # 不解压文档，直接从 EPUB 内的 opf 文件构建
+    @classmethod
+    def from_epub(cls, epub_file: str | Path | BinaryIO, opf_name: str = "vol.opf") -> "ComicInfoExtractor":
+        with zipfile.ZipFile(epub_file, "r") as zip_ref:
+            with zip_ref.open(opf_name, "r") as opf_file:
+                return cls(opf_stream=opf_file)
 
     def _build_mox_book(self):
-        moxbid: str = self._get_xpath_text('.//dc:identifier[@id="MOXBID"]')
-        title: str = self._get_xpath_text(".//dc:title")
+        record = self._record
+        moxbid: str = record.moxbid
+        title: str = record.title
         volume = title.split(" - ")[-1].strip()
         self._mox_book = MoxBook(moxbid, volume)
         self._comic_data["MOXBID"] = moxbid
@@ -248,15 +474,12 @@ class ComicInfoExtractor:
         self._comic_data["Web"] = self.mox_book.weburl
 
     def _build_comic_info(self):
-        self._comic_data["Series"] = self._get_xpath_text(".//dc:series")
-        self._comic_data["Writer"] = self._get_xpath_text(".//dc:creator")
-        self._comic_data["Publisher"] = self._get_xpath_text(".//dc:publisher")
-        self._comic_data["Year"] = self._get_xpath_text(".//dc:date")
-        self._comic_data["PageCount"] = len(
-            self._package.xpath(
-                './/opf:spine[@toc="ncx"]/opf:itemref[@idref]', namespaces=self.ns
-            )
-        )
+        record = self._record
+        self._comic_data["Series"] = record.series
+        self._comic_data["Writer"] = record.creator
+        self._comic_data["Publisher"] = record.publisher
+        self._comic_data["Year"] = record.date
+        self._comic_data["PageCount"] = record.page_count
 
     @property
     def mox_book(self) -> MoxBook:
@@ -277,29 +500,17 @@ class ComicInfoExtractor:
     def comic_page_count(self) -> int:
         return int(self._comic_data["PageCount"])
 
-    def _build_filelist(self, xpath: str) -> Iterable[tuple[str, str]]:
-        # 返回一个迭代器，元素格式为元组 (id, href)
-        return map(
-            lambda x: (x.attrib["id"], x.attrib["href"]),
-            self._package.xpath(
-                xpath,
-                namespaces=self.ns,
-            ),
-        )
+    @property
+    def opf_record(self) -> OpfRecord:
+        return self._record
 
     def _build_html_filelist(self, extract_dir: Path) -> Iterable[tuple[str, Path]]:
-        file_list = self._build_filelist(
-            xpath='.//opf:manifest/opf:item[@media-type="application/xhtml+xml"]'
-        )
-        return map(lambda x: (x[0], extract_dir / x[1]), file_list)
+        # 返回一个迭代器，元素格式为元组 (id, path)
+        return map(lambda x: (x[0], extract_dir / x[1]), self._record.html_items)
 
     def _build_img_filelist(self, extract_dir: Path) -> Iterable[tuple[str, Path]]:
-        # 实际上 PNG 图片仅有版权页和备用封面页，保留相关 xpath 供查询调试
-        file_list = self._build_filelist(
-            xpath='.//opf:manifest/opf:item[@media-type="image/jpeg"]'
-            # xpath='.//opf:manifest/opf:item[@media-type="image/jpeg"] | .//opf:manifest/opf:item[@media-type="image/png"]'
-        )
-        return map(lambda x: (x[0], extract_dir / x[1]), file_list)
+        # 实际上 PNG 图片仅有版权页和备用封面页，清单仅收录 JPEG 图片
+        return map(lambda x: (x[0], extract_dir / x[1]), self._record.img_items)
 
     def build_img_filelist(
         self, extract_dir: Path, direct: bool = False
@@ -309,43 +520,48 @@ class ComicInfoExtractor:
         # 但是直接获取图片并不能保证其顺序正确，因此还是使用网页列表对图片排序
         img_list = []
 
-        def _rename_idx(idx: str, length: int) -> int:
-            if idx.isnumeric():
-                return int(idx)
-            elif idx == "cover":
-                return 0
-            else:
-                return length
-
-        def _rename_img_idx(renamed_idx: int) -> str:
-            if renamed_idx == 0:
-                return "COVER"
-            else:
-                return f"PAGE{renamed_idx:03}"
-
         def _extract_img_from_html(html_path: Path) -> Path:
             with html_path.open("r", encoding="utf-8") as hf:
                 html_text = hf.read()
                 html_tree: etree.Element = etree.fromstring(
                     html_text, parser=etree.HTMLParser()
                 )
-                return (
-                    extract_dir / html_tree.xpath(".//img[@src]")[0].attrib["src"][3:]
-                )
+                return extract_dir / _html_img_xpath(html_tree)[0].attrib["src"][3:]
 
         if not direct:
             for html_title, html_path in self._build_html_filelist(extract_dir):
                 idx: str = html_title.replace("Page_", "")
-                renamed_idx: int = _rename_idx(idx, self.comic_page_count)
-                new_name = _rename_img_idx(renamed_idx)
+                renamed_idx: int = page_index(idx, self.comic_page_count)
+                new_name = page_image_name(renamed_idx)
                 img_src = _extract_img_from_html(html_path)
                 img_list.append((new_name, img_src))
         else:
             # 以下如非调试不考虑正式使用
             for img_title, img_path in self._build_img_filelist(extract_dir):
                 idx: str = img_title.replace("img", "").replace("_", "")
-                renamed_idx = _rename_idx(idx, self.comic_page_count)
-                new_name = _rename_img_idx(renamed_idx)
+                renamed_idx = page_index(idx, self.comic_page_count)
+                new_name = page_image_name(renamed_idx)
                 img_list.append((new_name, img_path))
 
         return img_list
+
+    # 不解压文档，直接读取压缩包内的网页确定图片顺序 20261019
+    # 返回元组 (新文件名, 压缩包内图片路径)，新文件名不含扩展名
+    def build_page_members(self, zip_ref: zipfile.ZipFile) -> list[tuple[str, str]]:
+        pages: dict[str, str] = {}
+        for html_title, html_href in self._record.html_items:
+            idx: str = html_title.replace("Page_", "")
+            new_name = page_image_name(page_index(idx, self.comic_page_count))
+            html_tree: etree.Element = etree.fromstring(zip_ref.read(html_href), parser=etree.HTMLParser())
+            img_src: str = _html_img_xpath(html_tree)[0].attrib["src"]
+            # 与解压后重命名一致，同名页面以后出现者为准
+            pages[new_name] = posixpath.normpath(posixpath.join(posixpath.dirname(html_href), img_src))
+        return list(pages.items())
+
+    # 页面文件名只由网页的 id 决定，无需读取网页内容 20261019
+    def build_page_names(self) -> list[str]:
+        names = (
+            page_image_name(page_index(html_title.replace("Page_", ""), self.comic_page_count))
+            for html_title, _ in self._record.html_items
+        )
+        return list(dict.fromkeys(names))
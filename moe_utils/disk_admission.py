@@ -0,0 +1,168 @@
+import errno
+import os
+import shutil
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+
+from .format_detector import InputFormat, is_image_name
+from .utils import format_size
+
+# 解压时只写出 html/ 与 image/ 目录，与 unpack_archive_with_timestamp 的 filters 一致
+extracted_prefixes: tuple[str, ...] = ("html/", "image/")
+
+# ComicInfo.xml、目录项与文件系统块对齐等零散开销
+per_volume_overhead: int = 256 * 1024
+
+mebibyte: int = 1024 * 1024
+
+
+class SpaceEstimate(NamedTuple):
+    cache_bytes: int
+    output_bytes: int
+
+
+# 仅根据中央目录估算一卷在缓存目录与输出目录中需要的空间 20261019
+# 缓存为解压后的大小；CBZ 中的图片与源文档压缩大小相当，输出按压缩大小估算
+def estimate_space(path: Path, input_format: InputFormat, extract_all: bool = False) -> SpaceEstimate:
+    if path.is_dir():
+        output_bytes = sum((path / name).stat().st_size for name in input_format.images)
+        return SpaceEstimate(0, output_bytes + per_volume_overhead)
+
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        infolist = [info for info in zip_ref.infolist() if not info.is_dir()]
+
+    images = [info for info in infolist if is_image_name(info.filename)]
+    output_bytes = sum(info.compress_size for info in images) + per_volume_overhead
+    if not input_format.is_mox:
+        # 其他格式不解压，直接复制到 CBZ
+        return SpaceEstimate(0, output_bytes)
+
+    extracted = infolist if extract_all else [i for i in infolist if i.filename.startswith(extracted_prefixes)]
+    return SpaceEstimate(sum(info.file_size for info in extracted) + per_volume_overhead, output_bytes)
+
+
+def _device_of(path: Path) -> int:
+    # 目录尚未创建时取最近的已存在上级目录
+    for candidate in (path, *path.parents):
+        try:
+            return os.stat(candidate).st_dev
+        except FileNotFoundError:
+            continue
+    return -1
+
+
+def _existing_dir(path: Path) -> Path:
+    for candidate in (path, *path.parents):
+        if candidate.exists():
+            return candidate
+    return path
+
+
+# 磁盘空间准入控制：开始转换一卷之前确认缓存与输出所在磁盘有足够空间 20261019
+# 同一进程内并发的任务各自预留估算空间；空间不足时先调用 evict 释放缓存，
+# 仍不足则等待进行中的任务结束，没有可等待的任务且超过 pause_timeout 时以 ENOSPC 失败
+class DiskAdmission:
+    cache_dir: Path
+    output_dir: Path
+    min_free: int
+    pause_timeout: float
+    poll_interval: float
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        output_dir: Path,
+        *,
+        min_free: int = 512 * mebibyte,
+        pause_timeout: float = 0.0,
+        poll_interval: float = 5.0,
+        evict: Callable[[int], int] | None = None,
+        on_pause: Callable[[str, int], None] | None = None,
+    ):
+        self.cache_dir = cache_dir
+        self.output_dir = output_dir
+        self.min_free = min_free
+        self.pause_timeout = pause_timeout
+        self.poll_interval = poll_interval
+        self._evict = evict
+        self._on_pause = on_pause
+        self._cond = threading.Condition()
+        self._reserved: dict[int, int] = {}
+        self._inflight = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict,
+        cache_dir: Path,
+        output_dir: Path,
+        evict: Callable[[int], int] | None = None,
+        on_pause: Callable[[str, int], None] | None = None,
+    ) -> "DiskAdmission":
+        return cls(
+            cache_dir,
+            output_dir,
+            min_free=int(config.get("min_free_mb", 512)) * mebibyte,
+            pause_timeout=float(config.get("pause_timeout", 0.0)),
+            poll_interval=float(config.get("poll_interval", 5.0)),
+            evict=evict,
+            on_pause=on_pause,
+        )
+
+    # 缓存与输出位于同一磁盘时合并计算
+    def _needs(self, estimate: SpaceEstimate) -> dict[int, tuple[Path, int]]:
+        needs: dict[int, tuple[Path, int]] = {}
+        for folder, size in ((self.cache_dir, estimate.cache_bytes), (self.output_dir, estimate.output_bytes)):
+            if size <= 0:
+                continue
+            device = _device_of(folder)
+            previous = needs.get(device, (folder, 0))
+            needs[device] = (previous[0], previous[1] + size)
+        return needs
+
+    def _shortfall(self, needs: dict[int, tuple[Path, int]]) -> int:
+        shortfall = 0
+        for device, (folder, size) in needs.items():
+            free = shutil.disk_usage(_existing_dir(folder)).free
+            shortfall = max(shortfall, size + self._reserved.get(device, 0) + self.min_free - free)
+        return shortfall
+
+    @contextmanager
+    def admit(self, estimate: SpaceEstimate, name: str = "") -> Iterator[None]:
+        needs = self._needs(estimate)
+        deadline = time.monotonic() + self.pause_timeout
+        paused = False
+        with self._cond:
+            while True:
+                shortfall = self._shortfall(needs)
+                if shortfall <= 0:
+                    break
+                if self._evict is not None and self._evict(shortfall) > 0:
+                    continue
+                if self._inflight == 0 and time.monotonic() >= deadline:
+                    raise OSError(
+                        errno.ENOSPC,
+                        f"磁盘空间不足，{name} 预计需要缓存 {format_size(estimate.cache_bytes)}、"
+                        f"输出 {format_size(estimate.output_bytes)}，还差 {format_size(shortfall)}",
+                    )
+                if not paused and self._on_pause is not None:
+                    self._on_pause(name, shortfall)
+                paused = True
+                self._cond.wait(self.poll_interval)
+
+            for device, (_, size) in needs.items():
+                self._reserved[device] = self._reserved.get(device, 0) + size
+            self._inflight += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                for device, (_, size) in needs.items():
+                    self._reserved[device] -= size
+                self._inflight -= 1
+                self._cond.notify_all()
@@ -0,0 +1,275 @@
+import os
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from pathlib import Path, PurePosixPath
+from typing import Iterator, NamedTuple
+
+from lxml import etree
+
+from .comic_info import ComicInfo, opf_ns_map
+from .file_system import copy_zip_member_raw
+from .page_meta import read_page_member
+
+comic_info_name: str = "ComicInfo.xml"
+opf_name: str = "vol.opf"
+ncx_name: str = "toc.ncx"
+
+image_media_types: dict[str, str] = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+_ncx_ns: str = "http://www.daisy.org/z3986/2005/ncx/"
+_ncx: str = "{%s}" % _ncx_ns
+
+_container_xml: bytes = b"""<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="vol.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+# 每页一个网页，图片路径与 Mox.moe 原版一致，转换后的 EPUB 仍可由本程序重新打包
+# 解包流程以文本形式解析网页，因此不写 XML 声明（UTF-8 编码时可省略）
+_page_template: str = """<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN" "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+<title>{title}</title>
+{viewport}<style type="text/css">html, body {{ margin: 0; padding: 0; }} img {{ display: block; margin: 0 auto; max-width: 100%; max-height: 100%; }}</style>
+</head>
+<body><div><img src="../image/{image}" alt="{alt}"/></div></body>
+</html>
+"""
+
+
+class EpubPage(NamedTuple):
+    info: zipfile.ZipInfo
+    name: str
+    image: str
+    media_type: str
+    width: int
+    height: int
+    bookmark: str
+
+    @property
+    def html_href(self) -> str:
+        return f"html/Page_{self.name}.html"
+
+    @property
+    def image_href(self) -> str:
+        return f"image/{self.image}"
+
+
+class EpubTask(NamedTuple):
+    cbz_file: Path
+    epub_file: Path
+
+
+class EpubResult(NamedTuple):
+    task: EpubTask
+    page_count: int
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# source 为单个 CBZ 或文件夹；未指定 out_dir 时 EPUB 写在 CBZ 旁边，否则按相对路径写入 out_dir
+def plan_epub_tasks(source: Path, out_dir: Path | None = None) -> list[EpubTask]:
+    if source.is_file():
+        cbz_files, base_dir = [source], source.parent
+    else:
+        cbz_files, base_dir = sorted(f for f in source.rglob("*.cbz") if f.is_file()), source
+    return [EpubTask(f, (out_dir / f.relative_to(base_dir) if out_dir else f).with_suffix(".epub")) for f in cbz_files]
+
+
+def _read_comic_info(cbz_zip: zipfile.ZipFile, cbz_file: Path) -> ComicInfo:
+    if comic_info_name not in cbz_zip.NameToInfo:
+        # 没有 ComicInfo.xml 的 CBZ 以文件名作为标题
+        return ComicInfo({"Title": cbz_file.stem, "Series": cbz_file.stem})
+    return ComicInfo.from_xml(cbz_zip.read(comic_info_name))
+
+
+# 按文件名顺序确定页面，第一张图片作为封面；尺寸优先取自 ComicInfo.xml，缺失时只读取图片头部
+def _collect_pages(cbz_zip: zipfile.ZipFile, comic_info: ComicInfo) -> list[EpubPage]:
+    page_attribs = {page.get("Image"): page for page in comic_info.pages}
+    infolist = sorted(
+        (
+            info
+            for info in cbz_zip.infolist()
+            if not info.is_dir() and PurePosixPath(info.filename).suffix.lower() in image_media_types
+        ),
+        key=lambda info: info.filename,
+    )
+
+    pages: list[EpubPage] = []
+    for image, info in enumerate(infolist):
+        suffix = PurePosixPath(info.filename).suffix.lower()
+        attrib = page_attribs.get(str(image), {})
+        width, height = int(attrib.get("ImageWidth", 0)), int(attrib.get("ImageHeight", 0))
+        if width <= 0 or height <= 0:
+            meta = read_page_member(cbz_zip, info, image, info.filename)
+            width, height = meta.width, meta.height
+        name = "cover" if image == 0 else str(image)
+        pages.append(
+            EpubPage(
+                info=info,
+                name=name,
+                image=f"img_{name}{suffix}",
+                media_type=image_media_types[suffix],
+                width=width,
+                height=height,
+                bookmark=attrib.get("Bookmark", ""),
+            )
+        )
+    return pages
+
+
+def _book_title(comic_info: ComicInfo) -> str:
+    data = comic_info.to_dict()
+    if data["Title"]:
+        return str(data["Title"])
+    return " - ".join(str(v) for v in (data["Series"], data["Volume"]) if v)
+
+
+def _book_identifier(comic_info: ComicInfo, cbz_file: Path) -> str:
+    return comic_info.id or f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, cbz_file.name)}"
+
+
+def _build_opf(comic_info: ComicInfo, identifier: str, pages: list[EpubPage]) -> bytes:
+    data = comic_info.to_dict()
+    dc, opf = "{%s}" % opf_ns_map["dc"], "{%s}" % opf_ns_map["opf"]
+    package = etree.Element(
+        f"{opf}package",
+        attrib={"version": "2.0", "unique-identifier": "MOXBID"},
+        nsmap={None: opf_ns_map["opf"]},
+    )
+    metadata = etree.SubElement(package, f"{opf}metadata", nsmap={"dc": opf_ns_map["dc"]})
+    etree.SubElement(metadata, f"{dc}identifier", attrib={"id": "MOXBID"}).text = identifier
+    etree.SubElement(metadata, f"{dc}title").text = _book_title(comic_info)
+    etree.SubElement(metadata, f"{dc}language").text = "zh"
+    for tag, field in (("series", "Series"), ("creator", "Writer"), ("publisher", "Publisher"), ("date", "Year")):
+        if data.get(field):
+            etree.SubElement(metadata, f"{dc}{tag}").text = str(data[field])
+    if data.get("Summary"):
+        etree.SubElement(metadata, f"{dc}description").text = str(data["Summary"])
+    # 固定版式漫画的阅读器提示
+    etree.SubElement(metadata, f"{opf}meta", attrib={"name": "cover", "content": "img_cover"})
+    etree.SubElement(metadata, f"{opf}meta", attrib={"name": "fixed-layout", "content": "true"})
+    etree.SubElement(metadata, f"{opf}meta", attrib={"name": "book-type", "content": "comic"})
+    if pages and pages[0].width > 0:
+        resolution = f"{pages[0].width}x{pages[0].height}"
+        etree.SubElement(metadata, f"{opf}meta", attrib={"name": "original-resolution", "content": resolution})
+
+    manifest = etree.SubElement(package, f"{opf}manifest")
+    etree.SubElement(
+        manifest, f"{opf}item", attrib={"id": "ncx", "href": ncx_name, "media-type": "application/x-dtbncx+xml"}
+    )
+    for page in pages:
+        etree.SubElement(
+            manifest,
+            f"{opf}item",
+            attrib={"id": f"Page_{page.name}", "href": page.html_href, "media-type": "application/xhtml+xml"},
+        )
+        etree.SubElement(
+            manifest,
+            f"{opf}item",
+            attrib={"id": f"img_{page.name}", "href": page.image_href, "media-type": page.media_type},
+        )
+
+    spine = etree.SubElement(package, f"{opf}spine", attrib={"toc": "ncx"})
+    for page in pages:
+        etree.SubElement(spine, f"{opf}itemref", attrib={"idref": f"Page_{page.name}"})
+
+    return etree.tostring(package, pretty_print=True, xml_declaration=True, encoding="utf-8")
+
+
+# 目录只包含封面与合并章节时写入的 Bookmark
+def _build_ncx(title: str, identifier: str, pages: list[EpubPage]) -> bytes:
+    ncx = etree.Element(f"{_ncx}ncx", attrib={"version": "2005-1"}, nsmap={None: _ncx_ns})
+    head = etree.SubElement(ncx, f"{_ncx}head")
+    etree.SubElement(head, f"{_ncx}meta", attrib={"name": "dtb:uid", "content": identifier})
+    etree.SubElement(etree.SubElement(ncx, f"{_ncx}docTitle"), f"{_ncx}text").text = title
+    nav_map = etree.SubElement(ncx, f"{_ncx}navMap")
+
+    nav_pages = [(page, page.bookmark) for page in pages if page.bookmark]
+    if not nav_pages and pages:
+        nav_pages = [(pages[0], title)]
+    for order, (page, label) in enumerate(nav_pages, start=1):
+        nav_point = etree.SubElement(nav_map, f"{_ncx}navPoint", attrib={"id": f"nav_{order}", "playOrder": str(order)})
+        etree.SubElement(etree.SubElement(nav_point, f"{_ncx}navLabel"), f"{_ncx}text").text = label
+        etree.SubElement(nav_point, f"{_ncx}content", attrib={"src": page.html_href})
+
+    return etree.tostring(ncx, pretty_print=True, xml_declaration=True, encoding="utf-8")
+
+
+def _build_page_html(title: str, page: EpubPage) -> bytes:
+    viewport = ""
+    if page.width > 0 and page.height > 0:
+        viewport = f'<meta name="viewport" content="width={page.width}, height={page.height}"/>\n'
+    return _page_template.format(
+        title=escape(title), viewport=viewport, image=escape(page.image), alt=escape(page.name)
+    ).encode("utf-8")
+
+
+def _writestr(
+    dst_zip: zipfile.ZipFile,
+    arcname: str,
+    data: bytes,
+    date_time: tuple[int, int, int, int, int, int],
+    compress_type: int = zipfile.ZIP_DEFLATED,
+):
+    zinfo = zipfile.ZipInfo(arcname, date_time)
+    zinfo.compress_type = compress_type
+    dst_zip.writestr(zinfo, data)
+
+
+# 将 CBZ 流式写为最简固定版式 EPUB，图片条目原样复制，不解压也不重新压缩 20261019
+# mimetype 不压缩且作为第一个条目写入；生成的 EPUB 沿用 Mox.moe 的 vol.opf / html / image 结构
+def build_epub(task: EpubTask) -> EpubResult:
+    epub_file = task.epub_file
+    tmp_file = epub_file.with_name(f".{epub_file.name}.tmp")
+    pages: list[EpubPage] = []
+
+    try:
+        with zipfile.ZipFile(task.cbz_file, "r") as cbz_zip:
+            comic_info = _read_comic_info(cbz_zip, task.cbz_file)
+            pages = _collect_pages(cbz_zip, comic_info)
+            if not pages:
+                raise ValueError("CBZ 中没有图片")
+
+            title = _book_title(comic_info)
+            identifier = _book_identifier(comic_info, task.cbz_file)
+            # 生成的条目沿用 ComicInfo.xml（即封面）的时间戳
+            date_time = cbz_zip.NameToInfo.get(comic_info_name, pages[0].info).date_time
+
+            epub_file.parent.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(tmp_file, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+                _writestr(dst_zip, "mimetype", b"application/epub+zip", date_time, zipfile.ZIP_STORED)
+                _writestr(dst_zip, "META-INF/container.xml", _container_xml, date_time)
+                _writestr(dst_zip, opf_name, _build_opf(comic_info, identifier, pages), date_time)
+                _writestr(dst_zip, ncx_name, _build_ncx(title, identifier, pages), date_time)
+                for page in pages:
+                    _writestr(dst_zip, page.html_href, _build_page_html(title, page), date_time)
+                    copy_zip_member_raw(cbz_zip, page.info, dst_zip, page.image_href)
+
+        os.replace(tmp_file, epub_file)
+        stat = task.cbz_file.stat()
+        os.utime(epub_file, (stat.st_atime, stat.st_mtime))
+    except Exception as e:
+        tmp_file.unlink(missing_ok=True)
+        return EpubResult(task, len(pages), str(e))
+
+    return EpubResult(task, len(pages))
+
+
+def build_epubs(tasks: list[EpubTask], jobs: int = 4) -> Iterator[EpubResult]:
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        yield from pool.map(build_epub, tasks)
@@ -1,16 +1,19 @@
 import os
 import shutil
+import stat
+import struct
 import subprocess
+import sys
+import threading
 import time
+import uuid
 import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Sequence
+from typing import BinaryIO, Mapping, Sequence
 
-import filedate
 from rich import print
 from rich.console import Console
-from rich.prompt import Prompt
-from rich.tree import Tree
 
 from .terminal_ui import pure_log
 from .utils import is_NT
@@ -94,6 +97,35 @@ def copy_dir_struct_ext_to_list(root: str, ext=".epub") -> list[Path]:
     )
 
 
+# 创建输入文件列表（按原目录结构），扩展名不区分大小写 20261019
+# image_ext 非空时同时收录含有图片且没有子文件夹、也没有 ext 类文件的末级文件夹；skip_dirs 中的目录不进入
+def copy_dir_struct_input_to_list(
+    root: str,
+    ext: tuple[str, ...] = (".epub",),
+    image_ext: tuple[str, ...] = (),
+    skip_dirs: Sequence[GeneralPathUnwrapped] = (),
+) -> list[Path]:
+    skipped = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs}
+    result: list[Path] = []
+    for path, subdirs, files in os.walk(root):
+        subdirs[:] = sorted(
+            d
+            for d in subdirs
+            if not d.startswith(".") and os.path.normcase(os.path.abspath(os.path.join(path, d))) not in skipped
+        )
+        names = sorted(f.lower() for f in files if not f.startswith("."))
+        result.extend(Path(path, f) for f in sorted(files) if not f.startswith(".") and f.lower().endswith(ext))
+        if (
+            image_ext
+            and not subdirs
+            and os.path.abspath(path) != os.path.abspath(root)
+            and any(f.endswith(image_ext) for f in names)
+            and not any(f.endswith(ext) for f in names)
+        ):
+            result.append(Path(path))
+    return result
+
+
 # 修改EPUB扩展名为ZIP
 # 调整shutil.unpack_archive()参数后，解压不再需要依赖扩展名，本函数弃用
 def suffix_change(filelist: list[Path], inType: str = ".epub", outType: str = ".zip") -> list:
@@ -104,20 +136,194 @@ def suffix_change(filelist: list[Path], inType: str = ".epub", outType: str = ".
     return filelist
 
 
-def remove_if_exists(path: str, *, recreate: bool = False):
+# 删除统计：释放的文件数、目录数与字节数，以及删除失败的条目
+class RemovalStats:
+    files: int
+    dirs: int
+    bytes: int
+    errors: list[str]
+
+    def __init__(self):
+        self.files = 0
+        self.dirs = 0
+        self.bytes = 0
+        self.errors = []
+
+    def merge(self, other: "RemovalStats"):
+        self.files += other.files
+        self.dirs += other.dirs
+        self.bytes += other.bytes
+        self.errors.extend(other.errors)
+
+
+class RemovalTask:
+    _thread: threading.Thread | None
+    _stats: RemovalStats
+
+    # stats 为调用前已同步完成的删除统计，一并计入结果
+    def __init__(
+        self,
+        targets: list[Path] | None = None,
+        jobs: int = 8,
+        background: bool = False,
+        stats: RemovalStats | None = None,
+    ):
+        self._stats = stats if stats is not None else RemovalStats()
+        self._thread = None
+        if not targets:
+            return
+        if background:
+            # 非守护线程：主流程可以继续，进程退出前仍会等待删除完成
+            self._thread = threading.Thread(target=self._run, args=(targets, jobs), name="moe-remove")
+            self._thread.start()
+        else:
+            self._run(targets, jobs)
+
+    def _run(self, targets: list[Path], jobs: int):
+        for target in targets:
+            try:
+                self._stats.merge(remove_tree_parallel(target, jobs=jobs))
+            except RuntimeError:
+                # 主线程结束后解释器开始关闭，线程池不再接受任务，改为在本线程中逐个删除
+                self._stats.merge(remove_tree_parallel(target, jobs=1))
+
+    def done(self) -> bool:
+        return self._thread is None or not self._thread.is_alive()
+
+    def wait(self) -> RemovalStats:
+        if self._thread is not None:
+            self._thread.join()
+        return self._stats
+
+
+trash_marker: str = ".moe-trash-"
+
+
+def _unlink_with_retry(path: str):
+    try:
+        os.unlink(path)
+    except PermissionError:
+        # 只读文件先清除只读属性再删除
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+# 扫描单个目录并删除其中文件，返回子目录供调度器继续分发
+def _clear_dir_files(folder: str) -> tuple[RemovalStats, list[str]]:
+    stats = RemovalStats()
+    subdirs: list[str] = []
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                    _unlink_with_retry(entry.path)
+                    stats.files += 1
+                    stats.bytes += size
+                except OSError as e:
+                    stats.errors.append(f"{entry.path}: {e}")
+    except OSError as e:
+        stats.errors.append(f"{folder}: {e}")
+    return stats, subdirs
+
+
+# 使用 os.scandir 并行删除目录树，失败条目记录在统计中而不是静默忽略 20261019
+def remove_tree_parallel(root: GeneralPathUnwrapped, jobs: int = 8) -> RemovalStats:
+    root = os.fspath(root)
+    stats = RemovalStats()
+    if not os.path.isdir(root) or os.path.islink(root):
+        try:
+            size = os.lstat(root).st_size
+            _unlink_with_retry(root)
+            stats.files += 1
+            stats.bytes += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            stats.errors.append(f"{root}: {e}")
+        return stats
+
+    all_dirs: list[str] = [root]
+    if jobs <= 1:
+        stack: list[str] = [root]
+        while stack:
+            dir_stats, subdirs = _clear_dir_files(stack.pop())
+            stats.merge(dir_stats)
+            all_dirs.extend(subdirs)
+            stack.extend(subdirs)
+        return _remove_empty_dirs(all_dirs, stats)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending: set[Future] = {pool.submit(_clear_dir_files, root)}
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                dir_stats, subdirs = future.result()
+                stats.merge(dir_stats)
+                all_dirs.extend(subdirs)
+                pending.update(pool.submit(_clear_dir_files, d) for d in subdirs)
+    return _remove_empty_dirs(all_dirs, stats)
+
+
+# 由深至浅删除空目录
+def _remove_empty_dirs(all_dirs: list[str], stats: RemovalStats) -> RemovalStats:
+    for folder in sorted(all_dirs, key=lambda d: d.count(os.sep), reverse=True):
+        try:
+            os.rmdir(folder)
+            stats.dirs += 1
+        except OSError as e:
+            stats.errors.append(f"{folder}: {e}")
+    return stats
+
+
+# 先将目标原子重命名到同级的临时名称，原路径立即可用，随后再（可在后台）并行删除
+# 上次未删完的同名临时目录也会一并清理
+def remove_if_exists(
+    path: GeneralPathUnwrapped,
+    *,
+    recreate: bool = False,
+    background: bool = False,
+    jobs: int = 8,
+) -> RemovalTask:
     path_obj = make_path(path)
+    targets: list[Path] = []
+    in_place: RemovalStats | None = None
+
     if path_obj.is_dir():
-        shutil.rmtree(os.fspath(path), ignore_errors=True)
+        trash = path_obj.with_name(f".{path_obj.name}{trash_marker}{uuid.uuid4().hex[:8]}")
+        try:
+            path_obj.rename(trash)
+            targets.append(trash)
+        except OSError:
+            # 跨设备、被占用等情况下无法改名，只能就地删除，且必须在返回（及重建目录）之前完成，
+            # 否则后台删除会误删调用方随后写入该目录的新文件
+            in_place = remove_tree_parallel(path_obj, jobs=jobs)
+
+    if path_obj.parent.is_dir():
+        stale_prefix = f".{path_obj.name}{trash_marker}"
+        with os.scandir(path_obj.parent) as it:
+            for entry in it:
+                stale = Path(entry.path)
+                if entry.name.startswith(stale_prefix) and stale not in targets:
+                    targets.append(stale)
+
     if recreate:
         path_obj.mkdir(parents=True, exist_ok=True)
 
+    return RemovalTask(targets, jobs=jobs, background=background, stats=in_place)
+
 
 # shutil.make_archive() 不是线程安全的，因此考虑用以下函数代替
 # https://stackoverflow.com/questions/41625702/is-shutil-make-archive-thread-safe
+# members 中的条目直接从内存写入压缩包根目录，无需先落地为文件 20261019
 def make_archive_threadsafe(
     base_name: GeneralPathUnwrapped,
     format: str = "zip",
     root_dir: GeneralPath = None,
+    members: Mapping[str, bytes] | None = None,
 ):
     assert root_dir is not None
     zip_name: str = f"{str(base_name)}.{format}"
@@ -128,6 +334,141 @@ def make_archive_threadsafe(
                     os.path.join(root, file),
                     os.path.relpath(os.path.join(root, file), root_dir),
                 )
+        _write_memory_members(zip_f, members)
+
+
+def _write_memory_members(zip_f: zipfile.ZipFile, members: Mapping[str, bytes] | None):
+    for arcname, data in (members or {}).items():
+        zinfo = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        # 与 ZipFile.write 写入普通文件时的权限位一致
+        zinfo.external_attr = 0o100644 << 16
+        zip_f.writestr(zinfo, data)
+
+
+# 只写、不可定位的流包装：zipfile 检测到无法 seek 时，为每个条目写入数据描述符，
+# 本地文件头不再需要回写，因此可直接输出到标准输出、管道或套接字 20261019
+class UnseekableWriter:
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        self._stream.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def flush(self):
+        self._stream.flush()
+
+
+def make_archive_to_stream(
+    stream: BinaryIO, root_dir: GeneralPathUnwrapped, members: Mapping[str, bytes] | None = None
+) -> int:
+    writer = UnseekableWriter(stream)
+    with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED) as zip_f:
+        for root, dirs, files in os.walk(root_dir):
+            dirs.sort()
+            for file in sorted(files):
+                zip_f.write(
+                    os.path.join(root, file),
+                    os.path.relpath(os.path.join(root, file), root_dir),
+                )
+        _write_memory_members(zip_f, members)
+    writer.flush()
+    return writer.bytes_written
+
+
+# 原样复制依赖 zipfile 的私有实现（_lock、_writecheck、_didModify、start_dir 与 _FH_* 常量），
+# 仅在逐一核对过的 CPython 版本上启用；其他版本或实现变化时退回 read()/writestr()，结果同样有效，只是需要重新压缩 20261019
+raw_copy_versions: tuple[tuple[int, int], ...] = ((3, 10), (3, 11), (3, 12))
+_raw_copy_module_attrs: tuple[str, ...] = (
+    "sizeFileHeader",
+    "structFileHeader",
+    "stringFileHeader",
+    "_FH_FILENAME_LENGTH",
+    "_FH_EXTRA_FIELD_LENGTH",
+)
+
+
+def _raw_copy_supported() -> bool:
+    return (
+        sys.implementation.name == "cpython"
+        and sys.version_info[:2] in raw_copy_versions
+        and all(hasattr(zipfile, name) for name in _raw_copy_module_attrs)
+        and hasattr(zipfile.ZipFile, "_writecheck")
+    )
+
+
+raw_copy_available: bool = _raw_copy_supported()
+
+
+def _can_copy_raw(src_zip: zipfile.ZipFile, dst_zip: zipfile.ZipFile) -> bool:
+    return (
+        raw_copy_available
+        and hasattr(src_zip, "_lock")
+        and hasattr(dst_zip, "_lock")
+        and hasattr(dst_zip, "start_dir")
+        and not getattr(dst_zip, "_writing", False)
+    )
+
+
+# 不解压、不重新压缩，将源压缩包中的条目原样复制到目标压缩包，可同时改名 20261019
+# 直接写入已知 CRC 与大小的本地文件头，目标流无需支持 seek
+def copy_zip_member_raw(
+    src_zip: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    dst_zip: zipfile.ZipFile,
+    arcname: str | None = None,
+    *,
+    chunk_size: int = 1024 * 1024,
+) -> zipfile.ZipInfo:
+    if info.flag_bits & 0x1:
+        raise ValueError(f"不支持复制加密条目 {info.filename}")
+
+    zinfo = zipfile.ZipInfo(arcname or info.filename, info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.create_system = info.create_system
+    zinfo.external_attr = info.external_attr
+
+    if not _can_copy_raw(src_zip, dst_zip):
+        dst_zip.writestr(zinfo, src_zip.read(info))
+        return zinfo
+
+    zinfo.CRC = info.CRC
+    zinfo.compress_size = info.compress_size
+    zinfo.file_size = info.file_size
+
+    with src_zip._lock, dst_zip._lock:
+        src_fp = src_zip.fp
+        src_fp.seek(info.header_offset)
+        header = src_fp.read(zipfile.sizeFileHeader)
+        if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"{info.filename} 的本地文件头损坏")
+        fields = struct.unpack(zipfile.structFileHeader, header)
+        src_fp.seek(fields[zipfile._FH_FILENAME_LENGTH] + fields[zipfile._FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+
+        dst_zip._writecheck(zinfo)
+        dst_zip._didModify = True
+        dst_fp = dst_zip.fp
+        zinfo.header_offset = dst_fp.tell()
+        dst_fp.write(zinfo.FileHeader())
+
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = src_fp.read(min(chunk_size, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"{info.filename} 的数据不完整")
+            dst_fp.write(chunk)
+            remaining -= len(chunk)
+
+        dst_zip.filelist.append(zinfo)
+        dst_zip.NameToInfo[zinfo.filename] = zinfo
+        dst_zip.start_dir = dst_fp.tell()
+    return zinfo
 
 
 # shutil.unpack_archive() 解压时不保留文件时间戳，因此考虑用以下函数代替
@@ -257,23 +598,28 @@ class Extern7z:
 
 
 # 检查字符串是否能够组成路径
+# console 为 None 时提示输出至 stdout；无界面模式下传入 stderr 的 Console，避免混入 JSON 事件流
 def check_if_path_string_valid(
-    path_string: str | None, check_only: bool = True, force_create: bool = False
+    path_string: str | None, check_only: bool = True, force_create: bool = False, console: Console | None = None
 ) -> Path | None:
+    _print = print if console is None else console.print
     try:
         if path_string is None:
             return None
         path = Path(path_string)
         if not path.exists():
             if check_only:
-                print(f"[red]警告[/]：{path_string} 路径指向的文件夹不存在。")
+                _print(f"[red]警告[/]：{path_string} 路径指向的文件夹不存在。")
                 return None
 
             if not force_create:
+                from rich.prompt import Prompt
+
                 create_folder = Prompt.ask(
                     f"[red]警告[/]：{path_string} 路径指向的文件夹不存在，您想要创建吗？",
                     choices=["y", "n"],
                     default="n",
+                    console=console,
                 )
                 if create_folder == "y":
                     path.mkdir(parents=True, exist_ok=True)
@@ -284,15 +630,15 @@ def check_if_path_string_valid(
             path.mkdir(parents=True, exist_ok=True)
             return path
         elif path.is_file():
-            print("[red]警告[/]：该路径指向一个已存在的文件。")
+            _print("[red]警告[/]：该路径指向一个已存在的文件。")
             return None
         elif not os.access(path, os.R_OK):
-            print("[red]警告[/]：该路径指向一个已存在的文件夹，但访问受限或被拒绝。")
+            _print("[red]警告[/]：该路径指向一个已存在的文件夹，但访问受限或被拒绝。")
             return None
         else:
             return path
     except Exception as e:
-        print(f"[red]警告[/]：{e}")
+        _print(f"[red]警告[/]：{e}")
         return None
 
 
@@ -305,6 +651,8 @@ def copy_file_timestamp(
     copy_mtime: bool = True,
     copy_atime: bool = True,
 ):
+    import filedate
+
     filedate.copy(
         str(src_file),
         str(dst_file),
@@ -370,6 +718,8 @@ class PrettyDirectoryTree:
 
 # 采用 rich.tree 实现目录树打印 20250131
 def print_dir_tree(path_list: list[Path], console: Console):
+    from rich.tree import Tree
+
     tree = Tree("", guide_style="bold bright_blue", hide_root=True)
     for path in path_list:
         parts = path.parts
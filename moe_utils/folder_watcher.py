@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from .terminal_ui import pure_log
+
+dir_cache_min_age_ns: int = 2_000_000_000
+
+
+class FileSignature(NamedTuple):
+    size: int
+    mtime_ns: int
+
+
+class PendingFile(NamedTuple):
+    signature: FileSignature
+    since: float
+
+
+# 监视输入文件夹，持续发现新下载完成的文档 20261019
+# 优先使用 watchdog（inotify 等系统通知）唤醒扫描，未安装时退化为轮询
+# 轮询时仅重新列出 mtime 发生变化的目录，未变化目录沿用上次的文件列表
+class FolderWatcher:
+    root: Path
+    ext: tuple[str, ...]
+    exclude: set[str]
+    interval: float
+    settle_time: float
+
+    _dir_cache: dict[Path, tuple[int, list[Path], list[Path]]]
+    _pending: dict[Path, PendingFile]
+    _seen: dict[Path, FileSignature]
+    _wakeup: threading.Event
+    _stopped: bool = False
+    _observer = None
+
+    def __init__(
+        self,
+        root: Path,
+        ext: str | tuple[str, ...] = ".epub",
+        exclude: list[str] | None = None,
+        *,
+        interval: float = 1.0,
+        settle_time: float = 2.0,
+    ):
+        self.root = root
+        self.ext = tuple(e.lower() for e in ((ext,) if isinstance(ext, str) else ext))
+        self.exclude = set(exclude or [])
+        self.interval = interval
+        self.settle_time = settle_time
+
+        self._dir_cache = {}
+        self._pending = {}
+        self._seen = {}
+        self._wakeup = threading.Event()
+
+    @property
+    def notify_enabled(self) -> bool:
+        return self._observer is not None
+
+    def _skip_dir(self, name: str) -> bool:
+        return name.startswith(".") or name in self.exclude
+
+    def _list_dir(self, folder: Path) -> tuple[list[Path], list[Path]]:
+        try:
+            mtime_ns = folder.stat().st_mtime_ns
+        except OSError:
+            self._dir_cache.pop(folder, None)
+            return [], []
+
+        cached = self._dir_cache.get(folder)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+
+        subdirs: list[Path] = []
+        files: list[Path] = []
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._skip_dir(entry.name):
+                        subdirs.append(Path(entry.path))
+                elif entry.name.lower().endswith(self.ext) and not entry.name.startswith("."):
+                    files.append(Path(entry.path))
+
+        # 部分文件系统（如 SMB、FAT）的时间戳精度较粗，刚变化过的目录暂不缓存
+        if time.time_ns() - mtime_ns > dir_cache_min_age_ns:
+            self._dir_cache[folder] = (mtime_ns, subdirs, files)
+        else:
+            self._dir_cache.pop(folder, None)
+        return subdirs, files
+
+    def scan(self) -> list[Path]:
+        result: list[Path] = []
+        stack: list[Path] = [self.root]
+        while stack:
+            subdirs, files = self._list_dir(stack.pop())
+            stack.extend(subdirs)
+            result.extend(files)
+        return result
+
+    @staticmethod
+    def _signature(path: Path) -> FileSignature | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return FileSignature(st.st_size, st.st_mtime_ns)
+
+    # 将当前已存在的文件标记为已处理，只转换之后新加入的文档
+    def prime(self):
+        for path in self.scan():
+            signature = self._signature(path)
+            if signature is not None:
+                self._seen[path] = signature
+
+    def forget(self, path: Path):
+        self._seen.pop(path, None)
+
+    # 文件大小与修改时间在 settle_time 内保持不变，且存在完整的中央目录，才视为下载完成
+    def poll(self) -> list[Path]:
+        now = time.monotonic()
+
+        for path in self.scan():
+            signature = self._signature(path)
+            if signature is None or self._seen.get(path) == signature:
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending.signature != signature:
+                self._pending[path] = PendingFile(signature, now)
+
+        ready: list[Path] = []
+        for path, pending in list(self._pending.items()):
+            if now - pending.since < self.settle_time:
+                continue
+            signature = self._signature(path)
+            if signature is None:
+                del self._pending[path]
+                continue
+            if signature != pending.signature:
+                self._pending[path] = PendingFile(signature, now)
+                continue
+            del self._pending[path]
+            if not zipfile.is_zipfile(path):
+                # 可能仍在写入或文件损坏，等待下一次变化
+                self._seen[path] = signature
+                pure_log(f"[yellow]警告：{path.name} 不是完整的压缩文档，已跳过。")
+                continue
+            self._seen[path] = signature
+            ready.append(path)
+
+        return ready
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        wakeup = self._wakeup
+
+        class _WakeupHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wakeup.set()
+
+        observer = Observer()
+        observer.schedule(_WakeupHandler(), str(self.root), recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+
+    def stop(self):
+        self._stopped = True
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        self._wakeup.set()
+
+    # 持续产出下载完成的文档路径，直到调用 stop()
+    def watch(self) -> Iterator[Path]:
+        self._start_observer()
+        try:
+            while not self._stopped:
+                # 有待确认的文件时按 interval 轮询，以便及时完成防抖判断
+                timeout = self.interval if (self._pending or not self.notify_enabled) else self.interval * 30
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+                yield from self.poll()
+        finally:
+            self.stop()
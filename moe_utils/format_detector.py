@@ -0,0 +1,140 @@
+import os
+import re
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterable, NamedTuple
+
+mox_opf_name: str = "vol.opf"
+
+# 输入格式，按优先级排列；配置文件中的 input_formats 取其子集
+input_format_kinds: tuple[str, ...] = ("mox-epub", "epub", "image-zip", "image-dir")
+
+# 以压缩包形式存在的输入格式所对应的扩展名，图片文件夹没有扩展名
+format_suffixes: dict[str, tuple[str, ...]] = {
+    "mox-epub": (".epub",),
+    "epub": (".epub",),
+    "image-zip": (".zip", ".cbz"),
+}
+image_suffixes: tuple[str, ...] = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+_digits_pattern = re.compile(r"(\d+)")
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+class InputFormat(NamedTuple):
+    kind: str
+    # EPUB 中 OPF 文件的路径
+    opf_name: str = ""
+    # 图片压缩包或文件夹中按页面顺序排列的图片路径
+    images: tuple[str, ...] = ()
+
+    @property
+    def is_mox(self) -> bool:
+        return self.kind == "mox-epub"
+
+
+def input_suffixes(kinds: Iterable[str]) -> tuple[str, ...]:
+    return tuple(dict.fromkeys(suffix for kind in kinds for suffix in format_suffixes.get(kind, ())))
+
+
+ArchiveDetector = Callable[[list[zipfile.ZipInfo]], InputFormat | None]
+
+# 压缩包格式识别器，按注册顺序依次尝试，第一个返回结果者生效
+_archive_detectors: list[tuple[str, ArchiveDetector]] = []
+
+
+def register_detector(kind: str) -> Callable[[ArchiveDetector], ArchiveDetector]:
+    def decorator(detector: ArchiveDetector) -> ArchiveDetector:
+        _archive_detectors.append((kind, detector))
+        return detector
+
+    return decorator
+
+
+# 按数字大小排序，"2.jpg" 排在 "10.jpg" 之前
+def natural_sort_key(name: str) -> list[str | int]:
+    return [int(part) if part.isdigit() else part.lower() for part in _digits_pattern.split(name)]
+
+
+def _is_hidden(name: str) -> bool:
+    return any(part.startswith(".") or part == "__MACOSX" for part in PurePosixPath(name).parts)
+
+
+def is_image_name(name: str) -> bool:
+    return name.lower().endswith(image_suffixes) and not _is_hidden(name)
+
+
+@register_detector("mox-epub")
+def _detect_mox_epub(infolist: list[zipfile.ZipInfo]) -> InputFormat | None:
+    names = [info.filename for info in infolist]
+    if mox_opf_name not in names:
+        return None
+    if not any(name.startswith("html/") for name in names) or not any(name.startswith("image/") for name in names):
+        return None
+    return InputFormat("mox-epub", mox_opf_name)
+
+
+# 其他 EPUB：不读取 container.xml，取目录层级最浅的 OPF 文件
+@register_detector("epub")
+def _detect_epub(infolist: list[zipfile.ZipInfo]) -> InputFormat | None:
+    opf_names = sorted(
+        (
+            info.filename
+            for info in infolist
+            if info.filename.lower().endswith(".opf") and not _is_hidden(info.filename)
+        ),
+        key=lambda name: (name.count("/"), name),
+    )
+    if not opf_names or not any(is_image_name(info.filename) for info in infolist):
+        return None
+    return InputFormat("epub", opf_names[0])
+
+
+@register_detector("image-zip")
+def _detect_image_zip(infolist: list[zipfile.ZipInfo]) -> InputFormat | None:
+    images = sorted((info.filename for info in infolist if is_image_name(info.filename)), key=natural_sort_key)
+    if not images:
+        return None
+    return InputFormat("image-zip", images=tuple(images))
+
+
+# 仅根据中央目录识别，不读取任何条目数据 20261019
+def detect_archive(zip_ref: zipfile.ZipFile) -> InputFormat:
+    infolist = [info for info in zip_ref.infolist() if not info.is_dir()]
+    for _, detector in _archive_detectors:
+        input_format = detector(infolist)
+        if input_format is not None:
+            return input_format
+    raise UnsupportedFormatError("压缩包中既没有 OPF 文件也没有图片")
+
+
+# 只包含图片、没有子文件夹的末级文件夹视为一卷
+def detect_image_dir(folder: Path) -> InputFormat | None:
+    images: list[str] = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_dir():
+                return None
+            if entry.is_file() and is_image_name(entry.name):
+                images.append(entry.name)
+    if not images:
+        return None
+    return InputFormat("image-dir", images=tuple(sorted(images, key=natural_sort_key)))
+
+
+# 在解压等耗时阶段之前识别输入格式，不支持或未启用的格式立即报错 20261019
+def detect_input_format(path: Path, kinds: Iterable[str] = input_format_kinds) -> InputFormat:
+    if path.is_dir():
+        input_format = detect_image_dir(path)
+        if input_format is None:
+            raise UnsupportedFormatError(f"{path.name} 不是只包含图片的文件夹")
+    else:
+        with zipfile.ZipFile(path, "r") as zip_ref:
+            input_format = detect_archive(zip_ref)
+
+    if input_format.kind not in kinds:
+        raise UnsupportedFormatError(f"未启用的输入格式 {input_format.kind}")
+    return input_format
@@ -0,0 +1,187 @@
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import NamedTuple
+
+from .terminal_ui import pure_log
+
+transform_image_suffixes: tuple[str, ...] = (".jpg", ".jpeg")
+# 与 config.toml 中的默认值保持一致
+transform_default_quality: int = 80
+# 编码方式变化（如按 EXIF 方向旋转、保留 ICC）时递增，避免沿用旧的缓存结果
+transform_encoder_version: int = 2
+
+
+class TransformOptions(NamedTuple):
+    max_size: int = 0
+    quality: int = transform_default_quality
+    grayscale: bool = False
+
+    @property
+    def key(self) -> str:
+        # 作为结果缓存的子目录名，参数变化后不会误用旧结果
+        color = "gray" if self.grayscale else "color"
+        return f"v{transform_encoder_version}-s{self.max_size}-q{self.quality}-{color}"
+
+
+class TransformStats:
+    images: int
+    cache_hits: int
+    bytes_before: int
+    bytes_after: int
+
+    def __init__(self):
+        self.images = 0
+        self.cache_hits = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+# 在子进程中执行，仅依赖可序列化的参数
+def _encode_image(data: bytes, options: TransformOptions) -> bytes:
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as img:
+        # draft 会直接改变解码模式，需先记下原图模式
+        source_mode = img.mode
+        if options.max_size > 0:
+            # JPEG 可在解码时直接按 1/2、1/4、1/8 缩小，大幅减少解码耗时
+            img.draft("L" if options.grayscale else "RGB", (options.max_size, options.max_size))
+        icc_profile: bytes | None = img.info.get("icc_profile")
+        # 新图片不写入 EXIF，先按其中的方向旋转，缩放时最长边也以显示方向为准
+        oriented = ImageOps.exif_transpose(img)
+        if options.grayscale:
+            out_img = oriented.convert("L")
+            # 彩色 ICC 配置不能用于灰度图片
+            if source_mode != "L":
+                icc_profile = None
+        elif oriented.mode not in ("RGB", "L"):
+            out_img = oriented.convert("RGB")
+            # CMYK 等配置与转换后的 RGB 数据不匹配
+            icc_profile = None
+        else:
+            out_img = oriented.copy()
+
+    if options.max_size > 0 and max(out_img.size) > options.max_size:
+        out_img.thumbnail((options.max_size, options.max_size), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    out_img.save(buffer, "JPEG", quality=options.quality, optimize=True, icc_profile=icc_profile)
+    encoded = buffer.getvalue()
+    # 重新编码后反而变大（例如原图已是低质量小图）时保留原图
+    return encoded if len(encoded) < len(data) else data
+
+
+def check_pillow_availability() -> bool:
+    if importlib.util.find_spec("PIL") is not None:
+        return True
+    pure_log("[yellow]警告：未安装 Pillow，已跳过图片重新编码。")
+    return False
+
+
+# 图片重新编码：限制最长边、按目标质量重新编码、可选转为灰度 20261019
+# 各卷共用一个进程池；结果按原图内容哈希缓存，重复运行与重复卷无需再次编码
+class ImageTransformer:
+    options: TransformOptions
+    jobs: int
+    result_dir: Path
+
+    _pool: ProcessPoolExecutor | None = None
+
+    def __init__(self, options: TransformOptions, cache_dir: Path, jobs: int = 0):
+        self.options = options
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.result_dir = cache_dir / options.key
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, section: dict, default_cache_dir: Path) -> "ImageTransformer | None":
+        if not section.get("enable", False) or not check_pillow_availability():
+            return None
+        options = TransformOptions(
+            max_size=int(section.get("max_size", 0)),
+            quality=int(section.get("quality", transform_default_quality)),
+            grayscale=bool(section.get("grayscale", False)),
+        )
+        cache_dir = Path(section["cache_dir"]) if section.get("cache_dir") else default_cache_dir
+        return cls(options, cache_dir, jobs=int(section.get("jobs", 0)))
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _result_path(self, digest: str) -> Path:
+        return self.result_dir / digest[:2] / f"{digest}.jpg"
+
+    def _store_result(self, digest: str, data: bytes):
+        result_path = self._result_path(digest)
+        result_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=result_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, result_path)
+
+    @staticmethod
+    def _replace_image(img_file: Path, data: bytes):
+        # 保留原时间戳，打包时仍以封面时间戳为准
+        st = img_file.stat()
+        img_file.write_bytes(data)
+        os.utime(img_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    def transform_dir(self, img_dir: Path) -> TransformStats:
+        stats = TransformStats()
+        pending: dict[str, list[Path]] = {}
+        sources: dict[str, bytes] = {}
+
+        for img_file in sorted(img_dir.iterdir()):
+            if img_file.suffix.lower() not in transform_image_suffixes:
+                continue
+            data = img_file.read_bytes()
+            digest = hashlib.sha1(data).hexdigest()
+            stats.images += 1
+            stats.bytes_before += len(data)
+
+            result_path = self._result_path(digest)
+            if result_path.is_file():
+                result = result_path.read_bytes()
+                stats.cache_hits += 1
+                stats.bytes_after += len(result)
+                self._replace_image(img_file, result)
+                continue
+
+            # 同一卷内重复的图片只编码一次
+            pending.setdefault(digest, []).append(img_file)
+            sources[digest] = data
+
+        if not pending:
+            return stats
+
+        pool = self._get_pool()
+        futures: dict[str, Future] = {
+            digest: pool.submit(_encode_image, data, self.options) for digest, data in sources.items()
+        }
+        for digest, future in futures.items():
+            result = future.result()
+            self._store_result(digest, result)
+            for img_file in pending[digest]:
+                stats.bytes_after += len(result)
+                self._replace_image(img_file, result)
+
+        return stats
@@ -0,0 +1,308 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .terminal_ui import pure_log
+from .utils import is_NT
+
+optimize_image_suffixes: tuple[str, ...] = (".jpg", ".jpeg")
+
+# 保留 APP0（JFIF）与 APP14（Adobe，影响 CMYK/YCCK 的色彩解释），其余 APPn 与 COM 均可无损删除
+_kept_app_markers: frozenset[int] = frozenset({0xE0, 0xEE})
+_exif_marker: int = 0xE1
+_icc_marker: int = 0xE2
+_com_marker: int = 0xFE
+_sos_marker: int = 0xDA
+_eoi_marker: int = 0xD9
+
+jpegtran_warning_exit: int = 2
+
+
+# 读取 APP1 段中 EXIF 的 Orientation（0x0112），不存在或无法解析时返回 None
+def exif_orientation(payload: bytes) -> int | None:
+    if payload[:6] != b"Exif\x00\x00" or len(payload) < 14:
+        return None
+    tiff = payload[6:]
+    order = {b"II": "little", b"MM": "big"}.get(tiff[:2])
+    if order is None:
+        return None
+    ifd = int.from_bytes(tiff[4:8], order)
+    if ifd + 2 > len(tiff):
+        return None
+    for i in range(int.from_bytes(tiff[ifd : ifd + 2], order)):
+        entry = ifd + 2 + i * 12
+        if entry + 12 > len(tiff):
+            return None
+        if int.from_bytes(tiff[entry : entry + 2], order) == 0x0112:
+            return int.from_bytes(tiff[entry + 8 : entry + 10], order)
+    return None
+
+
+def _is_junk_segment(marker: int, payload: bytes, keep_icc: bool) -> bool:
+    if marker == _com_marker:
+        return True
+    if marker == _exif_marker and exif_orientation(payload) not in (None, 1):
+        # 图片需要阅读器按 EXIF 方向旋转显示，删除后页面会被错误地横置或倒置
+        return False
+    if 0xE0 <= marker <= 0xEF:
+        if marker == _icc_marker and keep_icc:
+            return False
+        return marker not in _kept_app_markers
+    return False
+
+
+# 逐段扫描 JPEG 头部，删除 EXIF/XMP/ICC/注释等段，SOS 之后的熵编码数据原样保留 20261019
+# 带有非默认 Orientation 的 EXIF 段保留；结构异常时返回原数据，不冒险修改
+def strip_jpeg_metadata(data: bytes, keep_icc: bool = False) -> bytes:
+    if data[:2] != b"\xff\xd8":
+        return data
+    parts: list[bytes] = [data[:2]]
+    pos, size = 2, len(data)
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            return data
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # 段之间允许出现填充字节
+            pos += 1
+            continue
+        if marker in (_sos_marker, _eoi_marker):
+            parts.append(data[pos:])
+            return b"".join(parts)
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            parts.append(data[pos : pos + 2])
+            pos += 2
+            continue
+        length = int.from_bytes(data[pos + 2 : pos + 4], "big")
+        end = pos + 2 + length
+        if length < 2 or end > size:
+            return data
+        if not _is_junk_segment(marker, data[pos + 4 : end], keep_icc):
+            parts.append(data[pos:end])
+        pos = end
+    return data
+
+
+# 删除元数据后仍保留 EXIF 段，说明其中含有需要保留的方向信息
+def _has_exif(data: bytes) -> bool:
+    pos, size = 2, len(data)
+    while pos + 4 <= size and data[pos] == 0xFF and data[pos + 1] not in (_sos_marker, _eoi_marker):
+        if data[pos + 1] == _exif_marker:
+            return True
+        pos += 2 + int.from_bytes(data[pos + 2 : pos + 4], "big")
+    return False
+
+
+class ExternJpegtran:
+    jpegtran_exec: str
+
+    def __init__(self, jpegtran_exec: str = "jpegtran"):
+        self.jpegtran_exec = str(jpegtran_exec)
+
+    def check_jpegtran_availability(self) -> bool:
+        if shutil.which(self.jpegtran_exec) is not None:
+            return True
+        pure_log(
+            f'[yellow]警告：设定的 jpegtran 路径或别称 "{self.jpegtran_exec}" 不合法或不存在，将仅删除图片元数据。'
+        )
+        return False
+
+    # keep_exif 为 True 时输入已删除其余元数据，用 -copy all 保留剩下的 EXIF 方向信息
+    def _make_args(self, progressive: bool, keep_icc: bool, keep_exif: bool = False) -> list[str]:
+        copy = "all" if keep_exif else ("icc" if keep_icc else "none")
+        args = [self.jpegtran_exec, "-copy", copy, "-optimize"]
+        if progressive:
+            args.append("-progressive")
+        return args
+
+    # 通过标准输入输出传递数据，不产生临时文件
+    # jpegtran 遇到警告（如扫描图常见的 premature end of data segment）时以 2 退出，但仍输出有效结果
+    def optimize(
+        self, data: bytes, progressive: bool = False, keep_icc: bool = False, keep_exif: bool = False
+    ) -> bytes:
+        args = self._make_args(progressive, keep_icc, keep_exif)
+        result = subprocess.run(
+            args,
+            input=data,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW if is_NT() else 0,
+        )
+        if result.returncode == 0 or (result.returncode == jpegtran_warning_exit and result.stdout):
+            return result.stdout
+        raise subprocess.CalledProcessError(result.returncode, args, result.stdout, result.stderr)
+
+
+class OptimizeStats:
+    images: int
+    skipped: int
+    # jpegtran 失败、只删除了元数据或保持原样的图片
+    failed: int
+    bytes_before: int
+    bytes_after: int
+
+    def __init__(self):
+        self.images = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+# 无损优化 COVER/PAGExxx 图片：删除元数据，并在可用时调用 jpegtran 重建最优 Huffman 表 20261019
+# 已优化图片的哈希记录在缓存目录中，重复运行与经过重新编码阶段缓存的图片直接跳过
+class JpegOptimizer:
+    jpegtran: ExternJpegtran | None
+    progressive: bool
+    keep_icc: bool
+    jobs: int
+    cache_dir: Path
+
+    _pool: ThreadPoolExecutor | None = None
+    _optimized: set[str]
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        jpegtran: ExternJpegtran | None = None,
+        *,
+        progressive: bool = False,
+        keep_icc: bool = False,
+        jobs: int = 0,
+    ):
+        self.cache_dir = cache_dir
+        self.jpegtran = jpegtran
+        self.progressive = progressive
+        self.keep_icc = keep_icc
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._optimized = self._load_index()
+
+    @classmethod
+    def from_config(cls, section: dict, default_cache_dir: Path) -> "JpegOptimizer":
+        jpegtran: ExternJpegtran | None = ExternJpegtran(section.get("jpegtran_executable_path", "jpegtran"))
+        if not jpegtran.check_jpegtran_availability():
+            jpegtran = None
+        cache_dir = Path(section["cache_dir"]) if section.get("cache_dir") else default_cache_dir
+        return cls(
+            cache_dir,
+            jpegtran,
+            progressive=bool(section.get("progressive", False)),
+            keep_icc=bool(section.get("keep_icc", False)),
+            jobs=int(section.get("jobs", 0)),
+        )
+
+    # 处理方式：jpegtran 是否可用及参数，不同方式的结果与索引互不混用
+    @property
+    def mode(self) -> str:
+        tool = "jpegtran" if self.jpegtran is not None else "strip"
+        return f"{tool}-{'prog' if self.progressive else 'base'}-{'icc' if self.keep_icc else 'noicc'}"
+
+    # 已优化图片的索引按处理方式分别记录，仅删除元数据处理过的图片在 jpegtran 可用后仍会重新优化
+    @property
+    def index_file(self) -> Path:
+        return self.cache_dir / f"optimized-{self.mode}.txt"
+
+    # 旧版本直接存放在 cache_dir 下的结果可能已删除 EXIF 方向信息，不再复用
+    @property
+    def result_dir(self) -> Path:
+        return self.cache_dir / "results" / self.mode
+
+    def _load_index(self) -> set[str]:
+        try:
+            with self.index_file.open("r", encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def _append_index(self, digests: list[str]):
+        with self._lock:
+            new_digests = [d for d in digests if d not in self._optimized]
+            if not new_digests:
+                return
+            self._optimized.update(new_digests)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with self.index_file.open("a", encoding="utf-8") as f:
+                f.writelines(f"{d}\n" for d in new_digests)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="moe-jpegopt")
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _result_path(self, digest: str) -> Path:
+        return self.result_dir / digest[:2] / f"{digest}.jpg"
+
+    # 返回结果与是否按当前方式完整处理；jpegtran 失败时退回仅删除元数据的结果，不影响整卷转换
+    def _optimize_bytes(self, data: bytes) -> tuple[bytes, bool]:
+        result = strip_jpeg_metadata(data, keep_icc=self.keep_icc)
+        complete = True
+        if self.jpegtran is not None:
+            keep_exif = _has_exif(result)
+            try:
+                result = self.jpegtran.optimize(
+                    result, progressive=self.progressive, keep_icc=self.keep_icc, keep_exif=keep_exif
+                )
+            except (OSError, subprocess.CalledProcessError):
+                complete = False
+        return (result if len(result) < len(data) else data), complete
+
+    # 返回处理前后的大小、需要记入索引的哈希，以及是否未能完整处理
+    def _optimize_file(self, img_file: Path) -> tuple[int, int, list[str], bool]:
+        data = img_file.read_bytes()
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in self._optimized:
+            return len(data), len(data), [], False
+
+        result_path = self._result_path(digest)
+        complete = True
+        if result_path.is_file():
+            result = result_path.read_bytes()
+        else:
+            result, complete = self._optimize_bytes(data)
+            if complete:
+                # 未完整处理的结果不缓存，之后的运行会重新尝试
+                result_path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_name = tempfile.mkstemp(dir=result_path.parent, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(result)
+                os.replace(tmp_name, result_path)
+
+        if result != data:
+            # 保留原时间戳，打包时仍以封面时间戳为准
+            st = img_file.stat()
+            img_file.write_bytes(result)
+            os.utime(img_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        return len(data), len(result), [hashlib.sha1(result).hexdigest()] if complete else [], not complete
+
+    def optimize_dir(self, img_dir: Path) -> OptimizeStats:
+        stats = OptimizeStats()
+        img_files = [f for f in sorted(img_dir.iterdir()) if f.suffix.lower() in optimize_image_suffixes]
+        new_digests: list[str] = []
+        for before, after, digests, failed in self._get_pool().map(self._optimize_file, img_files):
+            stats.images += 1
+            stats.bytes_before += before
+            stats.bytes_after += after
+            if failed:
+                stats.failed += 1
+            elif not digests:
+                stats.skipped += 1
+            new_digests.extend(digests)
+        self._append_index(new_digests)
+        return stats
@@ -1,36 +1,59 @@
+import hashlib
+import json
+import tempfile
 import zipfile
+from contextlib import AbstractContextManager, nullcontext
 from fnmatch import fnmatch
-from io import TextIOWrapper
 from pathlib import Path
-from typing import NamedTuple
+from typing import TYPE_CHECKING, BinaryIO, NamedTuple
 
 import tomllib
 from rich.console import Console, OverflowMethod
-from rich.prompt import Prompt
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    stop_after_delay,
-)
 
-from .comic_info import ComicInfoExtractor
+from .disk_admission import DiskAdmission, estimate_space
 from .file_system import (
     Extern7z,
     GeneralPath,
     GeneralPathUnwrapped,
+    RemovalTask,
     check_if_path_string_valid,
     copy_dir_struct,
-    copy_dir_struct_ext_to_list,
+    copy_dir_struct_input_to_list,
     copy_dir_struct_to_list,
     copy_file_timestamp,
     is_dir_nonexistent_or_empty,
     make_archive_threadsafe,
+    make_archive_to_stream,
     print_dir_tree,
     remove_if_exists,
+    remove_tree_parallel,
     unpack_archive_with_timestamp,
 )
+from .format_detector import (
+    InputFormat,
+    UnsupportedFormatError,
+    detect_input_format,
+    image_suffixes,
+    input_format_kinds,
+    input_suffixes,
+)
+from .page_meta import PageMeta, scan_page_dir, write_page_sidecar
+from .retry_policy import RunMetrics, call_with_retry
 from .terminal_ui import DynamicLogger, PathTable, tui_log, tui_print
+from .utils import format_size
+from .workspace_cache import Workspace, WorkspaceCache
+
+# lxml、tenacity 等依赖仅在实际解析或打包时导入，清理等命令无需加载 20261019
+if TYPE_CHECKING:
+    from .async_runner import BlockingIO
+    from .comic_info import ComicInfoExtractor
+    from .image_transform import ImageTransformer
+    from .jpeg_optimizer import JpegOptimizer
+    from .page_dedupe import PageDeduper
+    from .repack_core import RepackResult
+
+
+comic_info_name: str = "ComicInfo.xml"
 
 
 class ComicFile:
@@ -129,13 +152,42 @@ class Repacker(IRepacker):
     _exclude_list: list[str] = []
     _filelist: list[ComicFile] = []
     _faillist: list[ComicFile] = []
+    _transformer: "ImageTransformer | None" = None
+    _optimizer: "JpegOptimizer | None" = None
+    _deduper: "PageDeduper | None" = None
+    # 为 True 时转换前先检查压缩包结构，未通过的文件可移入隔离目录
+    _preflight: bool = False
+    _quarantine_dir: Path | None = None
+    # 磁盘空间准入控制，未启用时为 None
+    _admission: DiskAdmission | None = None
+    # 已完成各卷工作目录的保留与淘汰
+    _workspace_cache: WorkspaceCache | None = None
+    # 图片处理阶段的配置摘要，决定保留的工作目录能否复用
+    _pipeline_signature: str = ""
+    # 启用的输入格式，见 format_detector.input_format_kinds
+    _input_formats: tuple[str, ...] = input_format_kinds
+    # 为 True 时在 CBZ 旁写入各页哈希索引
+    page_hash_sidecar: bool = False
+    # 为 True 时保留各卷的解压工作目录
+    keep_cache: bool = False
 
     def __init__(self, verbose: bool = True, console: Console | None = None, dlogger: DynamicLogger | None = None):
         super().__init__(verbose, console=console, sevenz=None, dlogger=dlogger)
+        self._known_output_dirs: set[Path] = set()
+        # 图片处理阶段的配置，校验输出时据此判断页面是否经过重新编码或删除
+        self._pipeline_config: dict[str, dict] = {}
+        self.metrics = RunMetrics()
 
-    def init_data(self, config_path: str = "config.toml", init_filelist_flag: bool = True, ignore_clean: bool = False):
+    # interactive 为 False 时（无界面模式）不询问用户：输出文件夹不存在时直接创建
+    def init_data(
+        self,
+        config_path: str = "config.toml",
+        init_filelist_flag: bool = True,
+        ignore_clean: bool = False,
+        interactive: bool = True,
+    ):
         try:
-            self.init_from_config(config_path)
+            self.init_from_config(config_path, interactive=interactive)
 
             checked: InitValidityChecker = self.check_init_validity()
             if checked.flag is False:
@@ -147,26 +199,28 @@ class Repacker(IRepacker):
         except InvalidPathStringException:
             ...
 
-    def init_from_config(self, config_path: str):
+    def init_from_config(self, config_path: str, interactive: bool = True):
         # 用 tomllib 替代 ConfigParser 进行解析 20231207
         config_file = Path(config_path)
         with config_file.open("rb") as cf:
             config = tomllib.load(cf)
 
         input_dir_obj: Path | None = check_if_path_string_valid(
-            config["DEFAULT"]["input_dir"], check_only=True, force_create=False
+            config["DEFAULT"]["input_dir"], check_only=True, force_create=False, console=self.console
         )
         output_dir_obj: Path | None = check_if_path_string_valid(
-            config["DEFAULT"]["output_dir"], check_only=False, force_create=False
+            config["DEFAULT"]["output_dir"], check_only=False, force_create=not interactive, console=self.console
         )
         cache_dir_obj: Path | None = check_if_path_string_valid(
-            config["DEFAULT"]["cache_dir"], check_only=False, force_create=True
+            config["DEFAULT"]["cache_dir"], check_only=False, force_create=True, console=self.console
         )
 
         self._input_dir = input_dir_obj
         self._output_dir = output_dir_obj
         self._cache_dir = cache_dir_obj
         self._exclude_list = config["DEFAULT"]["exclude"]
+        self.page_hash_sidecar = config["DEFAULT"].get("page_hash_sidecar", False)
+        self._input_formats = tuple(config["DEFAULT"].get("input_formats", input_format_kinds))
 
         def _set_use_extern_7z_switch() -> bool:
             use_extern_7z: bool = config["DEFAULT"]["enable_extern_7z_use"]
@@ -183,6 +237,58 @@ class Repacker(IRepacker):
 
         self._use_extern_7z = _set_use_extern_7z_switch()
 
+        # 可选的转换前快速检查 20261019
+        check_config: dict = config.get("CHECK", {})
+        self._preflight = check_config.get("enable", False)
+        quarantine_dir: str = check_config.get("quarantine_dir", "")
+        self._quarantine_dir = Path(quarantine_dir) if quarantine_dir else None
+
+        # 受管理的缓存：已完成的工作目录按最近使用保留，超出限制时淘汰 20261019
+        if cache_dir_obj is not None:
+            self._workspace_cache = WorkspaceCache.from_config(config.get("CACHE", {}), cache_dir_obj)
+        self._pipeline_config = {name: config.get(name, {}) for name in ("TRANSFORM", "OPTIMIZE", "DEDUPE")}
+        self._pipeline_signature = hashlib.sha1(
+            json.dumps(self._pipeline_config, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        # 磁盘空间准入控制，默认启用 20261019
+        disk_config: dict = config.get("DISK", {})
+        if disk_config.get("enable", True) and cache_dir_obj is not None and output_dir_obj is not None:
+            self._admission = DiskAdmission.from_config(
+                disk_config,
+                cache_dir_obj,
+                output_dir_obj,
+                evict=self._evict_workspaces,
+                on_pause=self._log_disk_pause,
+            )
+
+        # 可选的图片重新编码阶段，未启用时不加载 Pillow 与进程池 20261019
+        transform_config: dict = config.get("TRANSFORM", {})
+        if transform_config.get("enable", False) and cache_dir_obj is not None:
+            from .image_transform import ImageTransformer
+
+            self._transformer = ImageTransformer.from_config(
+                transform_config, default_cache_dir=cache_dir_obj.with_name(f"{cache_dir_obj.name}.transform")
+            )
+
+        # 可选的 JPEG 无损优化阶段 20261019
+        optimize_config: dict = config.get("OPTIMIZE", {})
+        if optimize_config.get("enable", False) and cache_dir_obj is not None:
+            from .jpeg_optimizer import JpegOptimizer
+
+            self._optimizer = JpegOptimizer.from_config(
+                optimize_config, default_cache_dir=cache_dir_obj.with_name(f"{cache_dir_obj.name}.optimize")
+            )
+
+        # 可选的跨卷重复页面检测，索引在各次运行之间保留 20261019
+        dedupe_config: dict = config.get("DEDUPE", {})
+        if dedupe_config.get("enable", False) and cache_dir_obj is not None:
+            from .page_dedupe import PageDeduper
+
+            self._deduper = PageDeduper.from_config(
+                dedupe_config, default_index_dir=cache_dir_obj.with_name(f"{cache_dir_obj.name}.dedupe")
+            )
+
     def check_init_validity(self) -> InitValidityChecker:
         if self._input_dir is None:
             return InitValidityChecker(flag=False, name="输入目录")
@@ -207,6 +313,18 @@ class Repacker(IRepacker):
     def cache_dir(self) -> str:
         return str(self._cache_dir)
 
+    @property
+    def exclude_list(self) -> list[str]:
+        return self._exclude_list
+
+    @property
+    def quarantine_dir(self) -> Path | None:
+        return self._quarantine_dir
+
+    @property
+    def input_suffixes(self) -> tuple[str, ...]:
+        return input_suffixes(self._input_formats)
+
     @property
     def filelist(self) -> list[ComicFile]:
         return self._filelist
@@ -215,33 +333,213 @@ class Repacker(IRepacker):
     def faillist(self) -> list[ComicFile]:
         return self._faillist
 
-    def repack(self, file_t: ComicFile):
+    @property
+    def workspace_cache(self) -> WorkspaceCache | None:
+        return self._workspace_cache
+
+    @property
+    def pipeline_config(self) -> dict[str, dict]:
+        return self._pipeline_config
+
+    @property
+    def transformer(self) -> "ImageTransformer | None":
+        return self._transformer
+
+    @property
+    def deduper(self) -> "PageDeduper | None":
+        return self._deduper
+
+    # 释放各卷共用的进程池等资源
+    def close(self):
+        if self._transformer is not None:
+            self._transformer.shutdown()
+        if self._optimizer is not None:
+            self._optimizer.shutdown()
+        if self._deduper is not None:
+            self._deduper.close()
+
+    # 监视模式下为新发现的文档构建任务，并按需创建输出子目录 20261019
+    def make_comic_file(self, file_path: Path) -> ComicFile:
+        file_t = ComicFile(
+            file_path=file_path,
+            in_dir=self._input_dir,
+            out_dir=self._output_dir,
+            cache_dir=self._cache_dir,
+        )
+        out_parent = file_t.dst_file.parent
+        if out_parent not in self._known_output_dirs:
+            out_parent.mkdir(parents=True, exist_ok=True)
+            self._known_output_dirs.add(out_parent)
+        return file_t
+
+    # 返回失败原因，成功时返回 None，供分布式工作节点回报结果
+    # prepared 为 prepare_async 提前得到的格式识别结果，为 None 时在此识别 20261019
+    def repack(self, file_t: ComicFile, prepared: InputFormat | Exception | None = None) -> Exception | None:
         sevenz: Extern7z | None = None
         if self._use_extern_7z:
             sevenz = self._extern_7z
         try:
-            single_repacker = SingleRepacker(
-                comic_file=file_t,
-                console=self.console,
-                verbose=self.verbose,
-                sevenz=sevenz,
-                dlogger=self.dlogger,
-            )
-            single_repacker.pack_folder()
+            if isinstance(prepared, Exception):
+                raise prepared
+            input_format = prepared if prepared is not None else self._detect(file_t)
+            with self._admit(file_t, input_format):
+                if input_format.is_mox:
+                    single_repacker = SingleRepacker(
+                        comic_file=file_t,
+                        console=self.console,
+                        verbose=self.verbose,
+                        sevenz=sevenz,
+                        dlogger=self.dlogger,
+                        keep_workspace=self.keep_cache,
+                        metrics=self.metrics,
+                        transformer=self._transformer,
+                        optimizer=self._optimizer,
+                        page_hash_sidecar=self.page_hash_sidecar,
+                        deduper=self._deduper,
+                        workspace_cache=self._workspace_cache,
+                        pipeline_signature=self._pipeline_signature,
+                    )
+                    with single_repacker:
+                        single_repacker.pack_folder()
+                else:
+                    self._repack_generic(file_t, input_format)
+            self.metrics.record_success()
         except Exception as e:
             self.log(f"[red]⚠️ 错误[/]：{e}")
+            self.metrics.record_failure(e)
             self._faillist.append(file_t)
+            return e
+        return None
+
+    # 先仅读取中央目录识别格式，不支持的文件不创建工作目录、不解压
+    def _detect(self, file_t: ComicFile) -> InputFormat:
+        if self._preflight:
+            return self._preflight_check(file_t)
+        return call_with_retry(detect_input_format, file_t.src_file, self._input_formats, metrics=self.metrics)
+
+    # 异步编排时在 I/O 线程池中提前识别后续各卷的格式，与正在转换的卷重叠执行 20261019
+    # 识别失败时返回异常，由 repack 统一记录
+    async def prepare_async(self, file_t: ComicFile, io: "BlockingIO") -> "InputFormat | Exception":
+        try:
+            return await io.call(self._detect, file_t)
+        except Exception as e:
+            return e
+
+    # 未通过检查的文件在解压前即失败，并按配置移入隔离目录 20261019
+    def _preflight_check(self, file_t: ComicFile) -> InputFormat:
+        from .archive_check import CorruptArchiveError, check_archive, quarantine
+
+        checked = call_with_retry(check_archive, file_t.src_file, metrics=self.metrics)
+        if not checked.ok:
+            reason = checked.reason
+            if self._quarantine_dir is not None:
+                target = quarantine(file_t.src_file, self._quarantine_dir, file_t.relative_path, reason)
+                reason += f"（已移至 {target}）"
+            raise CorruptArchiveError(reason)
+        assert checked.input_format is not None
+        if checked.input_format.kind not in self._input_formats:
+            raise UnsupportedFormatError(f"未启用的输入格式 {checked.input_format.kind}")
+        return checked.input_format
+
+    # 开始解压或打包之前按中央目录估算所需空间，空间不足时释放缓存或等待其他任务结束 20261019
+    def _admit(self, file_t: ComicFile, input_format: InputFormat) -> AbstractContextManager:
+        if self._admission is None:
+            return nullcontext()
+        # 外部 7z 解压全部条目
+        estimate = estimate_space(file_t.src_file, input_format, extract_all=self._use_extern_7z)
+        return self._admission.admit(estimate, file_t.src_file.name)
+
+    # 从最久未使用的一卷开始删除保留的工作目录，返回释放的字节数
+    def _evict_workspaces(self, needed: int) -> int:
+        if self._workspace_cache is None:
+            return 0
+        freed = self._workspace_cache.evict(needed)
+        if freed > 0:
+            self.log(f"[yellow]提示：磁盘空间不足，已删除保留的工作目录（{format_size(freed)}）")
+        return freed
+
+    def _log_disk_pause(self, name: str, shortfall: int):
+        self.log(f"[yellow]⏳ 磁盘空间还差 {format_size(shortfall)}，{name} 等待其他任务完成后再开始")
+
+    # 其他格式走不解压的快速路径，图片原样复制，不经过重新编码、优化与去重阶段 20261019
+    def _repack_generic(self, file_t: ComicFile, input_format: InputFormat) -> None:
+        from .repack_core import repack_generic
+
+        result = call_with_retry(
+            repack_generic,
+            file_t.src_file,
+            input_format,
+            file_t.dst_file.parent,
+            page_hashes=self.page_hash_sidecar,
+            metrics=self.metrics,
+        )
+        if self.page_hash_sidecar:
+            write_page_sidecar(file_t.dst_file.parent / f"{result.comic_name}.pages.json", result.pages)
+        if self.dlogger is not None:
+            self.dlogger.update_log(
+                f"✅ {result.comic_name} => [green]打包完成（{input_format.kind}，共 {result.page_count} 页）"
+            )
+
+    # 单卷转换结果直接写入二进制流，不落地 CBZ；与 repack 使用相同的配置与图片处理阶段 20261019
+    # 未启用任何图片处理阶段时直接在内存中由 EPUB 生成 CBZ，无需解压；流式写出无法重试，失败直接抛出
+    def repack_to_stream(self, file_t: ComicFile, stream: BinaryIO) -> "RepackResult":
+        input_format = self._detect(file_t)
+        if not input_format.is_mox:
+            raise UnsupportedFormatError(f"{file_t.src_file.name} 不是 Mox.moe 的 EPUB 文件，无法写入数据流")
+        with self._admit(file_t, input_format):
+            if self._transformer is None and self._optimizer is None and self._deduper is None:
+                from .repack_core import repack_bytes
+
+                with file_t.src_file.open("rb") as epub_file:
+                    result = repack_bytes(epub_file, stream, page_hashes=self.page_hash_sidecar)
+            else:
+                sevenz: Extern7z | None = None
+                if self._use_extern_7z:
+                    sevenz = self._extern_7z
+                single_repacker = SingleRepacker(
+                    comic_file=file_t,
+                    console=self.console,
+                    verbose=self.verbose,
+                    sevenz=sevenz,
+                    dlogger=self.dlogger,
+                    keep_workspace=self.keep_cache,
+                    metrics=self.metrics,
+                    transformer=self._transformer,
+                    optimizer=self._optimizer,
+                    page_hash_sidecar=self.page_hash_sidecar,
+                    deduper=self._deduper,
+                    workspace_cache=self._workspace_cache,
+                    pipeline_signature=self._pipeline_signature,
+                )
+                with single_repacker:
+                    result = single_repacker.pack_to_stream(stream)
+        # 旁注文件仍写入 CBZ 原本所在的输出文件夹
+        if self.page_hash_sidecar:
+            file_t.dst_file.parent.mkdir(parents=True, exist_ok=True)
+            write_page_sidecar(file_t.dst_file.parent / f"{result.comic_name}.pages.json", result.pages)
+        self.metrics.record_success()
+        return result
 
     def print_list(self):
         def new_comic_path(file_t: ComicFile) -> Path:
-            single_repacker = SingleRepacker(
-                comic_file=file_t,
-                no_work=True,
-                verbose=False,
-                console=self.console,
-                dlogger=self.dlogger,
-            )
-            comic_name: str = single_repacker.comic_name
+            try:
+                input_format = detect_input_format(file_t.src_file, self._input_formats)
+            except (ValueError, zipfile.BadZipFile) as e:
+                # 无法转换的文件保留原名并标注原因
+                return file_t.src_file.relative_to(self._input_dir.parent).with_name(f"{file_t.src_file.name} ⚠️ {e}")
+            if input_format.is_mox:
+                single_repacker = SingleRepacker(
+                    comic_file=file_t,
+                    no_work=True,
+                    verbose=False,
+                    console=self.console,
+                    dlogger=self.dlogger,
+                )
+                comic_name: str = single_repacker.comic_name
+            else:
+                from .repack_core import generic_comic_name
+
+                comic_name = generic_comic_name(file_t.src_file)
             path: Path = file_t.dst_file.parent / f"{comic_name}"
             relative_path = path.relative_to(self._output_dir.parent)
             return relative_path
@@ -249,14 +547,21 @@ class Repacker(IRepacker):
         fake_list: list[Path] = list(map(new_comic_path, self.filelist))
         print_dir_tree(fake_list, self.console)
 
-    def clean_cache(self, verbose: bool = True):
-        remove_if_exists(self.cache_dir)
+    # 清理均先将目录改名移开，background=True 时不等待实际删除完成 20261019
+    def clean_cache(self, verbose: bool = True, background: bool = False) -> RemovalTask:
+        return remove_if_exists(self.cache_dir, background=background)
+
+    # 启用受管理的缓存时，结束时只按限制淘汰，保留最近使用的工作目录供下次复用 20261019
+    def trim_cache(self) -> int:
+        if self._workspace_cache is None:
+            return 0
+        return self._workspace_cache.trim()
 
-    def clean_input(self, verbose: bool = True):
-        remove_if_exists(self.input_dir, recreate=True)
+    def clean_input(self, verbose: bool = True, background: bool = False) -> RemovalTask:
+        return remove_if_exists(self.input_dir, recreate=True, background=background)
 
-    def clean_output(self, verbose: bool = True):
-        remove_if_exists(self.output_dir, recreate=True)
+    def clean_output(self, verbose: bool = True, background: bool = False) -> RemovalTask:
+        return remove_if_exists(self.output_dir, recreate=True, background=background)
 
     # 初始化路径并复制目录结构
     def _init_path_obj(self, exclude=None, ignore_clean: bool = False) -> list[ComicFile]:
@@ -267,24 +572,37 @@ class Repacker(IRepacker):
             self.print(PathTable(self.input_dir, self.output_dir, self.cache_dir))
         # 文件列表抽取
         if not ignore_clean:
+            from rich.prompt import Prompt
+
+            managed_cache = self._workspace_cache is not None and self._workspace_cache.reuse
             if (self._cache_dir is None) or is_dir_nonexistent_or_empty(self._cache_dir):
                 clean_cache_flag = False
+            elif managed_cache:
+                # 受管理的缓存不整体清空，只按限制淘汰，保留可复用的工作目录 20261019
+                clean_cache_flag = False
+                self.trim_cache()
             else:
-                clean_cache_flag = Prompt.ask("请选择是否清空缓存文件夹", choices=["y", "n"], default="y")
+                clean_cache_flag = Prompt.ask("请选择是否清空缓存文件夹", choices=["y", "n"], default="y") == "y"
             if (self._output_dir is None) or is_dir_nonexistent_or_empty(self._output_dir):
                 clean_output_flag = False
             else:
-                clean_output_flag = Prompt.ask("请选择是否清空输出文件夹", choices=["y", "n"], default="y")
+                clean_output_flag = Prompt.ask("请选择是否清空输出文件夹", choices=["y", "n"], default="y") == "y"
             if clean_cache_flag:
-                self.clean_cache(verbose=False)
+                self.clean_cache(verbose=False, background=True)
             if clean_output_flag:
-                self.clean_output(verbose=False)
+                self.clean_output(verbose=False, background=True)
             if not self._cache_dir.exists():
                 self._cache_dir.mkdir(parents=True, exist_ok=True)
             if not self._output_dir.exists():
                 self._output_dir.mkdir(parents=True, exist_ok=True)
 
-        raw_filelist: list[Path] = copy_dir_struct_ext_to_list(self.input_dir)
+        # 按启用的输入格式收录文件与图片文件夹，输出与缓存目录位于输入目录之内时跳过 20261019
+        raw_filelist: list[Path] = copy_dir_struct_input_to_list(
+            self.input_dir,
+            ext=self.input_suffixes,
+            image_ext=image_suffixes if "image-dir" in self._input_formats else (),
+            skip_dirs=[self._output_dir, self._cache_dir],
+        )
         filelist: list[ComicFile] = [
             ComicFile(
                 file_path=f,
@@ -307,8 +625,9 @@ class SingleRepacker(IRepacker):
     _cbz_file: Path
     _extract_dir: Path
     _pack_from_dir: Path
-    _extractor: ComicInfoExtractor
+    _extractor: "ComicInfoExtractor"
     _comic_name: str
+    _comic_info_xml: bytes = b""
 
     def __init__(
         self,
@@ -318,18 +637,63 @@ class SingleRepacker(IRepacker):
         console: Console | None = None,
         sevenz: GeneralPath | Extern7z = None,
         dlogger: DynamicLogger | None = None,
+        keep_workspace: bool = False,
+        metrics: RunMetrics | None = None,
+        transformer: "ImageTransformer | None" = None,
+        optimizer: "JpegOptimizer | None" = None,
+        page_hash_sidecar: bool = False,
+        deduper: "PageDeduper | None" = None,
+        workspace_cache: WorkspaceCache | None = None,
+        pipeline_signature: str = "",
     ):
         super().__init__(verbose, console=console, sevenz=sevenz, dlogger=dlogger)
+        self._metrics = metrics
+        self._transformer = transformer
+        self._optimizer = optimizer
+        self._page_hash_sidecar = page_hash_sidecar
+        self._pages: list[PageMeta] = []
+        self._deduper = deduper
+        self._pages_dropped = False
 
         self._cache_dir = comic_file.cache_folder
         self._zip_file = comic_file.src_file
         self._cbz_file = comic_file.dst_file
+        self._keep_workspace = keep_workspace
+        self._workspace_cache = workspace_cache
+        self._pipeline_signature = pipeline_signature
 
         if no_work:
             self._analyse_archive()
         else:
-            self._set_unique_extract_dir()
-            self._pack_from_dir = self._load_zip_img()
+            warm: Workspace | None = None
+            if workspace_cache is not None:
+                warm = workspace_cache.acquire(self._zip_file, pipeline_signature)
+            if warm is not None:
+                self._extract_dir = warm.path
+            else:
+                self._set_unique_extract_dir()
+            try:
+                self._pack_from_dir = self._reuse_workspace(warm) if warm is not None else self._load_zip_img()
+            except BaseException:
+                self.cleanup()
+                raise
+
+    # 作为上下文管理器使用时，退出即清理本卷的工作目录；成功时交由缓存决定保留或删除
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_details):
+        if exc_type is None and self._workspace_cache is not None and hasattr(self, "_pack_from_dir"):
+            self._workspace_cache.release(
+                self.extract_dir,
+                self._zip_file,
+                self._pipeline_signature,
+                self._pack_from_dir.name,
+                pages_dropped=self._pages_dropped,
+                keep_all=self._keep_workspace,
+            )
+            return
+        self.cleanup()
 
     @property
     def cache_dir(self) -> Path:
@@ -344,24 +708,26 @@ class SingleRepacker(IRepacker):
         return self._comic_name
 
     # 避免相同文件名解压到缓存文件夹时冲突
+    # 改用 mkdtemp 原子创建各卷独立的工作目录，并发任务之间不会争用同一路径 20261019
     def _set_unique_extract_dir(self) -> None:
-        self._extract_dir = self.cache_dir
-        while self._extract_dir.is_dir():
-            self._extract_dir = self.cache_dir.with_suffix(".1")
+        self.cache_dir.parent.mkdir(parents=True, exist_ok=True)
+        volume_key: str = hashlib.sha1(str(self._zip_file).encode("utf-8")).hexdigest()[:8]
+        self._extract_dir = Path(
+            tempfile.mkdtemp(prefix=f"{self.cache_dir.name}.{volume_key}.", dir=self.cache_dir.parent)
+        )
 
-    # 解压前单独访问 opf 文件获取元数据
-    # https://stackoverflow.com/questions/20601796/how-to-open-an-unicode-text-file-inside-a-zip
-    def _extract_opf_from_epub(self, epub_file: str | Path, opf_name: str = "vol.opf") -> str:
-        with zipfile.ZipFile(str(epub_file), "r") as zip_ref:
-            with zip_ref.open(opf_name, "r") as opf_file:
-                text: str = ""
-                for line in TextIOWrapper(opf_file, encoding="utf-8"):
-                    text += line
-                return text
+    def cleanup(self) -> None:
+        extract_dir: Path | None = getattr(self, "_extract_dir", None)
+        if extract_dir is None or self._keep_workspace:
+            return
+        remove_tree_parallel(extract_dir, jobs=4)
 
+    # 解压前单独访问 opf 文件获取元数据
+    # 直接以字节流交给 lxml 增量解析，不再逐行解码拼接 20261019
     def _analyse_archive(self) -> None:
-        opf_text: str = self._extract_opf_from_epub(self._zip_file, "vol.opf")
-        self._extractor = ComicInfoExtractor(use_text=True, opf_text=opf_text)
+        from .comic_info import ComicInfoExtractor
+
+        self._extractor = ComicInfoExtractor.from_epub(self._zip_file, "vol.opf")
         self._comic_name = self._extractor.comic_file_name
 
     def _extract_archive(self) -> None:
@@ -387,36 +753,107 @@ class SingleRepacker(IRepacker):
                 imgfile.unlink()
         return img_dir
 
+    # 与同一系列其他卷比对，报告或删除重复的版权页、封面等页面 20261019
+    def _dedupe_pages(self, img_dir: Path) -> None:
+        if self._deduper is None:
+            return
+        self.status.update(f"⏳ {self.comic_name} => [yellow]开始检测重复页面")
+        mox_book = self._extractor.mox_book
+        series = mox_book.bookid or str(self._extractor.comic_info.to_dict()["Series"])
+        stats, matches = self._deduper.process_dir(img_dir, series=series, volume=mox_book.id or self.comic_name)
+        if not matches:
+            return
+        self._pages_dropped = stats.dropped > 0
+        details = "、".join(f"{m.page.file.stem}≈{m.volume}#{m.other_page}" for m in matches[:5])
+        if len(matches) > 5:
+            details += " 等"
+        self.dlogger.update_log(
+            f"✅ {self.comic_name} => [green]发现 {stats.duplicates} 个重复页面（{details}），"
+            f"删除 {stats.dropped} 页，节省 {format_size(stats.bytes_dropped)}"
+        )
+
+    # 在解压与打包之间按配置重新编码图片 20261019
+    def _transform_images(self, img_dir: Path) -> None:
+        if self._transformer is None:
+            return
+        self.status.update(f"⏳ {self.comic_name} => [yellow]开始重新编码图片")
+        stats = self._transformer.transform_dir(img_dir)
+        self.dlogger.update_log(
+            f"✅ {self.comic_name} => [green]重新编码 {stats.images} 张图片（缓存命中 {stats.cache_hits}），"
+            f"{format_size(stats.bytes_before)} → {format_size(stats.bytes_after)}"
+        )
+
+    # 无损优化图片并报告本卷节省的空间 20261019
+    def _optimize_images(self, img_dir: Path) -> None:
+        if self._optimizer is None:
+            return
+        self.status.update(f"⏳ {self.comic_name} => [yellow]开始无损优化图片")
+        stats = self._optimizer.optimize_dir(img_dir)
+        self.dlogger.update_log(
+            f"✅ {self.comic_name} => [green]无损优化 {stats.images} 张图片（跳过 {stats.skipped}），"
+            f"节省 {format_size(stats.bytes_saved)}"
+        )
+        if stats.failed:
+            self.dlogger.update_log(
+                f"[yellow]提示：{self.comic_name} 中 {stats.failed} 张图片无法由 jpegtran 处理，仅删除了元数据。"
+            )
+
     # 增加 ComicInfo.xml 配置文件 20231212
-    def _export_comicinfo_xml(self, xml_path: Path) -> None:
-        self._extractor.comic_info.to_xml_file(xml_path)
+    # 在各图片处理阶段之后仅读取文件头获取各页尺寸，一并写入 ComicInfo.xml 20261019
+    # 只生成字节，打包时直接写入压缩包，不再落地为文件 20261019
+    def _export_comicinfo_xml(self, img_dir: Path) -> None:
+        self._pages = scan_page_dir(img_dir, exclude=[comic_info_name], with_hash=self._page_hash_sidecar)
+        comic_info = self._extractor.comic_info
+        if self._pages_dropped:
+            comic_info.page_count = len(self._pages)
+        comic_info.set_pages(page.to_xml_attrib() for page in self._pages)
+        self._comic_info_xml = comic_info.to_xml()
+
+    # 复用保留的工作目录：图片已整理与处理完毕，只重新读取元数据、改名并生成 ComicInfo.xml 20261019
+    def _reuse_workspace(self, warm: Workspace) -> Path:
+        self.status.update(f"[yellow]⏳ 开始解析 {self._zip_file.stem}")
+        call_with_retry(self._analyse_archive, metrics=self._metrics)
+        self._pages_dropped = warm.pages_dropped
+
+        img_dir = self.extract_dir / warm.image_dir
+        if img_dir.name != self.comic_name:
+            img_dir = img_dir.rename(img_dir.with_name(self.comic_name))
+        # 早先版本或外部 7z 打包时写入的 ComicInfo.xml
+        (img_dir / comic_info_name).unlink(missing_ok=True)
+        self._export_comicinfo_xml(img_dir)
+
+        self.dlogger.update_log(f"✅ {self.comic_name} => [green]复用缓存中的工作目录")
+        return img_dir
 
     # 单个压缩包根据HTML文件中的图片地址进行提取
     # 拆分为多个小函数以提高可读性 20231212
     def _load_zip_img(self) -> Path:
         self.status.update(f"[yellow]⏳ 开始解析 {self._zip_file.stem}")
-        self._analyse_archive()
-        self._extract_archive()
+        # 读取与解压可重复执行，遇到暂时性 I/O 错误时按分类策略重试
+        call_with_retry(self._analyse_archive, metrics=self._metrics)
+        call_with_retry(self._extract_archive, metrics=self._metrics)
 
         self.status.update(f"⏳ {self.comic_name} => [yellow]开始提取")
         self._extract_images()
 
         img_dir = self.extract_dir / "image"
         img_dir = self._organize_images(img_dir, self.comic_name)
+        self._dedupe_pages(img_dir)
+        self._transform_images(img_dir)
+        self._optimize_images(img_dir)
 
-        comic_xml_path = img_dir / "ComicInfo.xml"
-        self._export_comicinfo_xml(comic_xml_path)
+        self._export_comicinfo_xml(img_dir)
 
         self.dlogger.update_log(f"✅ {self.comic_name} => [green]提取完成")
         return img_dir
 
     # 打包成压缩包并重命名
     # 修改输出路径为绝对路径，避免多次切换工作目录 20230429
-    @retry(
-        retry=retry_if_exception_type(Exception),
-        stop=(stop_after_attempt(5) | stop_after_delay(1.5)),
-    )
+    # 仅对暂时性 I/O 错误退避重试，解析与结构错误立即失败 20261019
     def pack_folder(self) -> Path:
+        return call_with_retry(self._pack_folder, metrics=self._metrics)
+
+    def _pack_folder(self) -> Path:
         self.status.update(f"⏳ {self.comic_name} => [yellow]开始打包")
 
         self._cbz_file = self._cbz_file.parent / f"{self.comic_name}.cbz"
@@ -431,12 +868,15 @@ class SingleRepacker(IRepacker):
         copy_file_timestamp(comic_cover, self._pack_from_dir)
 
         if self._use_extern_7z:
+            # 外部 7z 只能打包目录中的文件
+            (self._pack_from_dir / comic_info_name).write_bytes(self._comic_info_xml)
             self._extern_7z.make_archive(self._cbz_file, root_dir=self._pack_from_dir)
         else:
             make_archive_threadsafe(
                 comic_base,
                 format="cbz",
                 root_dir=self._pack_from_dir,
+                members={comic_info_name: self._comic_info_xml},
             )
 
         cbz_path = self._cbz_file
@@ -444,6 +884,25 @@ class SingleRepacker(IRepacker):
         # 修改新建立的 CBZ 文件时间戳为原 EPUB 文档内部的时间戳
         copy_file_timestamp(comic_cover, cbz_path)
 
+        if self._page_hash_sidecar:
+            write_page_sidecar(cbz_path.with_suffix(".pages.json"), self._pages)
+
         self.dlogger.update_log(f"✅ {self.comic_name} => [green]打包完成")
 
         return cbz_path
+
+    # 打包为 CBZ 并写入任意可写二进制流（标准输出 / 管道 / 套接字），全程不需要 seek 20261019
+    def pack_to_stream(self, stream: BinaryIO) -> "RepackResult":
+        from .repack_core import RepackResult
+
+        self.status.update(f"⏳ {self.comic_name} => [yellow]开始打包")
+        size = make_archive_to_stream(stream, self._pack_from_dir, members={comic_info_name: self._comic_info_xml})
+        self.dlogger.update_log(f"✅ {self.comic_name} => [green]打包完成")
+        return RepackResult(
+            comic_info=self._extractor.comic_info,
+            comic_name=self.comic_name,
+            page_count=len(self._pages),
+            bytes_written=size,
+            pages=self._pages,
+            cbz=None,
+        )
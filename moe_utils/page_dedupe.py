@@ -0,0 +1,368 @@
+import hashlib
+import heapq
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from .terminal_ui import pure_log
+
+# 感知哈希按 16 位分为 4 段：汉明距离不超过 3 的两个哈希必有一段完全相同（抽屉原理）
+dhash_band_count: int = 4
+dhash_band_bits: int = 16
+max_dhash_threshold: int = dhash_band_count - 1
+# 缩略图灰度极差低于此值视为纯色或近似纯色页面，其 dHash 几乎全为 0，彼此距离为 0，不能用于比对
+flat_page_contrast: int = 12
+# 长时间运行（如监视模式）时定期保存索引的间隔秒数，异常退出时最多丢失这段时间内加入的卷
+index_save_interval: float = 60.0
+
+dedupe_page_pattern = re.compile(r"^(COVER|PAGE(\d+))$", re.IGNORECASE)
+
+_index_arrays: dict[str, str] = {
+    "exact": "Q",
+    "dhash": "Q",
+    "size": "Q",
+    "series": "I",
+    "volume": "I",
+    "page": "H",
+}
+
+
+class PageHash(NamedTuple):
+    page: int
+    file: Path
+    size: int
+    exact: int
+    dhash: int | None
+    # 空白或纯色页面，只报告重复，不删除
+    flat: bool = False
+
+
+class DuplicateMatch(NamedTuple):
+    page: PageHash
+    volume: str
+    other_page: int
+    distance: int
+
+
+class DedupeStats:
+    pages: int
+    duplicates: int
+    dropped: int
+    bytes_duplicated: int
+    bytes_dropped: int
+
+    def __init__(self):
+        self.pages = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.bytes_duplicated = 0
+        self.bytes_dropped = 0
+
+    def merge(self, other: "DedupeStats"):
+        self.pages += other.pages
+        self.duplicates += other.duplicates
+        self.dropped += other.dropped
+        self.bytes_duplicated += other.bytes_duplicated
+        self.bytes_dropped += other.bytes_dropped
+
+
+def _merge_runs(a: tuple[array, array], b: tuple[array, array]) -> tuple[array, array]:
+    keys, rows = array("Q"), array("I")
+    for key, row in heapq.merge(zip(*a), zip(*b)):
+        keys.append(key)
+        rows.append(row)
+    return keys, rows
+
+
+class SortedRuns:
+    """
+    按键排序的 (key, row) 数组段，查询时逐段二分。
+    新增批次时合并大小相近的段（类似 LSM 树），段数保持在 O(log N)，无需每次整体重排。
+    """
+
+    _runs: list[tuple[array, array]]
+
+    def __init__(self):
+        self._runs = []
+
+    def add_batch(self, items: list[tuple[int, int]]):
+        if not items:
+            return
+        items.sort()
+        self._runs.append((array("Q", (k for k, _ in items)), array("I", (r for _, r in items))))
+        while len(self._runs) > 1 and len(self._runs[-2][0]) <= 2 * len(self._runs[-1][0]):
+            b = self._runs.pop()
+            a = self._runs.pop()
+            self._runs.append(_merge_runs(a, b))
+
+    def find(self, key: int) -> Iterator[int]:
+        for keys, rows in self._runs:
+            i = bisect_left(keys, key)
+            while i < len(keys) and keys[i] == key:
+                yield rows[i]
+                i += 1
+
+
+# 在子线程中执行，Pillow 解码时会释放 GIL；返回 dHash 与是否为纯色页面，纯色页面不计算 dHash
+def _compute_dhash(img_file: Path) -> tuple[int | None, bool]:
+    from PIL import Image
+
+    try:
+        with Image.open(img_file) as img:
+            img.draft("L", (72, 64))
+            small = img.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    except OSError:
+        return None, False
+    pixels = small.tobytes()
+    if max(pixels) - min(pixels) < flat_page_contrast:
+        return None, True
+    value = 0
+    for y in range(8):
+        row = pixels[y * 9 : y * 9 + 9]
+        for x in range(8):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return value, False
+
+
+def _hash_file(img_file: Path) -> tuple[int, int]:
+    data = img_file.read_bytes()
+    return len(data), int.from_bytes(hashlib.sha1(data).digest()[:8], "big")
+
+
+# 跨卷重复页面索引：精确哈希（SHA-1 前 8 字节）与感知哈希（dHash）20261019
+# 每页仅占若干个定长数组元素，百万级页面也只需数十 MB 内存；只在同一系列的不同卷之间比对
+class PageHashIndex:
+    threshold: int
+    index_dir: Path | None
+
+    _series_ids: dict[str, int]
+    _volume_ids: dict[str, int]
+    _volume_names: list[str]
+
+    def __init__(self, index_dir: Path | None = None, threshold: int = max_dhash_threshold, jobs: int = 0):
+        self.index_dir = index_dir
+        self.threshold = max(0, min(threshold, max_dhash_threshold))
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.use_dhash = importlib.util.find_spec("PIL") is not None
+        if not self.use_dhash:
+            pure_log("[yellow]警告：未安装 Pillow，重复页面检测仅比对完全相同的图片。")
+
+        self._lock = threading.Lock()
+        self._arrays = {name: array(code) for name, code in _index_arrays.items()}
+        self._series_ids = {}
+        self._volume_ids = {}
+        self._volume_names = []
+        self._exact_runs = SortedRuns()
+        self._band_runs = [SortedRuns() for _ in range(dhash_band_count)]
+        if index_dir is not None:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._arrays["exact"])
+
+    @staticmethod
+    def _bands(dhash: int) -> Iterator[tuple[int, int]]:
+        mask = (1 << dhash_band_bits) - 1
+        for band in range(dhash_band_count):
+            yield band, (dhash >> (band * dhash_band_bits)) & mask
+
+    def _index_rows(self, start: int):
+        exact, dhash = self._arrays["exact"], self._arrays["dhash"]
+        self._exact_runs.add_batch([(exact[row], row) for row in range(start, len(exact))])
+        if self.use_dhash:
+            mask = (1 << dhash_band_bits) - 1
+            # dHash 为 0 的行没有可用的感知哈希（纯色页面或解码失败），不加入分段索引
+            rows = [row for row in range(start, len(dhash)) if dhash[row]]
+            for band, runs in enumerate(self._band_runs):
+                shift = band * dhash_band_bits
+                runs.add_batch([((dhash[row] >> shift) & mask, row) for row in rows])
+
+    def hash_pages(self, img_dir: Path) -> list[PageHash]:
+        img_files: list[tuple[int, Path]] = []
+        for img_file in sorted(img_dir.iterdir()):
+            matched = dedupe_page_pattern.match(img_file.stem)
+            if matched is not None and img_file.is_file():
+                img_files.append((int(matched.group(2) or 0), img_file))
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            exact_results = list(pool.map(lambda p: _hash_file(p[1]), img_files))
+            if self.use_dhash:
+                dhash_results = list(pool.map(lambda p: _compute_dhash(p[1]), img_files))
+            else:
+                dhash_results = [(None, False)] * len(img_files)
+
+        return [
+            PageHash(page, img_file, size, exact, dhash, flat)
+            for (page, img_file), (size, exact), (dhash, flat) in zip(img_files, exact_results, dhash_results)
+        ]
+
+    def _match(self, page: PageHash, series_id: int, volume_id: int | None) -> DuplicateMatch | None:
+        arrays = self._arrays
+
+        # 已收录的卷只与首次收录时索引中已有的卷比对，重复处理时结果与首次一致，不受之后加入的卷影响
+        def _candidate(row: int) -> bool:
+            return arrays["series"][row] == series_id and (volume_id is None or arrays["volume"][row] < volume_id)
+
+        for row in self._exact_runs.find(page.exact):
+            if _candidate(row) and arrays["size"][row] == page.size:
+                return DuplicateMatch(page, self._volume_names[arrays["volume"][row]], arrays["page"][row], 0)
+
+        if page.dhash is None:
+            return None
+        best: tuple[int, int] | None = None
+        for band, value in self._bands(page.dhash):
+            for row in self._band_runs[band].find(value):
+                if not _candidate(row):
+                    continue
+                distance = (arrays["dhash"][row] ^ page.dhash).bit_count()
+                if distance <= self.threshold and (best is None or distance < best[0]):
+                    best = (distance, row)
+        if best is None:
+            return None
+        distance, row = best
+        return DuplicateMatch(page, self._volume_names[arrays["volume"][row]], arrays["page"][row], distance)
+
+    # 先与索引中同一系列的先前各卷比对，再把本卷页面加入索引；同一卷重复处理时不重复加入
+    def check_volume(self, series: str, volume: str, pages: list[PageHash]) -> list[DuplicateMatch]:
+        with self._lock:
+            series_id = self._series_ids.setdefault(series, len(self._series_ids))
+            volume_id = self._volume_ids.get(volume)
+            matches = [m for m in (self._match(page, series_id, volume_id) for page in pages) if m is not None]
+
+            if volume_id is None:
+                volume_id = len(self._volume_names)
+                self._volume_ids[volume] = volume_id
+                self._volume_names.append(volume)
+                start = len(self)
+                try:
+                    for page in pages:
+                        self._arrays["exact"].append(page.exact)
+                        self._arrays["dhash"].append(page.dhash or 0)
+                        self._arrays["size"].append(page.size)
+                        self._arrays["series"].append(series_id)
+                        self._arrays["volume"].append(volume_id)
+                        self._arrays["page"].append(min(page.page, 0xFFFF))
+                    self._index_rows(start)
+                except BaseException:
+                    # 中断退出时撤销只加入了一部分的本卷，随后保存的索引仍然完整
+                    for arr in self._arrays.values():
+                        del arr[start:]
+                    del self._volume_names[volume_id:]
+                    self._volume_ids.pop(volume, None)
+                    raise
+            return matches
+
+    def load(self):
+        if self.index_dir is None or not (self.index_dir / "index.json").is_file():
+            return
+        with (self.index_dir / "index.json").open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: array(code) for name, code in _index_arrays.items()}
+        for name, arr in arrays.items():
+            path = self.index_dir / f"{name}.bin"
+            arr.frombytes(path.read_bytes())
+            if meta["byteorder"] != sys.byteorder:
+                arr.byteswap()
+        if len({len(arr) for arr in arrays.values()}) != 1 or meta.get("dhash") != self.use_dhash:
+            # 索引不完整或感知哈希可用性变化，放弃旧索引重新建立
+            pure_log("[yellow]警告：重复页面索引与当前环境不一致，已重新建立。")
+            return
+        self._arrays = arrays
+        self._series_ids = meta["series"]
+        self._volume_names = meta["volumes"]
+        self._volume_ids = {name: i for i, name in enumerate(self._volume_names)}
+        self._index_rows(0)
+
+    def save(self):
+        if self.index_dir is None:
+            return
+        with self._lock:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            for name, arr in self._arrays.items():
+                tmp_path = self.index_dir / f"{name}.bin.tmp"
+                with tmp_path.open("wb") as f:
+                    arr.tofile(f)
+                os.replace(tmp_path, self.index_dir / f"{name}.bin")
+            meta = {
+                "byteorder": sys.byteorder,
+                "dhash": self.use_dhash,
+                "series": self._series_ids,
+                "volumes": self._volume_names,
+            }
+            tmp_path = self.index_dir / "index.json.tmp"
+            tmp_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.index_dir / "index.json")
+
+
+# 重复页面处理：flag 仅报告，drop 删除重复页面并重新连续编号（封面始终保留）
+class PageDeduper:
+    action: str
+    index: PageHashIndex
+
+    def __init__(self, index: PageHashIndex, action: str = "flag"):
+        self.index = index
+        self.action = action
+        self.total = DedupeStats()
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def from_config(cls, section: dict, default_index_dir: Path) -> "PageDeduper":
+        index_dir = Path(section["index_dir"]) if section.get("index_dir") else default_index_dir
+        index = PageHashIndex(
+            index_dir,
+            threshold=int(section.get("threshold", max_dhash_threshold)),
+            jobs=int(section.get("jobs", 0)),
+        )
+        action = section.get("action", "flag")
+        if action not in ("flag", "drop"):
+            pure_log(f'[yellow]警告：未知的重复页面处理方式 "{action}"，将仅报告重复页面。')
+            action = "flag"
+        return cls(index, action)
+
+    @staticmethod
+    def _renumber(img_dir: Path):
+        pages: list[tuple[int, Path]] = []
+        for img_file in img_dir.iterdir():
+            matched = dedupe_page_pattern.match(img_file.stem)
+            if matched is not None and matched.group(2) is not None:
+                pages.append((int(matched.group(2)), img_file))
+        # 新编号不大于原编号，按升序改名不会覆盖尚未处理的文件
+        for new_idx, (old_idx, img_file) in enumerate(sorted(pages), start=1):
+            if new_idx != old_idx:
+                img_file.rename(img_file.with_name(f"PAGE{new_idx:03}{img_file.suffix}"))
+
+    def process_dir(self, img_dir: Path, series: str, volume: str) -> tuple[DedupeStats, list[DuplicateMatch]]:
+        stats = DedupeStats()
+        pages = self.index.hash_pages(img_dir)
+        stats.pages = len(pages)
+        matches = self.index.check_volume(series, volume, pages)
+        for match in matches:
+            stats.duplicates += 1
+            stats.bytes_duplicated += match.page.size
+            if self.action == "drop" and match.page.page != 0 and not match.page.flat:
+                match.page.file.unlink()
+                stats.dropped += 1
+                stats.bytes_dropped += match.page.size
+        if stats.dropped:
+            self._renumber(img_dir)
+        with self._lock:
+            self.total.merge(stats)
+            save_due = time.monotonic() - self._last_save >= index_save_interval
+            if save_due:
+                self._last_save = time.monotonic()
+        if save_due:
+            self.index.save()
+        return stats, matches
+
+    def close(self):
+        self.index.save()
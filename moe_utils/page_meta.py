@@ -0,0 +1,141 @@
+import hashlib
+import json
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, NamedTuple
+
+# 含尺寸信息的 SOF 段（排除 DHT 0xC4、JPG 0xC8、DAC 0xCC）
+_jpeg_sof_markers: frozenset[int] = frozenset(
+    {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+)
+_png_signature: bytes = b"\x89PNG\r\n\x1a\n"
+
+hash_chunk_size: int = 1024 * 1024
+
+
+class PageMeta(NamedTuple):
+    image: int
+    file_name: str
+    size: int
+    width: int
+    height: int
+    sha1: str = ""
+
+    @property
+    def is_cover(self) -> bool:
+        return Path(self.file_name).stem.upper() == "COVER"
+
+    # ComicInfo.xml 中 <Page> 节点的属性，属性顺序与 ComicRack 架构一致
+    def to_xml_attrib(self) -> dict[str, str]:
+        attrib = {"Image": str(self.image)}
+        if self.is_cover:
+            attrib["Type"] = "FrontCover"
+        if self.width > self.height > 0:
+            attrib["DoublePage"] = "true"
+        attrib["ImageSize"] = str(self.size)
+        if self.width > 0 and self.height > 0:
+            attrib["ImageWidth"] = str(self.width)
+            attrib["ImageHeight"] = str(self.height)
+        return attrib
+
+    def to_dict(self) -> dict[str, str | int]:
+        return self._asdict()
+
+
+def _skip(stream: BinaryIO, n: int) -> bool:
+    if n <= 0:
+        return True
+    if stream.seekable():
+        stream.seek(n, 1)
+        return True
+    return len(stream.read(n)) == n
+
+
+def _read_jpeg_size(stream: BinaryIO) -> tuple[int, int] | None:
+    while True:
+        byte = stream.read(1)
+        if byte != b"\xff":
+            return None
+        marker = stream.read(1)
+        while marker == b"\xff":
+            marker = stream.read(1)
+        if not marker:
+            return None
+        m = marker[0]
+        if m == 0x01 or 0xD0 <= m <= 0xD8:
+            continue
+        if m in (0xD9, 0xDA):
+            # 遇到图像数据或结束标记仍未找到 SOF，视为无法识别
+            return None
+        seg = stream.read(2)
+        if len(seg) < 2:
+            return None
+        length = int.from_bytes(seg, "big")
+        if m in _jpeg_sof_markers:
+            data = stream.read(5)
+            if len(data) < 5:
+                return None
+            return int.from_bytes(data[3:5], "big"), int.from_bytes(data[1:3], "big")
+        if not _skip(stream, length - 2):
+            return None
+
+
+# 仅读取文件头部获取图片宽高，不解码图像数据 20261019
+# JPEG 逐段跳过直至 SOF 段，PNG 读取 IHDR；无法识别时返回 None
+def read_image_size(stream: BinaryIO) -> tuple[int, int] | None:
+    head = stream.read(2)
+    if head == b"\xff\xd8":
+        return _read_jpeg_size(stream)
+    if head == _png_signature[:2]:
+        rest = stream.read(22)
+        if len(rest) < 22 or head + rest[:6] != _png_signature or rest[10:14] != b"IHDR":
+            return None
+        return int.from_bytes(rest[14:18], "big"), int.from_bytes(rest[18:22], "big")
+    return None
+
+
+def _hash_stream(stream: BinaryIO) -> str:
+    digest = hashlib.sha1()
+    while chunk := stream.read(hash_chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_page_file(img_file: Path, image: int, with_hash: bool = False) -> PageMeta:
+    with img_file.open("rb") as f:
+        size = read_image_size(f) or (0, 0)
+        sha1 = ""
+        if with_hash:
+            f.seek(0)
+            sha1 = _hash_stream(f)
+    return PageMeta(image, img_file.name, img_file.stat().st_size, size[0], size[1], sha1)
+
+
+def read_page_member(
+    zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, image: int, arcname: str, with_hash: bool = False
+) -> PageMeta:
+    with zip_ref.open(info, "r") as f:
+        size = read_image_size(f) or (0, 0)
+    sha1 = ""
+    if with_hash:
+        with zip_ref.open(info, "r") as f:
+            sha1 = _hash_stream(f)
+    return PageMeta(image, arcname, info.file_size, size[0], size[1], sha1)
+
+
+# 按打包后的文件名顺序编号，与阅读器的页面顺序一致
+def scan_page_dir(
+    img_dir: Path, exclude: Iterable[str] = ("ComicInfo.xml",), with_hash: bool = False
+) -> list[PageMeta]:
+    excluded = set(exclude)
+    img_files = sorted(f for f in img_dir.iterdir() if f.is_file() and f.name not in excluded)
+    return [read_page_file(f, i, with_hash=with_hash) for i, f in enumerate(img_files)]
+
+
+# 页面索引旁注文件：各页文件名、大小、宽高与哈希，供去重等下游工具直接读取
+def dump_page_sidecar(pages: list[PageMeta]) -> bytes:
+    return json.dumps([page.to_dict() for page in pages], ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def write_page_sidecar(path: Path, pages: list[PageMeta]) -> None:
+    path.write_bytes(dump_page_sidecar(pages))
@@ -1,3 +1,4 @@
+import time
 from contextlib import AbstractContextManager
 
 from rich.console import Console
@@ -16,6 +17,7 @@ from rich.progress import (
 from rich.text import Text
 
 from moe_utils.taskbar_indicator import WinTaskbar
+from moe_utils.terminal_ui import JsonEventWriter
 
 
 # 进度条外观设计
@@ -53,14 +55,24 @@ class ProgressController(AbstractContextManager):
     description: str
     total: int
     task: TaskID
+    refresh_interval: float
+    _last_refresh: float = 0.0
 
-    def __init__(self, pb: Progress, tb: WinTaskbar | None, description: str, total: int):
+    def __init__(
+        self,
+        pb: Progress,
+        tb: WinTaskbar | None,
+        description: str,
+        total: int,
+        refresh_interval: float = 0.1,
+    ):
         super().__init__()
         self.pb = pb
         self.tb = tb
         self.tb_imported = isinstance(tb, WinTaskbar)
         self.description = description
         self.total = total
+        self.refresh_interval = refresh_interval
 
     def __enter__(self):
         self.pb.start()
@@ -72,8 +84,61 @@ class ProgressController(AbstractContextManager):
         if self.tb_imported:
             self.tb.reset_taskbar_progress()
 
+    # 限制重绘频率，多个任务同时汇报时不再逐次刷新 20261019
     def update(self, i: int):
         self.pb.update(self.task, advance=1)
+        now = time.monotonic()
+        if now - self._last_refresh < self.refresh_interval and i + 1 < self.total:
+            return
+        self._last_refresh = now
         self.pb.refresh()
         if self.tb_imported:
             self.tb.set_taskbar_progress(i, self.total)
+
+
+# 无界面模式下的进度汇报，接口与 ProgressController 一致
+class JsonProgressController(AbstractContextManager):
+    writer: JsonEventWriter
+    description: str
+    total: int
+    interval: float
+    completed: int = 0
+
+    def __init__(self, writer: JsonEventWriter, description: str, total: int, interval: float = 1.0):
+        super().__init__()
+        self.writer = writer
+        self.description = description
+        self.total = total
+        self.interval = interval
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        self._last_emit = self._start
+        self._emit("progress_start")
+        return super().__enter__()
+
+    def __exit__(self, *exc_details):
+        self._emit("progress_end")
+        self.writer.flush()
+
+    def _emit(self, event: str):
+        elapsed = time.monotonic() - self._start
+        rate = self.completed / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.completed) / rate if rate > 0 else None
+        self.writer.emit(
+            event,
+            task=self.description,
+            completed=self.completed,
+            total=self.total,
+            elapsed=round(elapsed, 2),
+            rate=round(rate, 3),
+            eta=None if eta is None else round(eta, 1),
+        )
+
+    def update(self, i: int):
+        self.completed += 1
+        now = time.monotonic()
+        if now - self._last_emit < self.interval and self.completed < self.total:
+            return
+        self._last_emit = now
+        self._emit("progress")
@@ -0,0 +1,247 @@
+import os
+import posixpath
+import time
+import zipfile
+from contextlib import nullcontext
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, NamedTuple
+
+from lxml import etree
+
+from .comic_info import ComicInfo, ComicInfoExtractor, opf_ns_map
+from .file_system import UnseekableWriter, copy_zip_member_raw
+from .format_detector import InputFormat, UnsupportedFormatError, is_image_name
+from .page_meta import PageMeta, read_page_file, read_page_member
+from .utils import sanitize_filename
+
+comic_info_name: str = "ComicInfo.xml"
+
+
+class RepackResult(NamedTuple):
+    comic_info: ComicInfo
+    comic_name: str
+    page_count: int
+    bytes_written: int
+    pages: list[PageMeta]
+    cbz: bytes | None
+
+
+def _as_seekable(epub: bytes | bytearray | memoryview | BinaryIO) -> BinaryIO:
+    if isinstance(epub, (bytes, bytearray, memoryview)):
+        return BytesIO(epub)
+    # zipfile 需要从末尾读取中央目录，管道等不可 seek 的输入先读入内存
+    if not epub.seekable():
+        return BytesIO(epub.read())
+    return epub
+
+
+# 供其他程序在进程内调用的纯函数接口 20261019
+# 不使用控制台、缓存目录与交互提示，图片原样复制，不解压也不重新压缩
+# 未指定 output 时返回 CBZ 字节，指定时写入 output（可为不可 seek 的流）
+# page_hashes 为 True 时同时计算各页 SHA-1，可用 dump_page_sidecar() 生成旁注文件
+def repack_bytes(
+    epub: bytes | bytearray | memoryview | BinaryIO,
+    output: BinaryIO | None = None,
+    *,
+    opf_name: str = "vol.opf",
+    page_hashes: bool = False,
+) -> RepackResult:
+    buffer = BytesIO() if output is None else None
+    writer = UnseekableWriter(output if output is not None else buffer)
+
+    with zipfile.ZipFile(_as_seekable(epub), "r") as src_zip:
+        with src_zip.open(opf_name, "r") as opf_file:
+            extractor = ComicInfoExtractor(opf_stream=opf_file)
+        members = extractor.build_page_members(src_zip)
+        comic_info = extractor.comic_info
+        pages: list[PageMeta] = []
+
+        with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+            cover_date_time = None
+            for image, (new_name, img_href) in enumerate(sorted(members)):
+                info = src_zip.getinfo(img_href)
+                arcname = f"{new_name}{PurePosixPath(img_href).suffix}"
+                # 复制的同时仅解压图片头部读取尺寸
+                pages.append(read_page_member(src_zip, info, image, arcname, with_hash=page_hashes))
+                copy_zip_member_raw(src_zip, info, dst_zip, arcname)
+                if new_name == "COVER":
+                    cover_date_time = info.date_time
+
+            comic_info.set_pages(page.to_xml_attrib() for page in pages)
+
+            xml_info = zipfile.ZipInfo(comic_info_name, cover_date_time or (1980, 1, 1, 0, 0, 0))
+            xml_info.compress_type = zipfile.ZIP_DEFLATED
+            dst_zip.writestr(xml_info, comic_info.to_xml())
+
+    writer.flush()
+    return RepackResult(
+        comic_info=comic_info,
+        comic_name=extractor.comic_file_name,
+        page_count=len(pages),
+        bytes_written=writer.bytes_written,
+        pages=pages,
+        cbz=buffer.getvalue() if buffer is not None else None,
+    )
+
+
+class GenericBook(NamedTuple):
+    comic_info: ComicInfo
+    # 按页面顺序排列的图片，压缩包为条目路径，文件夹为文件名
+    pages: list[str]
+
+
+# 非 Mox.moe 格式的文件不含 MOXBID 等信息，以源文件（夹）名作为 CBZ 文件名
+def generic_comic_name(path: Path) -> str:
+    return sanitize_filename(path.name if path.is_dir() else path.stem)
+
+
+def _first_page_image(zip_ref: zipfile.ZipFile, html_href: str) -> str | None:
+    html_tree = etree.fromstring(zip_ref.read(html_href), parser=etree.HTMLParser())
+    if html_tree is None:
+        return None
+    for node in html_tree.iter("img", "image"):
+        src = node.get("src") or node.get("href") or node.get("xlink:href")
+        if src:
+            return posixpath.normpath(posixpath.join(posixpath.dirname(html_href), src))
+    return None
+
+
+# 按 spine 顺序确定页面：图片直接作为页面，网页取其中第一张图片；都没有时退回 manifest 中的图片顺序
+def read_opf_manifest(zip_ref: zipfile.ZipFile, opf_name: str) -> tuple[etree._Element, dict[str, tuple[str, str]]]:
+    # 返回 OPF 根节点与 manifest，manifest 为 id 到（压缩包内路径, media-type）的映射
+    root = etree.fromstring(zip_ref.read(opf_name), parser=etree.XMLParser())
+    base_dir = posixpath.dirname(opf_name)
+    manifest: dict[str, tuple[str, str]] = {
+        item.get("id", ""): (
+            posixpath.normpath(posixpath.join(base_dir, item.get("href", ""))),
+            item.get("media-type", ""),
+        )
+        for item in root.iterfind("opf:manifest/opf:item", opf_ns_map)
+    }
+    return root, manifest
+
+
+def _read_epub_book(zip_ref: zipfile.ZipFile, opf_name: str, name: str) -> GenericBook:
+    ns = opf_ns_map
+    root, manifest = read_opf_manifest(zip_ref, opf_name)
+
+    pages: list[str] = []
+    for itemref in root.iterfind("opf:spine/opf:itemref", ns):
+        href, media_type = manifest.get(itemref.get("idref", ""), ("", ""))
+        if media_type.startswith("image/"):
+            pages.append(href)
+        elif media_type in ("application/xhtml+xml", "text/html") and href in zip_ref.NameToInfo:
+            img_href = _first_page_image(zip_ref, href)
+            if img_href is not None:
+                pages.append(img_href)
+    if not pages:
+        pages = [href for href, media_type in manifest.values() if media_type.startswith("image/")]
+    # 同一图片只保留第一次出现的位置
+    pages = [href for href in dict.fromkeys(pages) if href in zip_ref.NameToInfo and is_image_name(href)]
+
+    metadata = root.find("opf:metadata", ns)
+
+    def _text(tag: str) -> str:
+        return (metadata.findtext(f"dc:{tag}", "", ns) if metadata is not None else "").strip()
+
+    series = ""
+    if metadata is not None:
+        series_meta = metadata.find("opf:meta[@name='calibre:series']", ns)
+        series = series_meta.get("content", "") if series_meta is not None else ""
+    title = _text("title") or name
+    return GenericBook(
+        ComicInfo(
+            {
+                "Title": title,
+                "Series": series or title,
+                "Writer": _text("creator"),
+                "Publisher": _text("publisher"),
+                "Year": _text("date")[:4],
+                "Summary": _text("description"),
+                "PageCount": len(pages),
+            }
+        ),
+        pages,
+    )
+
+
+def _generic_comic_info(comic_info_xml: bytes | None, name: str, page_count: int) -> ComicInfo:
+    # 已有 ComicInfo.xml 的 CBZ 沿用其中的元数据
+    if comic_info_xml is not None:
+        comic_info = ComicInfo.from_xml(comic_info_xml)
+        comic_info.page_count = page_count
+        return comic_info
+    return ComicInfo({"Title": name, "Series": name, "Publisher": "", "Year": "", "PageCount": page_count})
+
+
+def load_generic_book(path: Path, input_format: InputFormat, zip_ref: zipfile.ZipFile | None = None) -> GenericBook:
+    name = generic_comic_name(path)
+    if input_format.kind == "image-dir":
+        xml_file = path / comic_info_name
+        xml = xml_file.read_bytes() if xml_file.is_file() else None
+        return GenericBook(_generic_comic_info(xml, name, len(input_format.images)), list(input_format.images))
+
+    assert zip_ref is not None
+    if input_format.kind == "epub":
+        return _read_epub_book(zip_ref, input_format.opf_name, name)
+    xml = zip_ref.read(comic_info_name) if comic_info_name in zip_ref.NameToInfo else None
+    return GenericBook(_generic_comic_info(xml, name, len(input_format.images)), list(input_format.images))
+
+
+# 其他 EPUB、图片压缩包与图片文件夹的快速转换：不解压，图片按页面顺序原样复制为 COVER / PAGExxx 20261019
+# 压缩包内的图片不解压也不重新压缩；以封面时间戳作为 CBZ 时间戳，与 Mox.moe 文档的转换结果一致
+def repack_generic(path: Path, input_format: InputFormat, cbz_dir: Path, *, page_hashes: bool = False) -> RepackResult:
+    with nullcontext() if path.is_dir() else zipfile.ZipFile(path, "r") as src_zip:
+        book = load_generic_book(path, input_format, src_zip)
+        if not book.pages:
+            raise UnsupportedFormatError(f"{path.name} 中没有可识别的页面")
+
+        comic_name = generic_comic_name(path)
+        cbz_file = cbz_dir / f"{comic_name}.cbz"
+        tmp_file = cbz_file.with_name(f".{cbz_file.name}.tmp")
+        width = max(3, len(str(len(book.pages) - 1)))
+        pages: list[PageMeta] = []
+        cover_date_time = (1980, 1, 1, 0, 0, 0)
+
+        try:
+            cbz_dir.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(tmp_file, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+                for image, src in enumerate(book.pages):
+                    suffix = PurePosixPath(src).suffix.lower()
+                    arcname = f"COVER{suffix}" if image == 0 else f"PAGE{image:0{width}}{suffix}"
+                    if src_zip is not None:
+                        info = src_zip.getinfo(src)
+                        pages.append(read_page_member(src_zip, info, image, arcname, with_hash=page_hashes))
+                        copy_zip_member_raw(src_zip, info, dst_zip, arcname)
+                        date_time = info.date_time
+                    else:
+                        img_file = path / src
+                        pages.append(read_page_file(img_file, image, with_hash=page_hashes)._replace(file_name=arcname))
+                        dst_zip.write(img_file, arcname)
+                        date_time = time.localtime(img_file.stat().st_mtime)[:6]
+                    if image == 0:
+                        cover_date_time = max(date_time, (1980, 1, 1, 0, 0, 0))
+
+                comic_info = book.comic_info
+                comic_info.page_count = len(pages)
+                comic_info.set_pages(page.to_xml_attrib() for page in pages)
+                xml_info = zipfile.ZipInfo(comic_info_name, cover_date_time)
+                xml_info.compress_type = zipfile.ZIP_DEFLATED
+                dst_zip.writestr(xml_info, comic_info.to_xml())
+
+            os.replace(tmp_file, cbz_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+
+    timestamp = time.mktime(cover_date_time + (0, 0, -1))
+    os.utime(cbz_file, (timestamp, timestamp))
+    return RepackResult(
+        comic_info=comic_info,
+        comic_name=comic_name,
+        page_count=len(pages),
+        bytes_written=cbz_file.stat().st_size,
+        pages=pages,
+        cbz=None,
+    )
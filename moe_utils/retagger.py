@@ -0,0 +1,197 @@
+import os
+import threading
+import uuid
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from lxml import etree
+
+from .comic_info import ComicInfo, ComicInfoExtractor
+from .file_system import copy_zip_member_raw
+from .format_detector import detect_archive
+from .manga_repacker import ComicFile
+
+comic_info_name: str = "ComicInfo.xml"
+
+# 各卷重新生成元数据后的处理结果
+retag_statuses: tuple[str, ...] = ("updated", "renamed", "unchanged", "skipped", "failed")
+
+PageKeys = Counter[tuple[int, int]]
+
+
+class CbzEntry(NamedTuple):
+    page_keys: PageKeys
+    # 原 ComicInfo.xml 中的 MOXBID 与 PageCount，缺失或无法解析时为空字符串与 0
+    moxbid: str
+    page_count: int
+    # <Pages> 中带有 Bookmark，即 merge 合并生成的文件
+    merged: bool = False
+
+
+class RetagResult(NamedTuple):
+    comic_file: ComicFile
+    old_cbz: Path | None
+    new_cbz: Path | None
+    status: str
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+def _page_keys(zip_ref: zipfile.ZipFile, prefix: str = "") -> PageKeys:
+    return Counter(
+        (info.CRC, info.file_size)
+        for info in zip_ref.infolist()
+        if not info.is_dir() and info.filename.startswith(prefix) and info.filename != comic_info_name
+    )
+
+
+def _read_cbz_entry(zip_ref: zipfile.ZipFile) -> CbzEntry:
+    moxbid, page_count, merged = "", 0, False
+    info = _comic_info_info(zip_ref)
+    if info is not None:
+        try:
+            comic_info = ComicInfo.from_xml(zip_ref.read(info))
+            moxbid, page_count = comic_info.id, comic_info.page_count
+            merged = any(page.get("Bookmark") for page in comic_info.pages)
+        except (ValueError, etree.XMLSyntaxError):
+            pass
+    return CbzEntry(_page_keys(zip_ref), moxbid, page_count, merged)
+
+
+# 文件名格式变化后无法按名称找到原 CBZ：先按原 ComicInfo.xml 中的 MOXBID 匹配，
+# 经过重新编码或无损优化的图片与源文档的 CRC 不再一致，找不到时才比对中央目录中各页的 CRC 与大小
+# 各输出目录只建立一次索引，供同一目录下的各卷共用
+class CbzIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._folders: dict[Path, dict[Path, CbzEntry]] = {}
+
+    def _build(self, folder: Path) -> dict[Path, CbzEntry]:
+        index: dict[Path, CbzEntry] = {}
+        for cbz_file in folder.glob("*.cbz"):
+            try:
+                with zipfile.ZipFile(cbz_file, "r") as zip_ref:
+                    index[cbz_file] = _read_cbz_entry(zip_ref)
+            except (OSError, zipfile.BadZipFile):
+                continue
+        return index
+
+    def find(self, folder: Path, moxbid: str, page_count: int, src_keys: PageKeys) -> Path | None:
+        with self._lock:
+            if folder not in self._folders:
+                self._folders[folder] = self._build(folder)
+            index = self._folders[folder]
+        existing = [(cbz_file, entry) for cbz_file, entry in index.items() if cbz_file.exists()]
+        # 合并后的 CBZ 沿用第一章的 MOXBID，带有章节书签或页数多于源文档的文件不是本卷的转换结果，
+        # 不参与 MOXBID 匹配；同一 MOXBID 有多个文件时取页数最接近的
+        candidates = [
+            (cbz_file, entry)
+            for cbz_file, entry in existing
+            if moxbid and entry.moxbid == moxbid and not entry.merged and entry.page_count <= page_count
+        ]
+        if candidates:
+            return min(candidates, key=lambda c: abs(c[1].page_count - page_count))[0]
+        for cbz_file, entry in existing:
+            if entry.page_keys and not entry.page_keys - src_keys:
+                return cbz_file
+        return None
+
+
+def _comic_info_info(zip_ref: zipfile.ZipFile) -> zipfile.ZipInfo | None:
+    return zip_ref.NameToInfo.get(comic_info_name)
+
+
+# 以源文档的最新元数据生成 ComicInfo.xml，沿用原文件中 <Pages> 的各页属性与实际页数
+def _build_comic_info(extractor: ComicInfoExtractor, cbz_zip: zipfile.ZipFile) -> bytes:
+    comic_info: ComicInfo = extractor.comic_info
+    page_count = sum(1 for info in cbz_zip.infolist() if not info.is_dir() and info.filename != comic_info_name)
+    if page_count != comic_info.page_count:
+        # 去重阶段删除过页面
+        comic_info.page_count = page_count
+    old_info = _comic_info_info(cbz_zip)
+    if old_info is not None:
+        comic_info.set_pages(ComicInfo.from_xml(cbz_zip.read(old_info)).pages)
+    return comic_info.to_xml()
+
+
+# 除 ComicInfo.xml 外的条目原样复制压缩数据，不解压也不重新压缩
+def _rewrite_cbz(cbz_zip: zipfile.ZipFile, xml: bytes, target: Path) -> None:
+    with zipfile.ZipFile(target, "w") as dst_zip:
+        written = False
+        for info in cbz_zip.infolist():
+            if info.filename != comic_info_name:
+                copy_zip_member_raw(cbz_zip, info, dst_zip)
+                continue
+            zinfo = zipfile.ZipInfo(comic_info_name, info.date_time)
+            zinfo.compress_type = info.compress_type
+            zinfo.external_attr = info.external_attr
+            dst_zip.writestr(zinfo, xml)
+            written = True
+        if not written:
+            first = cbz_zip.infolist()[0]
+            zinfo = zipfile.ZipInfo(comic_info_name, first.date_time)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            dst_zip.writestr(zinfo, xml)
+
+
+# 只重新生成 ComicInfo.xml 并按最新规则重命名 CBZ，图片数据保持不变 20261019
+# 先按新文件名查找原 CBZ，找不到时在同一输出目录中按 MOXBID、再按各页 CRC 匹配；其他格式的输入不作处理
+def retag_comic_file(file_t: ComicFile, index: CbzIndex, dry_run: bool = False) -> RetagResult:
+    try:
+        if file_t.src_file.is_dir():
+            return RetagResult(file_t, None, None, "skipped")
+        with zipfile.ZipFile(file_t.src_file, "r") as src_zip:
+            if not detect_archive(src_zip).is_mox:
+                return RetagResult(file_t, None, None, "skipped")
+            with src_zip.open("vol.opf", "r") as opf_file:
+                extractor = ComicInfoExtractor(opf_stream=opf_file)
+            src_keys = _page_keys(src_zip, "image/")
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        return RetagResult(file_t, None, None, "failed", f"无法读取源文档：{e}")
+
+    out_dir = file_t.dst_file.parent
+    new_cbz = out_dir / f"{extractor.comic_file_name}.cbz"
+    comic_info = extractor.comic_info
+    old_cbz = new_cbz if new_cbz.is_file() else index.find(out_dir, comic_info.id, comic_info.page_count, src_keys)
+    if old_cbz is None:
+        return RetagResult(file_t, None, new_cbz, "failed", "未找到对应的 CBZ 文件")
+
+    tmp_cbz = out_dir / f".{new_cbz.name}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with zipfile.ZipFile(old_cbz, "r") as cbz_zip:
+            xml = _build_comic_info(extractor, cbz_zip)
+            old_info = _comic_info_info(cbz_zip)
+            if old_cbz == new_cbz and old_info is not None and cbz_zip.read(old_info) == xml:
+                return RetagResult(file_t, old_cbz, new_cbz, "unchanged")
+            status = "updated" if old_cbz == new_cbz else "renamed"
+            if old_cbz != new_cbz and new_cbz.exists():
+                return RetagResult(file_t, old_cbz, new_cbz, "failed", f"目标文件 {new_cbz.name} 已存在")
+            if dry_run:
+                return RetagResult(file_t, old_cbz, new_cbz, status)
+            _rewrite_cbz(cbz_zip, xml, tmp_cbz)
+
+        st = old_cbz.stat()
+        os.utime(tmp_cbz, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp_cbz, new_cbz)
+        if old_cbz != new_cbz:
+            old_cbz.unlink()
+            old_sidecar = old_cbz.with_suffix(".pages.json")
+            if old_sidecar.exists():
+                os.replace(old_sidecar, new_cbz.with_suffix(".pages.json"))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        tmp_cbz.unlink(missing_ok=True)
+        return RetagResult(file_t, old_cbz, new_cbz, "failed", str(e))
+    return RetagResult(file_t, old_cbz, new_cbz, status)
+
+
+# 并行处理，结果保持文件列表原有顺序
+def retag_comic_files(filelist: list[ComicFile], jobs: int = 8, dry_run: bool = False) -> Iterator[RetagResult]:
+    index = CbzIndex()
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        yield from pool.map(lambda file_t: retag_comic_file(file_t, index, dry_run), filelist)
@@ -0,0 +1,171 @@
+import errno
+import random
+import subprocess
+import threading
+import zipfile
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, NamedTuple, TypeVar
+
+from .format_detector import UnsupportedFormatError
+
+if TYPE_CHECKING:
+    from tenacity import RetryCallState, Retrying
+
+T = TypeVar("T")
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+
+
+class ErrorClass(NamedTuple):
+    category: str
+    transient: bool
+    policy: RetryPolicy
+
+
+no_retry = RetryPolicy(max_attempts=1, base_delay=0.0, max_delay=0.0)
+
+# 确定性错误：输入本身有问题，重试不会改变结果，应立即失败
+# lxml 的 XMLSyntaxError 继承自 SyntaxError，无需在此导入 lxml
+deterministic_errors: dict[type[BaseException], str] = {
+    UnsupportedFormatError: "unsupported-format",
+    zipfile.BadZipFile: "corrupt-archive",
+    zipfile.LargeZipFile: "corrupt-archive",
+    FileNotFoundError: "missing-file",
+    NotADirectoryError: "missing-file",
+    IsADirectoryError: "missing-file",
+    KeyError: "missing-entry",
+    SyntaxError: "parse",
+    StopIteration: "structure",
+    IndexError: "structure",
+    ValueError: "structure",
+}
+
+# 即使是 OSError，以下错误码也不会因重试而恢复
+deterministic_errnos: dict[int, str] = {
+    errno.ENOSPC: "disk-full",
+    errno.ENAMETOOLONG: "bad-path",
+    errno.EINVAL: "bad-path",
+    errno.EROFS: "read-only",
+}
+
+# 暂时性错误按异常类型设定重试策略，按 MRO 取最近的匹配项
+# 网络共享上的文件锁、杀毒软件占用等通常需要数秒才能释放
+transient_policies: dict[type[BaseException], tuple[str, RetryPolicy]] = {
+    PermissionError: ("permission", RetryPolicy(max_attempts=8, base_delay=0.5, max_delay=15.0)),
+    TimeoutError: ("timeout", RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=30.0)),
+    ConnectionError: ("connection", RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=30.0)),
+    BlockingIOError: ("busy", RetryPolicy(max_attempts=6, base_delay=0.2, max_delay=5.0)),
+    InterruptedError: ("interrupted", RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.5)),
+    subprocess.CalledProcessError: ("external-tool", RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=1.0)),
+    OSError: ("io", RetryPolicy(max_attempts=5, base_delay=0.25, max_delay=8.0)),
+}
+
+
+def classify_error(exc: BaseException) -> ErrorClass:
+    for cls in type(exc).__mro__:
+        category = deterministic_errors.get(cls)
+        if category is not None:
+            return ErrorClass(category, False, no_retry)
+
+    if isinstance(exc, OSError) and exc.errno in deterministic_errnos:
+        return ErrorClass(deterministic_errnos[exc.errno], False, no_retry)
+
+    for cls in type(exc).__mro__:
+        matched = transient_policies.get(cls)
+        if matched is not None:
+            return ErrorClass(matched[0], True, matched[1])
+
+    return ErrorClass("other", False, no_retry)
+
+
+# 运行统计：成功、失败与重试次数，按错误类别汇总 20261019
+class RunMetrics:
+    converted: int
+    failed: int
+    retries: int
+    retries_by_category: Counter
+    failures_by_category: Counter
+
+    def __init__(self):
+        self.converted = 0
+        self.failed = 0
+        self.retries = 0
+        self.retries_by_category = Counter()
+        self.failures_by_category = Counter()
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.converted += 1
+
+    def record_failure(self, exc: BaseException):
+        category = classify_error(exc).category
+        with self._lock:
+            self.failed += 1
+            self.failures_by_category[category] += 1
+
+    def record_retry(self, category: str):
+        with self._lock:
+            self.retries += 1
+            self.retries_by_category[category] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "converted": self.converted,
+            "failed": self.failed,
+            "retries": self.retries,
+            "retries_by_category": dict(self.retries_by_category),
+            "failures_by_category": dict(self.failures_by_category),
+        }
+
+    def summary(self) -> str:
+        text = f"成功 {self.converted}，失败 {self.failed}，重试 {self.retries} 次"
+        if self.failures_by_category:
+            details = "、".join(f"{k} × {v}" for k, v in self.failures_by_category.most_common())
+            text += f"（失败类别：{details}）"
+        return text
+
+
+def _outcome_error(retry_state: "RetryCallState") -> BaseException | None:
+    if retry_state.outcome is None or not retry_state.outcome.failed:
+        return None
+    return retry_state.outcome.exception()
+
+
+# 按异常类别决定是否重试、重试次数与指数退避（全抖动）时长
+# 重试耗尽后抛出原始异常，便于失败列表显示真实原因
+def classified_retrying(metrics: RunMetrics | None = None) -> "Retrying":
+    from tenacity import Retrying
+
+    def _retry(retry_state: "RetryCallState") -> bool:
+        exc = _outcome_error(retry_state)
+        return exc is not None and classify_error(exc).transient
+
+    def _stop(retry_state: "RetryCallState") -> bool:
+        exc = _outcome_error(retry_state)
+        if exc is None:
+            return True
+        return retry_state.attempt_number >= classify_error(exc).policy.max_attempts
+
+    def _wait(retry_state: "RetryCallState") -> float:
+        exc = _outcome_error(retry_state)
+        if exc is None:
+            return 0.0
+        policy = classify_error(exc).policy
+        ceiling = min(policy.max_delay, policy.base_delay * 2 ** (retry_state.attempt_number - 1))
+        return random.uniform(0, ceiling)
+
+    def _before_sleep(retry_state: "RetryCallState"):
+        exc = _outcome_error(retry_state)
+        if metrics is not None and exc is not None:
+            metrics.record_retry(classify_error(exc).category)
+
+    return Retrying(retry=_retry, stop=_stop, wait=_wait, before_sleep=_before_sleep, reraise=True)
+
+
+def call_with_retry(func: Callable[..., T], *args, metrics: RunMetrics | None = None, **kwargs) -> T:
+    return classified_retrying(metrics)(func, *args, **kwargs)
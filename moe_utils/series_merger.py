@@ -0,0 +1,203 @@
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Iterator, NamedTuple
+
+from lxml import etree
+
+from .comic_info import ComicInfo, ComicInfoExtractor, MoxBook
+from .file_system import copy_zip_member_raw
+from .format_detector import UnsupportedFormatError, detect_input_format
+from .manga_repacker import ComicFile
+from .page_meta import PageMeta, read_page_member
+from .utils import sanitize_filename
+
+comic_info_name: str = "ComicInfo.xml"
+
+serial_range_pattern = re.compile(r"話(\d+)(?:-(\d+))?")
+
+
+class MergeEntry(NamedTuple):
+    comic_file: ComicFile
+    extractor: ComicInfoExtractor
+
+    @property
+    def mox_book(self) -> MoxBook:
+        return self.extractor.mox_book
+
+    # 连载话的起止话数，无法识别时返回 None
+    @property
+    def serial_range(self) -> tuple[int, int] | None:
+        matched = serial_range_pattern.search(self.mox_book.vol)
+        if matched is None:
+            return None
+        start = int(matched.group(1))
+        return start, int(matched.group(2) or start)
+
+    # 先按识别出的话数排序，其次按 MOXBID 中的分组顺序
+    @property
+    def sort_key(self) -> tuple[int, int, str]:
+        serial_range = self.serial_range
+        return (0 if serial_range else 1, serial_range[0] if serial_range else 0, self.mox_book.id)
+
+
+class MergeGroup(NamedTuple):
+    key: str
+    entries: list[MergeEntry]
+
+    @property
+    def first(self) -> MergeEntry:
+        return self.entries[0]
+
+    @property
+    def range_label(self) -> str:
+        first, last = self.entries[0], self.entries[-1]
+        if first.serial_range and last.serial_range:
+            start, end = first.serial_range[0], last.serial_range[1]
+            return f"話{start:03}" if start == end else f"話{start:03}-{end:03}"
+        if len(self.entries) == 1:
+            return first.mox_book.vol
+        return f"{first.mox_book.vol}-{last.mox_book.vol}"
+
+    @property
+    def comic_name(self) -> str:
+        data = self.first.extractor.comic_info.to_dict()
+        return sanitize_filename(f"[{data['Writer']}][{data['Series']}]{self.range_label}")
+
+    @property
+    def cbz_file(self) -> Path:
+        return self.first.comic_file.dst_file.parent / f"{self.comic_name}.cbz"
+
+
+class MergeResult(NamedTuple):
+    group: MergeGroup
+    cbz_file: Path
+    page_count: int
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# 读取各输入文件的结果：entry 为 None 时 status 为 "skipped"（非 Mox.moe 格式）或 "failed"（无法读取）
+class LoadResult(NamedTuple):
+    comic_file: ComicFile
+    entry: MergeEntry | None
+    status: str
+    error: str = ""
+
+
+def load_entry(file_t: ComicFile) -> LoadResult:
+    try:
+        if not detect_input_format(file_t.src_file).is_mox:
+            return LoadResult(file_t, None, "skipped")
+        return LoadResult(file_t, MergeEntry(file_t, ComicInfoExtractor.from_epub(file_t.src_file)), "loaded")
+    except UnsupportedFormatError:
+        return LoadResult(file_t, None, "skipped")
+    except (OSError, KeyError, IndexError, ValueError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        return LoadResult(file_t, None, "failed", f"无法读取源文档：{e}")
+
+
+# 并行读取，结果保持文件列表原有顺序；图片文件夹等其他格式的输入跳过，单个文件损坏不影响其他文件
+def load_entries(filelist: list[ComicFile], jobs: int = 8) -> list[LoadResult]:
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        return list(pool.map(load_entry, filelist))
+
+
+# 按 bookid（缺失时按系列名）分组并排序章节，chunk > 0 时每 chunk 个文件合并为一个 CBZ 20261019
+# serial_only 为 True 时只合并连载话，单行本与番外篇仍各自成册
+# 只有一个文件的分组不合并：其文件名与单卷转换的 CBZ 相同，合并会将其覆盖
+def plan_merge_groups(entries: list[MergeEntry], chunk: int = 0, serial_only: bool = True) -> Iterator[MergeGroup]:
+    grouped: dict[str, list[MergeEntry]] = {}
+    for entry in entries:
+        mox_book = entry.mox_book
+        if serial_only and mox_book.booktype != "連載話":
+            continue
+        series = str(entry.extractor.comic_info.to_dict()["Series"])
+        key = f"{mox_book.bookid or series}:{mox_book.booktype}"
+        grouped.setdefault(key, []).append(entry)
+
+    for key, group_entries in grouped.items():
+        group_entries.sort(key=lambda e: e.sort_key)
+        size = chunk if chunk > 0 else len(group_entries)
+        for i in range(0, len(group_entries), size):
+            chunk_entries = group_entries[i : i + size]
+            if len(chunk_entries) > 1:
+                yield MergeGroup(key, chunk_entries)
+
+
+# page_image_name() 的逆运算：COVER 为 0，PAGExxx 为其页码
+def _page_number(new_name: str) -> int:
+    return 0 if new_name == "COVER" else int(new_name.removeprefix("PAGE"))
+
+
+def _merged_comic_info(group: MergeGroup, pages: list[PageMeta]) -> ComicInfo:
+    data = dict(group.first.extractor.comic_info.to_dict())
+    label = group.range_label
+    data["Title"] = f"{data['Series']} - {label}"
+    data["Volume"] = label
+    mox_book = MoxBook(group.first.mox_book.id, label)
+    data["Number"] = mox_book.number
+    data["Count"] = mox_book.count
+    data["PageCount"] = len(pages)
+    return ComicInfo(data)
+
+
+# 不解压，将同组各章节的图片按顺序原样复制到同一个 CBZ，第一章封面作为整册封面，其余章节封面作为普通页面
+# 每章第一页以 Bookmark 属性标注章节名，阅读器可据此跳转
+def merge_group(group: MergeGroup) -> MergeResult:
+    cbz_file = group.cbz_file
+    tmp_file = cbz_file.with_name(f".{cbz_file.name}.tmp")
+    pages: list[PageMeta] = []
+    bookmarks: dict[int, str] = {}
+    latest_date_time = (1980, 1, 1, 0, 0, 0)
+
+    try:
+        total = sum(e.extractor.comic_page_count for e in group.entries)
+        width = max(3, len(str(total)))
+        cbz_file.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(tmp_file, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+            for entry in group.entries:
+                with zipfile.ZipFile(entry.comic_file.src_file, "r") as src_zip:
+                    # 按页码数值排序，避免 PAGE1000 排在 PAGE101 之前
+                    members = sorted(entry.extractor.build_page_members(src_zip), key=lambda m: _page_number(m[0]))
+                    for j, (new_name, img_href) in enumerate(members):
+                        info = src_zip.getinfo(img_href)
+                        suffix = PurePosixPath(img_href).suffix
+                        image = len(pages)
+                        arcname = f"COVER{suffix}" if image == 0 else f"PAGE{image:0{width}}{suffix}"
+                        if j == 0:
+                            bookmarks[image] = entry.mox_book.vol
+                        if new_name == "COVER":
+                            latest_date_time = max(latest_date_time, info.date_time)
+                        pages.append(read_page_member(src_zip, info, image, arcname))
+                        copy_zip_member_raw(src_zip, info, dst_zip, arcname)
+
+            comic_info = _merged_comic_info(group, pages)
+            page_attribs = [page.to_xml_attrib() for page in pages]
+            for image, title in bookmarks.items():
+                page_attribs[image]["Bookmark"] = title
+            comic_info.set_pages(page_attribs)
+
+            xml_info = zipfile.ZipInfo(comic_info_name, latest_date_time)
+            xml_info.compress_type = zipfile.ZIP_DEFLATED
+            dst_zip.writestr(xml_info, comic_info.to_xml())
+
+        os.replace(tmp_file, cbz_file)
+        # 与单卷转换一致，以（最新一章的）封面时间戳作为 CBZ 时间戳
+        timestamp = time.mktime(latest_date_time + (0, 0, -1))
+        os.utime(cbz_file, (timestamp, timestamp))
+    except Exception as e:
+        tmp_file.unlink(missing_ok=True)
+        return MergeResult(group, cbz_file, len(pages), str(e))
+
+    return MergeResult(group, cbz_file, len(pages))
+
+
+def merge_groups(groups: list[MergeGroup], jobs: int = 4) -> Iterator[MergeResult]:
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        yield from pool.map(merge_group, groups)
@@ -1,4 +1,9 @@
+import json
+import sys
+import threading
+import time
 from collections import deque
+from typing import TextIO
 
 from rich import print as rich_print
 from rich.box import DOUBLE
@@ -6,6 +11,7 @@ from rich.console import Console, OverflowMethod
 from rich.layout import Layout
 from rich.panel import Panel
 from rich.table import Table
+from rich.text import Text
 
 from .utils import curr_time_format
 
@@ -38,7 +44,18 @@ class PathTable(Table):
         self.add_row("[cyan]缓存目录", cache_dir)
 
 
+# 日志区域仅在 Live 刷新时才拼接文本，记录日志本身只是一次入队操作 20261019
+class LogLines:
+    def __init__(self, content: deque[str]):
+        self._content = content
+
+    def __rich__(self) -> str:
+        return "\n".join(self._content)
+
+
 class DynamicLogger:
+    _log_layout: Layout | None = None
+
     def __init__(self, console: Console, log_lines: int = 8):
         self.console = console
         self.status = self.console.status("")
@@ -46,10 +63,14 @@ class DynamicLogger:
 
     def init_log_layout(self, layout: Layout):
         self._log_layout = layout
+        self._log_layout.update(LogLines(self._log_content))
 
     def update(self, s: str):
+        # 未绑定布局时（如监视模式）直接逐行输出
+        if self._log_layout is None:
+            self.console.print(s, overflow="fold")
+            return
         self._log_content.append(s)
-        self._log_layout.update("\n".join(self._log_content))
 
     def update_log(self, s: str):
         s = get_log_str(s)
@@ -72,3 +93,65 @@ def tui_log(console: Console, s: str, overflow: OverflowMethod = "fold", verbose
 def pure_log(s: str, verbose: bool = True):
     if verbose:
         rich_print(get_log_str(s))
+
+
+# 无界面模式：以 JSON Lines 输出事件，供 cron / CI 重定向到文件 20261019
+# 事件先写入缓冲区，至多每 flush_interval 秒落盘一次，终端 I/O 不随事件频率增长
+class JsonEventWriter:
+    stream: TextIO
+    flush_interval: float
+
+    def __init__(self, stream: TextIO | None = None, flush_interval: float = 1.0):
+        self.stream = stream if stream is not None else sys.stdout
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            self.stream.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+
+class HeadlessStatus:
+    def __init__(self, writer: JsonEventWriter):
+        self._writer = writer
+
+    def update(self, status: str):
+        self._writer.emit("status", message=strip_markup(status))
+
+
+# 与 DynamicLogger 接口一致，但不依赖 rich 布局
+class HeadlessLogger:
+    def __init__(self, writer: JsonEventWriter):
+        self.writer = writer
+        self.status = HeadlessStatus(writer)
+
+    def init_log_layout(self, layout: Layout):
+        pass
+
+    def update(self, s: str):
+        if s:
+            self.writer.emit("log", message=strip_markup(s))
+
+    def update_log(self, s: str):
+        self.update(s)
+
+
+def strip_markup(s: str) -> str:
+    return Text.from_markup(s).plain
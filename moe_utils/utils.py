@@ -36,6 +36,15 @@ def remove_readonly(func, path, _):
 #         return soup_0
 
 
+# 字节数格式化为便于阅读的字符串
+def format_size(num: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(num) < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.2f} {unit}"
+        num /= 1024
+    return f"{num:.2f} TB"
+
+
 # 检查文件名是否合法，并处理其中的非法字符 20230630
 def sanitize_filename(filename: str) -> str:
     invalid_chars = ["/", "\\", ":", "*", "?", '"', "<", ">", "|"]
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path, PurePosixPath
+from typing import Iterator, NamedTuple
+
+queue_states: tuple[str, ...] = ("pending", "running", "done", "failed")
+closed_marker: str = "closed"
+
+
+class WorkItem(NamedTuple):
+    id: str
+    relative_path: str
+    attempts: int = 0
+
+    @classmethod
+    def from_relative_path(cls, relative_path: Path) -> "WorkItem":
+        # 统一为 POSIX 路径，不同系统的节点挂载同一共享目录时也能解析
+        posix_path = PurePosixPath(*relative_path.parts).as_posix()
+        return cls(hashlib.sha1(posix_path.encode("utf-8")).hexdigest()[:16], posix_path)
+
+
+class QueueCounts(NamedTuple):
+    pending: int
+    running: int
+    done: int
+    failed: int
+
+    @property
+    def finished(self) -> int:
+        return self.done + self.failed
+
+
+def _write_json_atomic(path: Path, data: dict):
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        # ValueError 包括 JSONDecodeError 与 UnicodeDecodeError
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+# 基于共享目录的工作队列：每个任务是一个 JSON 文件，状态由所在子目录表示 20261019
+# 领取任务依靠同一文件系统内 rename 的原子性，多个节点同时领取时只有一个能成功
+# 运行中的任务由工作节点定期更新 mtime 作为心跳，超时未更新的任务由协调节点放回待处理队列
+class WorkQueue:
+    root: Path
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _dir(self, state: str) -> Path:
+        return self.root / state
+
+    def _item_path(self, state: str, item_id: str) -> Path:
+        return self._dir(state) / f"{item_id}.json"
+
+    def init(self, reset: bool = False):
+        for state in queue_states:
+            folder = self._dir(state)
+            folder.mkdir(parents=True, exist_ok=True)
+            if reset:
+                for entry in folder.glob("*.json"):
+                    entry.unlink(missing_ok=True)
+        if reset:
+            (self.root / closed_marker).unlink(missing_ok=True)
+
+    def _ids(self, state: str) -> Iterator[str]:
+        try:
+            with os.scandir(self._dir(state)) as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and not entry.name.startswith("."):
+                        yield entry.name.removesuffix(".json")
+        except FileNotFoundError:
+            return
+
+    def counts(self) -> QueueCounts:
+        return QueueCounts(*(sum(1 for _ in self._ids(state)) for state in queue_states))
+
+    # 已完成或已失败的任务不再重复加入，便于协调节点中断后重新提交
+    def submit(self, items: list[WorkItem]) -> int:
+        existing = {item_id for state in queue_states for item_id in self._ids(state)}
+        submitted = 0
+        for item in items:
+            if item.id in existing:
+                continue
+            _write_json_atomic(self._item_path("pending", item.id), item._asdict())
+            submitted += 1
+        return submitted
+
+    def close(self):
+        (self.root / closed_marker).touch()
+
+    @property
+    def closed(self) -> bool:
+        return (self.root / closed_marker).exists()
+
+    def claim(self, worker: str) -> WorkItem | None:
+        for item_id in sorted(self._ids("pending")):
+            running_path = self._item_path("running", item_id)
+            try:
+                os.rename(self._item_path("pending", item_id), running_path)
+                # rename 保留提交时的 mtime，立即刷新，以免被误判为租约超时
+                os.utime(running_path)
+            except (FileNotFoundError, FileExistsError):
+                # 已被其他节点领取
+                continue
+            data = _read_json(running_path)
+            if data is None or "relative_path" not in data:
+                if not running_path.exists():
+                    continue
+                # 任务文件已损坏：直接记为失败，以免滞留在运行队列中，协调节点也不会一直等待 20261019
+                self._finish(WorkItem(item_id, ""), "failed", worker, error="任务文件无法读取", category="parse")
+                continue
+            data["attempts"] = data.get("attempts", 0) + 1
+            _write_json_atomic(running_path, {**data, "worker": worker, "claimed_at": time.time()})
+            return WorkItem(data["id"], data["relative_path"], data["attempts"])
+        return None
+
+    def heartbeat(self, item: WorkItem):
+        try:
+            os.utime(self._item_path("running", item.id))
+        except FileNotFoundError:
+            pass
+
+    def _finish(self, item: WorkItem, state: str, worker: str, **fields):
+        result = {**item._asdict(), "worker": worker, "finished_at": time.time(), **fields}
+        _write_json_atomic(self._item_path(state, item.id), result)
+        self._item_path("running", item.id).unlink(missing_ok=True)
+        if state == "done":
+            # 超时重新领取后成功的任务，清除之前的失败记录
+            self._item_path("failed", item.id).unlink(missing_ok=True)
+
+    def complete(self, item: WorkItem, worker: str, elapsed: float):
+        self._finish(item, "done", worker, elapsed=round(elapsed, 3))
+
+    def fail(self, item: WorkItem, worker: str, error: str, category: str):
+        self._finish(item, "failed", worker, error=error, category=category)
+
+    # 租约超时的任务放回待处理队列；已有结果的任务只清理运行记录
+    def requeue_stale(self, lease: float) -> int:
+        now = time.time()
+        requeued = 0
+        for item_id in list(self._ids("running")):
+            running_path = self._item_path("running", item_id)
+            try:
+                if now - running_path.stat().st_mtime < lease:
+                    continue
+            except FileNotFoundError:
+                continue
+            if self._item_path("done", item_id).exists() or self._item_path("failed", item_id).exists():
+                running_path.unlink(missing_ok=True)
+                continue
+            try:
+                os.rename(running_path, self._item_path("pending", item_id))
+                requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def results(self, state: str) -> Iterator[dict]:
+        for item_id in sorted(self._ids(state)):
+            data = _read_json(self._item_path(state, item_id))
+            if data is not None:
+                yield data
+
+
+# 工作节点在处理任务期间定期更新心跳
+class Heartbeat:
+    def __init__(self, queue: WorkQueue, item: WorkItem, interval: float):
+        self._queue = queue
+        self._item = item
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="moe-heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self._queue.heartbeat(self._item)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_details):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+from .file_system import remove_tree_parallel
+
+# 工作目录内记录来源与处理参数的清单文件
+manifest_name: str = ".workspace.json"
+
+mebibyte: int = 1024 * 1024
+
+
+class Workspace(NamedTuple):
+    path: Path
+    source: str
+    # 源文件的大小与修改时间，任一变化即视为失效
+    source_stamp: tuple[int, int]
+    # 重新编码、优化与去重阶段的配置摘要，变化后已处理的图片不能复用
+    signature: str
+    # 工作目录内整理好的图片文件夹名
+    image_dir: str
+    pages_dropped: bool
+    size: int
+    last_used: float
+
+
+def source_stamp(source: Path) -> tuple[int, int]:
+    st = source.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def _dir_size(root: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _read_manifest(path: Path) -> Workspace | None:
+    try:
+        with (path / manifest_name).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return Workspace(
+            path,
+            data["source"],
+            tuple(data["source_stamp"]),
+            data["signature"],
+            data["image_dir"],
+            data.get("pages_dropped", False),
+            data["size"],
+            data["last_used"],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_manifest(workspace: Workspace):
+    data = workspace._asdict()
+    del data["path"]
+    with (workspace.path / manifest_name).open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+# 受管理的缓存目录：已完成各卷的工作目录按最近使用顺序保留 20261019
+# 超过 max_age 的先删除，再按最久未使用的顺序删除，直到数量不超过 keep_warm 且总大小不超过 max_size
+# 启用复用时，源文件与图片处理配置均未变化的卷直接使用保留的工作目录，只需重新生成元数据并打包
+class WorkspaceCache:
+    root: Path
+    max_size: int
+    max_age: float
+    keep_warm: int
+    reuse: bool
+
+    def __init__(self, root: Path, *, max_size: int = 0, max_age: float = 0.0, keep_warm: int = 0, reuse: bool = False):
+        self.root = root
+        self.max_size = max_size
+        self.max_age = max_age
+        self.keep_warm = keep_warm
+        self.reuse = reuse
+        self._lock = threading.Lock()
+        # 按最近使用排序，最久未使用的在前
+        self._entries: OrderedDict[str, Workspace] = OrderedDict()
+        self._scanned = False
+
+    @classmethod
+    def from_config(cls, config: dict, root: Path) -> "WorkspaceCache":
+        if not config.get("enable", False):
+            return cls(root)
+        return cls(
+            root,
+            max_size=int(config.get("max_size_mb", 0)) * mebibyte,
+            max_age=float(config.get("max_age_hours", 0)) * 3600,
+            keep_warm=int(config.get("keep_warm", 0)),
+            reuse=True,
+        )
+
+    @property
+    def total_size(self) -> int:
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    # 首次使用时收录之前运行保留下来的工作目录
+    def _scan(self):
+        if self._scanned:
+            return
+        self._scanned = True
+        if not self.reuse or not self.root.is_dir():
+            return
+        found: list[Workspace] = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if manifest_name in filenames:
+                workspace = _read_manifest(Path(dirpath))
+                if workspace is not None:
+                    found.append(workspace)
+                dirnames.clear()
+        for workspace in sorted(found, key=lambda w: w.last_used):
+            self._entries[workspace.source] = workspace
+
+    # 取出可复用的工作目录，取出期间不会被删除；已失效的直接删除
+    def acquire(self, source: Path, signature: str) -> Workspace | None:
+        if not self.reuse:
+            return None
+        with self._lock:
+            self._scan()
+            workspace = self._entries.pop(str(source), None)
+        if workspace is None:
+            return None
+        try:
+            valid = workspace.source_stamp == source_stamp(source) and workspace.signature == signature
+        except OSError:
+            valid = False
+        if not valid or not (workspace.path / workspace.image_dir).is_dir():
+            remove_tree_parallel(workspace.path, jobs=4)
+            return None
+        return workspace
+
+    # 已完成的工作目录交还缓存，随后按限制淘汰；keep_all 为 True 时全部保留
+    def release(
+        self,
+        path: Path,
+        source: Path,
+        signature: str,
+        image_dir: str,
+        pages_dropped: bool = False,
+        keep_all: bool = False,
+    ):
+        if not keep_all and not self.reuse:
+            remove_tree_parallel(path, jobs=4)
+            return
+        try:
+            stamp = source_stamp(source)
+        except OSError:
+            remove_tree_parallel(path, jobs=4)
+            return
+        workspace = Workspace(
+            path, str(source), stamp, signature, image_dir, pages_dropped, _dir_size(path), time.time()
+        )
+        _write_manifest(workspace)
+        with self._lock:
+            self._scan()
+            replaced = self._entries.pop(workspace.source, None)
+            self._entries[workspace.source] = workspace
+        if replaced is not None and replaced.path != path:
+            remove_tree_parallel(replaced.path, jobs=4)
+        if not keep_all:
+            self.trim()
+
+    def _pop_expired(self) -> list[Workspace]:
+        expired: list[Workspace] = []
+        if self.max_age > 0:
+            deadline = time.time() - self.max_age
+            for source in [s for s, w in self._entries.items() if w.last_used < deadline]:
+                expired.append(self._entries.pop(source))
+        total = sum(entry.size for entry in self._entries.values())
+        while self._entries and (len(self._entries) > self.keep_warm or (self.max_size > 0 and total > self.max_size)):
+            _, workspace = self._entries.popitem(last=False)
+            total -= workspace.size
+            expired.append(workspace)
+        return expired
+
+    # 按年龄、数量与大小限制淘汰，返回释放的字节数
+    def trim(self) -> int:
+        with self._lock:
+            self._scan()
+            expired = self._pop_expired()
+        return sum(remove_tree_parallel(workspace.path, jobs=4).bytes for workspace in expired)
+
+    # 磁盘空间不足时按最久未使用的顺序淘汰，不受 keep_warm 约束，返回释放的字节数
+    def evict(self, needed: int) -> int:
+        freed = 0
+        while freed < needed:
+            with self._lock:
+                self._scan()
+                if not self._entries:
+                    break
+                _, workspace = self._entries.popitem(last=False)
+            freed += remove_tree_parallel(workspace.path, jobs=4).bytes
+        return freed
@@ -0,0 +1,147 @@
+import io
+import struct
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# manga_repacker 读取配置需要 Python 3.11 的 tomllib
+pytest.importorskip("tomllib")
+
+from moe_utils.cbz_verifier import VerifyOptions, verify_comic_file  # noqa: E402
+from moe_utils.comic_info import ComicInfo  # noqa: E402
+from moe_utils.manga_repacker import ComicFile  # noqa: E402
+from moe_utils.repack_core import repack_bytes  # noqa: E402
+
+page_total = 5
+
+
+# 只含 SOI、SOF0 与填充数据的 JPEG，足以读出尺寸
+def fake_jpeg(seed: int) -> bytes:
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, 1800, 1200, 3) + b"\x01\x11\x00\x02\x11\x01\x03\x11\x01"
+    return b"\xff\xd8" + sof + bytes([seed]) * 512 + b"\xff\xd9"
+
+
+def make_epub(path: Path, html: bool = True):
+    items: list[str] = []
+    spine: list[str] = []
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        for page in range(page_total):
+            name = "cover" if page == 0 else str(page)
+            z.writestr(f"image/img_{name}.jpg", fake_jpeg(page))
+            body = f'<html><body><img src="../image/img_{name}.jpg"/></body></html>' if html else "\x00broken"
+            z.writestr(f"html/Page_{name}.html", body)
+            items.append(f'<item id="Page_{name}" href="html/Page_{name}.html" media-type="application/xhtml+xml"/>')
+            items.append(f'<item id="img_{name}" href="image/img_{name}.jpg" media-type="image/jpeg"/>')
+            spine.append(f'<itemref idref="Page_{name}"/>')
+        z.writestr(
+            "vol.opf",
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="2.0" unique-identifier="MOXBID">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            '<dc:identifier id="MOXBID">2001234500110</dc:identifier>\n'
+            "<dc:title>校驗漫畫 - 卷01</dc:title>\n"
+            "<dc:creator>作者</dc:creator>\n"
+            "<dc:publisher>Kox.moe</dc:publisher>\n"
+            "</metadata>\n"
+            f"<manifest>\n{chr(10).join(items)}\n</manifest>\n"
+            f'<spine toc="ncx">\n{chr(10).join(spine)}\n</spine>\n'
+            "</package>\n",
+        )
+
+
+# 以给定的页面重写 CBZ，ComicInfo.xml 的 PageCount 随之更新
+def rewrite_cbz(cbz_file: Path, pages: dict[str, bytes]):
+    with zipfile.ZipFile(cbz_file) as z:
+        comic_info = ComicInfo.from_xml(z.read("ComicInfo.xml"))
+    comic_info.page_count = len(pages)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in pages.items():
+            z.writestr(name, data)
+        z.writestr("ComicInfo.xml", comic_info.to_xml())
+    cbz_file.write_bytes(buffer.getvalue())
+
+
+def read_pages(cbz_file: Path) -> dict[str, bytes]:
+    with zipfile.ZipFile(cbz_file) as z:
+        return {name: z.read(name) for name in z.namelist() if name != "ComicInfo.xml"}
+
+
+@pytest.fixture
+def converted(tmp_path: Path) -> tuple[ComicFile, Path]:
+    (tmp_path / "in").mkdir()
+    epub = tmp_path / "in" / "vol.epub"
+    make_epub(epub)
+    file_t = ComicFile(epub, tmp_path / "in", tmp_path / "out", tmp_path / "cache")
+    file_t.dst_file.parent.mkdir(parents=True)
+    result = repack_bytes(epub.read_bytes())
+    cbz_file = file_t.dst_file.parent / f"{result.comic_name}.cbz"
+    assert result.cbz is not None
+    cbz_file.write_bytes(result.cbz)
+    return file_t, cbz_file
+
+
+def test_untouched_output_passes(converted: tuple[ComicFile, Path]):
+    file_t, _ = converted
+    assert verify_comic_file(file_t).errors == []
+
+
+def test_html_is_not_read(tmp_path: Path, converted: tuple[ComicFile, Path]):
+    file_t, _ = converted
+    # 网页内容损坏也不影响校验，页面名称只由 vol.opf 得出
+    make_epub(file_t.src_file, html=False)
+    assert verify_comic_file(file_t).errors == []
+
+
+def test_reencoded_pages(converted: tuple[ComicFile, Path]):
+    file_t, cbz_file = converted
+    pages = read_pages(cbz_file)
+    pages["PAGE002.jpg"] = fake_jpeg(200)
+    rewrite_cbz(cbz_file, pages)
+
+    assert verify_comic_file(file_t).errors == ["PAGE002.jpg 与源文档中的图片均不一致"]
+    assert verify_comic_file(file_t, VerifyOptions(reencoded=True)).errors == []
+
+
+def test_dropped_pages(converted: tuple[ComicFile, Path]):
+    file_t, cbz_file = converted
+    pages = read_pages(cbz_file)
+    # 删除 PAGE002 后其后的页面重新编号
+    pages = {
+        "COVER.jpg": pages["COVER.jpg"],
+        "PAGE001.jpg": pages["PAGE001.jpg"],
+        "PAGE002.jpg": pages["PAGE003.jpg"],
+        "PAGE003.jpg": pages["PAGE004.jpg"],
+    }
+    rewrite_cbz(cbz_file, pages)
+
+    assert verify_comic_file(file_t).errors
+    assert verify_comic_file(file_t, VerifyOptions(pages_dropped=True)).errors == []
+
+
+def test_dropped_pages_still_checks_extra_pages(converted: tuple[ComicFile, Path]):
+    file_t, cbz_file = converted
+    pages = read_pages(cbz_file)
+    pages["PAGE009.jpg"] = pages["PAGE001.jpg"]
+    rewrite_cbz(cbz_file, pages)
+
+    errors = verify_comic_file(file_t, VerifyOptions(pages_dropped=True)).errors
+    assert "存在不符合命名规则的文件 PAGE009.jpg" in errors
+    assert f"图片数量为 {page_total + 1}，多于源文档的 {page_total} 页" in errors
+
+
+@pytest.mark.parametrize(
+    "config, expected",
+    [
+        ({}, VerifyOptions()),
+        ({"TRANSFORM": {"enable": True}}, VerifyOptions(reencoded=True)),
+        ({"OPTIMIZE": {"enable": True}}, VerifyOptions(reencoded=True)),
+        ({"DEDUPE": {"enable": True}}, VerifyOptions()),
+        ({"DEDUPE": {"enable": True, "action": "drop"}}, VerifyOptions(pages_dropped=True)),
+        ({"DEDUPE": {"enable": False, "action": "drop"}}, VerifyOptions()),
+    ],
+)
+def test_options_from_config(config: dict, expected: VerifyOptions):
+    assert VerifyOptions.from_config(config) == expected
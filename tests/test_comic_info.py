@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from moe_utils.comic_info import ComicInfo, comic_info_defaults
+
+special_texts: list[str] = [
+    "",
+    "plain",
+    "Tom & Jerry",
+    "<b>bold</b>",
+    "a > b",
+    'say "hi"',
+    "it's",
+    "line1\nline2",
+    "crlf\r\nend",
+    "tab\tseparated",
+    "  leading and trailing  ",
+    "進擊的巨人 第01卷",
+    "emoji 😀",
+    "&amp; already escaped",
+    "]]> cdata end",
+]
+
+
+def assert_parity(comic_info: ComicInfo):
+    assert comic_info.to_xml() == comic_info._to_xml_lxml()
+
+
+@pytest.mark.parametrize("text", special_texts)
+def test_text_escaping_matches_lxml(text: str):
+    assert_parity(ComicInfo({"Title": text, "Summary": text, "Series": text}))
+
+
+@pytest.mark.parametrize("text", special_texts)
+def test_page_attribute_escaping_matches_lxml(text: str):
+    comic_info = ComicInfo({"Title": "t"})
+    comic_info.set_pages([{"Image": "0", "Type": "FrontCover", "Key": text}, {"Image": "1", "Note": text}])
+    assert_parity(comic_info)
+
+
+@pytest.mark.parametrize("value", [0, 7, -3, 12345678901234567890, 1.5, 2.0, True, False, None, b"bytes"])
+def test_non_str_values_match_lxml(value: object):
+    assert_parity(ComicInfo({"Number": value, "PageCount": value, "Year": value}))
+
+
+def test_defaults_and_pages_match_lxml():
+    assert_parity(ComicInfo())
+    comic_info = ComicInfo({"MOXBID": "2001234510010", "Title": "卷01", "PageCount": 3})
+    comic_info.set_pages(
+        {"Image": str(i), "ImageWidth": "1200", "ImageHeight": "1800", "ImageSize": "123456"} for i in range(3)
+    )
+    assert_parity(comic_info)
+
+
+@pytest.mark.parametrize("char", ["\x00", "\x08", "\x0b", "\x1f", "￾"])
+def test_invalid_xml_chars_fall_back_to_lxml(char: str):
+    comic_info = ComicInfo({"Title": f"bad{char}title"})
+    with pytest.raises(ValueError):
+        comic_info._to_xml_lxml()
+    with pytest.raises(ValueError):
+        comic_info.to_xml()
+
+
+def test_invalid_xml_chars_in_page_attributes_fall_back_to_lxml():
+    comic_info = ComicInfo()
+    comic_info.set_pages([{"Image": "0", "Key": "bad\x01"}])
+    with pytest.raises(ValueError):
+        comic_info.to_xml()
+
+
+def test_round_trip_keeps_pages():
+    comic_info = ComicInfo({"Title": 'A & "B"', "PageCount": 2})
+    comic_info.set_pages([{"Image": "0", "Type": "FrontCover"}, {"Image": "1", "Key": "x\ty\nz"}])
+    restored = ComicInfo.from_xml(comic_info.to_xml())
+    assert restored.to_dict()["Title"] == 'A & "B"'
+    assert restored.pages == comic_info.pages
+    assert_parity(restored)
+
+
+def test_random_values_match_lxml():
+    rng = random.Random(20261019)
+    alphabet = "aZ09 &<>\"'\r\n\t;#é漫😀]"
+    keys = list(comic_info_defaults)
+    for _ in range(2000):
+        data = {key: "".join(rng.choices(alphabet, k=rng.randrange(0, 12))) for key in rng.sample(keys, 5)}
+        comic_info = ComicInfo(data)
+        comic_info.set_pages(
+            {"Image": str(i), "Key": "".join(rng.choices(alphabet, k=rng.randrange(0, 8)))}
+            for i in range(rng.randrange(0, 4))
+        )
+        assert_parity(comic_info)
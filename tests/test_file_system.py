@@ -0,0 +1,131 @@
+import errno
+import io
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from moe_utils import file_system
+from moe_utils.file_system import UnseekableWriter, copy_zip_member_raw, remove_if_exists
+
+members: list[tuple[str, bytes, int]] = [
+    ("mimetype", b"application/epub+zip", zipfile.ZIP_STORED),
+    ("image/PAGE001.jpg", os.urandom(4096), zipfile.ZIP_STORED),
+    ("html/Page_1.html", b"<html><body>" + b"text " * 2000 + b"</body></html>", zipfile.ZIP_DEFLATED),
+    ("漫画/封面.txt", "中文名称".encode("utf-8"), zipfile.ZIP_DEFLATED),
+    ("empty.bin", b"", zipfile.ZIP_DEFLATED),
+    ("image/", b"", zipfile.ZIP_STORED),
+]
+
+
+def make_source() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_f:
+        for name, data, compress_type in members:
+            zinfo = zipfile.ZipInfo(name, (2024, 1, 2, 3, 4, 6))
+            zinfo.compress_type = compress_type
+            zinfo.external_attr = (0o40755 << 16) | 0x10 if name.endswith("/") else 0o100644 << 16
+            zip_f.writestr(zinfo, data)
+    return buffer.getvalue()
+
+
+def copy_all(source: bytes, stream, rename: bool = False):
+    with zipfile.ZipFile(io.BytesIO(source), "r") as src_zip, zipfile.ZipFile(stream, "w") as dst_zip:
+        for info in src_zip.infolist():
+            arcname = f"copied/{info.filename}" if rename else None
+            copy_zip_member_raw(src_zip, info, dst_zip, arcname)
+        dst_zip.writestr("ComicInfo.xml", b"<ComicInfo/>")
+
+
+def assert_round_trip(archive: bytes, source: bytes, prefix: str = ""):
+    with zipfile.ZipFile(io.BytesIO(source)) as src_zip, zipfile.ZipFile(io.BytesIO(archive)) as dst_zip:
+        assert dst_zip.testzip() is None
+        assert dst_zip.namelist() == [prefix + info.filename for info in src_zip.infolist()] + ["ComicInfo.xml"]
+        for info in src_zip.infolist():
+            copied = dst_zip.getinfo(prefix + info.filename)
+            assert dst_zip.read(copied) == src_zip.read(info)
+            assert (copied.CRC, copied.file_size, copied.compress_type) == (
+                info.CRC,
+                info.file_size,
+                info.compress_type,
+            )
+            assert (copied.date_time, copied.external_attr) == (info.date_time, info.external_attr)
+            assert copied.is_dir() == info.is_dir()
+        assert dst_zip.read("ComicInfo.xml") == b"<ComicInfo/>"
+
+
+@pytest.fixture(params=[True, False], ids=["raw", "fallback"])
+def raw_copy(request, monkeypatch) -> bool:
+    monkeypatch.setattr(file_system, "raw_copy_available", request.param and file_system.raw_copy_available)
+    return file_system.raw_copy_available
+
+
+@pytest.mark.parametrize("rename", [False, True])
+def test_copy_to_seekable_stream(raw_copy: bool, rename: bool):
+    source = make_source()
+    buffer = io.BytesIO()
+    copy_all(source, buffer, rename)
+    assert_round_trip(buffer.getvalue(), source, "copied/" if rename else "")
+
+
+def test_copy_to_unseekable_stream(raw_copy: bool):
+    source = make_source()
+    buffer = io.BytesIO()
+    copy_all(source, UnseekableWriter(buffer))
+    assert_round_trip(buffer.getvalue(), source)
+
+
+def test_raw_copy_keeps_compressed_bytes():
+    if not file_system.raw_copy_available:
+        pytest.skip("raw copy is disabled on this Python version")
+    source = make_source()
+    buffer = io.BytesIO()
+    copy_all(source, buffer)
+    with zipfile.ZipFile(io.BytesIO(source)) as src_zip, zipfile.ZipFile(buffer) as dst_zip:
+        for info in src_zip.infolist():
+            assert dst_zip.getinfo(info.filename).compress_size == info.compress_size
+
+
+def test_raw_copy_enabled_on_supported_versions():
+    if sys.implementation.name == "cpython" and sys.version_info[:2] in file_system.raw_copy_versions:
+        assert file_system.raw_copy_available
+
+
+def test_encrypted_member_is_rejected():
+    source = make_source()
+    with zipfile.ZipFile(io.BytesIO(source)) as src_zip, zipfile.ZipFile(io.BytesIO(), "w") as dst_zip:
+        info = src_zip.infolist()[1]
+        info.flag_bits |= 0x1
+        with pytest.raises(ValueError):
+            copy_zip_member_raw(src_zip, info, dst_zip)
+
+
+def fill_tree(root):
+    (root / "sub" / "deep").mkdir(parents=True)
+    for i, folder in enumerate((root, root / "sub", root / "sub" / "deep")):
+        (folder / f"file{i}.bin").write_bytes(os.urandom(128))
+
+
+@pytest.mark.parametrize("rename_fails", [False, True], ids=["rename", "in-place"])
+def test_remove_if_exists_never_deletes_new_files(tmp_path, monkeypatch, rename_fails: bool):
+    target = tmp_path / "output"
+    fill_tree(target)
+    if rename_fails:
+
+        def failing_rename(self, other):
+            raise OSError(errno.EXDEV, "cross-device link")
+
+        monkeypatch.setattr(Path, "rename", failing_rename)
+
+    task = remove_if_exists(target, recreate=True, background=True)
+    assert target.is_dir()
+    assert list(target.iterdir()) == []
+    (target / "fresh.cbz").write_bytes(b"new output")
+
+    stats = task.wait()
+    assert stats.files == 3
+    assert not stats.errors
+    assert (target / "fresh.cbz").read_bytes() == b"new output"
+    assert [p.name for p in tmp_path.iterdir()] == ["output"]
@@ -0,0 +1,73 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from moe_utils.image_transform import ImageTransformer, TransformOptions, _encode_image
+
+Image = pytest.importorskip("PIL.Image")
+ImageCms = pytest.importorskip("PIL.ImageCms")
+tomllib = pytest.importorskip("tomllib")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_jpeg(size: tuple[int, int], orientation: int = 1, icc: bytes | None = None, mode: str = "RGB") -> bytes:
+    img = Image.new(mode, size, "white" if mode != "CMYK" else (0, 0, 0, 0))
+    # 左上角涂黑，用于确认旋转方向
+    img.paste("black" if mode != "CMYK" else (0, 0, 0, 255), (0, 0, size[0] // 4, size[1] // 4))
+    exif = Image.Exif()
+    if orientation != 1:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=100, exif=exif.tobytes(), icc_profile=icc)
+    return buffer.getvalue()
+
+
+def decode(data: bytes):
+    img = Image.open(BytesIO(data))
+    img.load()
+    return img
+
+
+def srgb_profile() -> bytes:
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+
+
+@pytest.mark.parametrize("orientation, size", [(1, (800, 400)), (6, (400, 800)), (8, (400, 800)), (3, (800, 400))])
+def test_exif_orientation_applied_before_resize(orientation: int, size: tuple[int, int]):
+    data = make_jpeg((1600, 800), orientation)
+    img = decode(_encode_image(data, TransformOptions(max_size=800, quality=80)))
+    assert img.size == size
+    # 输出不带 EXIF，像素已按显示方向排列
+    assert img.getexif().get(0x0112) is None
+    corner = {1: (0, 0), 6: (size[0] - 1, 0), 8: (0, size[1] - 1), 3: (size[0] - 1, size[1] - 1)}[orientation]
+    assert img.convert("L").getpixel(corner) < 64
+
+
+def test_icc_profile_kept():
+    icc = srgb_profile()
+    img = decode(_encode_image(make_jpeg((1600, 800), icc=icc), TransformOptions(max_size=800)))
+    assert img.info.get("icc_profile") == icc
+
+
+def test_icc_profile_dropped_for_grayscale():
+    img = decode(_encode_image(make_jpeg((1600, 800), icc=srgb_profile()), TransformOptions(800, grayscale=True)))
+    assert img.mode == "L"
+    assert not img.info.get("icc_profile")
+
+
+def test_cmyk_converted_without_profile():
+    img = decode(_encode_image(make_jpeg((1600, 800), mode="CMYK"), TransformOptions(max_size=800)))
+    assert img.mode == "RGB"
+    assert not img.info.get("icc_profile")
+
+
+def test_default_quality_matches_config(tmp_path: Path):
+    with open(ROOT / "config.toml", "rb") as f:
+        section = tomllib.load(f)["TRANSFORM"]
+    assert TransformOptions().quality == section["quality"]
+    section = {key: value for key, value in section.items() if key != "quality"}
+    transformer = ImageTransformer.from_config({**section, "enable": True}, tmp_path)
+    assert transformer is not None
+    assert transformer.options.quality == TransformOptions().quality
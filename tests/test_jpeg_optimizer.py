@@ -0,0 +1,84 @@
+import os
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+from moe_utils.jpeg_optimizer import ExternJpegtran, JpegOptimizer, exif_orientation, strip_jpeg_metadata
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="fake jpegtran is a shell script")
+
+
+def segment(marker: int, payload: bytes) -> bytes:
+    return bytes([0xFF, marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def exif_payload(orientation: int, order: bytes = b"II") -> bytes:
+    endian = "<" if order == b"II" else ">"
+    ifd = struct.pack(endian + "H", 1) + struct.pack(endian + "HHIHH", 0x0112, 3, 1, orientation, 0)
+    return b"Exif\x00\x00" + order + struct.pack(endian + "HI", 42, 8) + ifd + struct.pack(endian + "I", 0)
+
+
+def make_jpeg(*segments: bytes) -> bytes:
+    return b"\xff\xd8" + b"".join(segments) + b"\xff\xda\x00\x08\x01\x01\x00\x00\x3f\x00" + b"\x12" * 256 + b"\xff\xd9"
+
+
+def fake_jpegtran(tmp_path: Path, script: str) -> ExternJpegtran:
+    path = tmp_path / "jpegtran"
+    path.write_text("#!/bin/sh\n" + script + "\n")
+    path.chmod(0o755)
+    return ExternJpegtran(str(path))
+
+
+# 丢弃前 4 字节后原样输出，模拟更小的优化结果
+shrink = "cat | tail -c +5"
+
+
+@pytest.mark.parametrize(
+    "script, complete",
+    [
+        (f"{shrink}; exit 0", True),
+        (f"{shrink}; echo 'Premature end of data segment' >&2; exit 2", True),
+        ("cat > /dev/null; exit 2", False),
+        ("cat > /dev/null; echo 'Not a JPEG file' >&2; exit 1", False),
+    ],
+    ids=["ok", "warning", "warning-without-output", "error"],
+)
+def test_jpegtran_exit_codes(tmp_path: Path, script: str, complete: bool):
+    optimizer = JpegOptimizer(tmp_path / "cache", fake_jpegtran(tmp_path, script), jobs=1)
+    img_dir = tmp_path / "images"
+    img_dir.mkdir()
+    data = make_jpeg(segment(0xE0, b"JFIF\x00" + bytes(9)), segment(0xFE, b"comment" * 8))
+    (img_dir / "PAGE001.jpg").write_bytes(data)
+
+    stats = optimizer.optimize_dir(img_dir)
+    optimizer.shutdown()
+
+    result = (img_dir / "PAGE001.jpg").read_bytes()
+    assert stats.images == 1
+    assert stats.failed == (0 if complete else 1)
+    if complete:
+        assert len(result) < len(strip_jpeg_metadata(data))
+        assert optimizer.index_file.is_file()
+    else:
+        # 退回仅删除元数据的结果，不记入索引也不缓存，之后的运行会重新尝试
+        assert result == strip_jpeg_metadata(data)
+        assert not optimizer.index_file.exists()
+        assert not optimizer.result_dir.exists()
+
+
+@pytest.mark.parametrize("order", [b"II", b"MM"])
+@pytest.mark.parametrize("orientation, kept", [(1, False), (6, True), (8, True)])
+def test_exif_orientation_is_kept(order: bytes, orientation: int, kept: bool):
+    payload = exif_payload(orientation, order)
+    assert exif_orientation(payload) == orientation
+    data = make_jpeg(segment(0xE0, b"JFIF\x00" + bytes(9)), segment(0xE1, payload))
+    assert (payload in strip_jpeg_metadata(data)) == kept
+
+
+def test_jpegtran_keeps_exif_only_when_needed():
+    jpegtran = ExternJpegtran(os.devnull)
+    assert jpegtran._make_args(False, False, keep_exif=True)[1:3] == ["-copy", "all"]
+    assert jpegtran._make_args(False, True)[1:3] == ["-copy", "icc"]
+    assert jpegtran._make_args(True, False)[1:3] == ["-copy", "none"]
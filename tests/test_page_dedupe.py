@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import pytest
+
+from moe_utils import page_dedupe
+from moe_utils.page_dedupe import PageDeduper, PageHashIndex
+
+
+def make_pages(img_dir: Path, seed: int = 0) -> Path:
+    img_dir.mkdir(parents=True)
+    (img_dir / "COVER.jpg").write_bytes(bytes([seed]) * 64)
+    for i in range(1, 4):
+        (img_dir / f"PAGE{i:03}.jpg").write_bytes(bytes([seed + i]) * 64)
+    return img_dir
+
+
+def test_index_is_saved_periodically(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    index_dir = tmp_path / "index"
+    deduper = PageDeduper(PageHashIndex(index_dir, jobs=1))
+    monkeypatch.setattr(page_dedupe, "index_save_interval", 0.0)
+
+    deduper.process_dir(make_pages(tmp_path / "vol01"), "series", "vol01")
+    # 未调用 close 也已写入磁盘
+    reloaded = PageHashIndex(index_dir, jobs=1)
+    assert len(reloaded) == 4
+    assert reloaded._volume_names == ["vol01"]
+
+
+def test_interrupted_volume_is_rolled_back(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    index = PageHashIndex(tmp_path / "index", jobs=1)
+    index.check_volume("series", "vol01", index.hash_pages(make_pages(tmp_path / "vol01")))
+
+    def interrupt(start: int):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(index, "_index_rows", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        index.check_volume("series", "vol02", index.hash_pages(make_pages(tmp_path / "vol02", seed=10)))
+
+    # 中断后保存的索引只包含完整加入的卷
+    index.save()
+    reloaded = PageHashIndex(tmp_path / "index", jobs=1)
+    assert len(reloaded) == 4
+    assert reloaded._volume_names == ["vol01"]
@@ -0,0 +1,59 @@
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+# manga_repacker 读取配置需要 Python 3.11 的 tomllib
+pytest.importorskip("tomllib")
+
+from moe_utils.comic_info import ComicInfo  # noqa: E402
+from moe_utils.retagger import CbzIndex  # noqa: E402
+
+moxbid = "2001234500110"
+
+
+def make_cbz(path: Path, pages: list[bytes], bookmarks: bool = False, book_id: str = moxbid) -> Counter:
+    comic_info = ComicInfo({"MOXBID": book_id, "PageCount": len(pages)})
+    attribs = [{"Image": str(i)} for i in range(len(pages))]
+    if bookmarks:
+        attribs[0]["Bookmark"] = "第01话"
+    comic_info.set_pages(attribs)
+    with zipfile.ZipFile(path, "w") as z:
+        for i, data in enumerate(pages):
+            z.writestr(f"PAGE{i:03}.jpg", data)
+        z.writestr("ComicInfo.xml", comic_info.to_xml())
+    with zipfile.ZipFile(path) as z:
+        return Counter((info.CRC, info.file_size) for info in z.infolist() if info.filename != "ComicInfo.xml")
+
+
+def pages(count: int, seed: int = 0) -> list[bytes]:
+    return [bytes([seed + i]) * (100 + i) for i in range(count)]
+
+
+def test_moxbid_match_prefers_closest_page_count(tmp_path: Path):
+    src_keys = make_cbz(tmp_path / "src.cbz.bak", pages(10))
+    make_cbz(tmp_path / "old-name.cbz", pages(10, seed=50))
+    make_cbz(tmp_path / "deduped.cbz", pages(8, seed=50))
+    assert CbzIndex().find(tmp_path, moxbid, 10, src_keys) == tmp_path / "old-name.cbz"
+
+
+def test_merged_output_is_not_matched_by_moxbid(tmp_path: Path):
+    src_keys = make_cbz(tmp_path / "src.cbz.bak", pages(10))
+    # 合并结果沿用第一章的 MOXBID，页数更接近也不应被选中
+    make_cbz(tmp_path / "merged.cbz", pages(10, seed=50), bookmarks=True)
+    make_cbz(tmp_path / "chapter.cbz", pages(6, seed=50))
+    assert CbzIndex().find(tmp_path, moxbid, 10, src_keys) == tmp_path / "chapter.cbz"
+
+
+def test_larger_output_is_not_matched_by_moxbid(tmp_path: Path):
+    src_keys = make_cbz(tmp_path / "src.cbz.bak", pages(10))
+    make_cbz(tmp_path / "bigger.cbz", pages(30, seed=50))
+    assert CbzIndex().find(tmp_path, moxbid, 10, src_keys) is None
+
+
+def test_falls_back_to_page_crcs(tmp_path: Path):
+    src_keys = make_cbz(tmp_path / "src.cbz.bak", pages(10))
+    make_cbz(tmp_path / "merged.cbz", pages(10) + pages(5, seed=100), bookmarks=True)
+    make_cbz(tmp_path / "same-pages.cbz", pages(10), book_id="")
+    assert CbzIndex().find(tmp_path, moxbid, 10, src_keys) == tmp_path / "same-pages.cbz"
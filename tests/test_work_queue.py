@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from moe_utils.work_queue import WorkItem, WorkQueue
+
+item_total = 60
+worker_total = 4
+fail_every = 7
+
+
+def make_items(count: int) -> list[WorkItem]:
+    return [WorkItem.from_relative_path(Path("series") / f"vol{i:03d}.epub") for i in range(count)]
+
+
+def should_fail(item: WorkItem) -> bool:
+    return int(item.relative_path.removesuffix(".epub")[-3:]) % fail_every == 0
+
+
+# 在子进程中执行：不断领取直到队列为空，并把领取到的任务记入各自的文件
+def run_worker(root: str, claims_dir: str, name: str, start):
+    queue = WorkQueue(Path(root))
+    start.wait()
+    claimed: list[str] = []
+    while (item := queue.claim(name)) is not None:
+        claimed.append(item.id)
+        if should_fail(item):
+            queue.fail(item, name, "boom", "structure")
+        else:
+            queue.complete(item, name, 0.0)
+    Path(claims_dir, f"{name}.txt").write_text("\n".join(claimed), encoding="utf-8")
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> WorkQueue:
+    queue = WorkQueue(tmp_path / "queue")
+    queue.init()
+    return queue
+
+
+def test_workers_claim_each_item_once(queue: WorkQueue, tmp_path: Path):
+    items = make_items(item_total)
+    assert queue.submit(items) == item_total
+    queue.close()
+
+    claims_dir = tmp_path / "claims"
+    claims_dir.mkdir()
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    workers = [
+        ctx.Process(target=run_worker, args=(str(queue.root), str(claims_dir), f"w{i}", start))
+        for i in range(worker_total)
+    ]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    claimed = [
+        line
+        for claims_file in claims_dir.iterdir()
+        for line in claims_file.read_text(encoding="utf-8").splitlines()
+        if line
+    ]
+    assert len(claimed) == item_total
+    assert set(claimed) == {item.id for item in items}
+
+    failed = sum(1 for item in items if should_fail(item))
+    counts = queue.counts()
+    assert counts.pending == counts.running == 0
+    assert (counts.done, counts.failed) == (item_total - failed, failed)
+    assert counts.finished == item_total
+    assert all(result["attempts"] == 1 for result in queue.results("done"))
+    # 已完成的任务不会被重新提交
+    assert queue.submit(items) == 0
+
+
+def age(path: Path, seconds: float):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_expired_lease_is_requeued(queue: WorkQueue):
+    queue.submit(make_items(2))
+    first = queue.claim("w0")
+    second = queue.claim("w1")
+    assert first is not None and second is not None
+    assert queue.claim("w2") is None
+
+    # 新领取的任务不会超时
+    assert queue.requeue_stale(lease=10) == 0
+
+    age(queue._item_path("running", first.id), 60)
+    assert queue.requeue_stale(lease=10) == 1
+    assert queue.counts() == (1, 1, 0, 0)
+
+    retried = queue.claim("w2")
+    assert retried is not None
+    assert (retried.id, retried.attempts) == (first.id, 2)
+
+    # 心跳保持租约有效
+    age(queue._item_path("running", second.id), 60)
+    queue.heartbeat(second)
+    assert queue.requeue_stale(lease=10) == 0
+
+
+def test_stale_running_record_with_result_is_cleared(queue: WorkQueue):
+    queue.submit(make_items(1))
+    item = queue.claim("w0")
+    assert item is not None
+    # 先前超时的节点最终完成了任务，运行记录仍由新节点持有
+    queue.complete(item, "w0", 1.0)
+    queue._item_path("running", item.id).write_text("{}", encoding="utf-8")
+    age(queue._item_path("running", item.id), 60)
+
+    assert queue.requeue_stale(lease=10) == 0
+    assert queue.counts() == (0, 0, 1, 0)
+
+
+@pytest.mark.parametrize("payload", [b"{not json", b"\xff\xfe", b"[1, 2]", b'{"id": "x"}'], ids=str)
+def test_unreadable_item_is_failed_not_stranded(queue: WorkQueue, payload: bytes):
+    (good,) = make_items(1)
+    queue.submit([good])
+    # 排在正常任务之前领取
+    queue._item_path("pending", "0" * 16).write_bytes(payload)
+
+    item = queue.claim("w0")
+    assert item is not None and item.id == good.id
+    assert queue.counts() == (0, 1, 0, 1)
+
+    (result,) = queue.results("failed")
+    assert result["id"] == "0" * 16
+    assert result["worker"] == "w0"
+    assert result["category"] == "parse"